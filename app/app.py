@@ -17,6 +17,12 @@ from app.controllers.reservation_controller import reservation_bp
 from app.controllers.maintenance_controller import maintenance_bp
 from app.controllers.stats_controller import stats_bp
 from app.controllers.audit_controller import audit_bp
+from app.controllers.event_controller import event_bp
+from app.utils import db_session, cache, etag, audit_writer, events, principal_cache, session_store, rate_limit, passwords, interval_index
+from app.models.audit_log import AuditLog
+from app.models.reservation import Reservation
+from app.utils.db_config import get_connection_pool
+from app.utils.json_provider import FastJSONProvider
 
 def create_app():
     """创建Flask应用实例"""
@@ -25,9 +31,53 @@ def create_app():
                 template_folder='templates')
     
     # 配置应用
-    app.config['SECRET_KEY'] = os.urandom(24)
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=2)
     
+    # 会话：所有 worker 共用持久化的 SECRET_KEY（或环境变量 SECRET_KEY），会话数据保存在服务端
+    # SESSION_BACKEND 可选 'sqlite'（单机多 worker）、'redis'（多机）或 'cookie'
+    app.config['SESSION_BACKEND'] = os.environ.get('SESSION_BACKEND', 'sqlite')
+    app.config['SESSION_REDIS_URL'] = os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+    session_store.init_app(app)
+    
+    # 登录限流：同一 IP / 学号工号失败次数过多时，在查询数据库之前直接返回 429
+    rate_limit.init_app(app)
+    
+    # 密码哈希：加盐 PBKDF2，启动时按目标耗时标定迭代次数，在有界线程池中计算
+    app.config['PASSWORD_HASH_TARGET_MS'] = int(os.environ.get('PASSWORD_HASH_TARGET_MS', 100))
+    passwords.init_app(app)
+    
+    # JSON 序列化：安装了 orjson 时使用 orjson，查询结果的输出格式与 Flask 默认 provider 一致
+    app.json = FastJSONProvider(app)
+    
+    # 请求级数据库会话：每个请求一个连接、一个事务
+    db_session.init_app(app, get_connection_pool)
+    
+    # 缓存配置：CACHE_BACKEND 可选 'memory'（单进程）或 'redis'（多 worker 共享）
+    app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memory')
+    app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    app.config['DASHBOARD_CACHE_TTL'] = 30
+    cache.init_app(app)
+    
+    # 条件请求：ETag 依赖表版本号，只在版本号由多 worker 共享（CACHE_BACKEND=redis）时默认启用
+    etag.init_app(app)
+    
+    # 设备时间线索引：按 reservations 表版本号失效，同样只在 CACHE_BACKEND=redis 时默认启用
+    interval_index.init_app(app, Reservation.load_confirmed_intervals)
+    
+    # 登录用户缓存：login_required 按用户ID读取进程内缓存，删除用户/修改角色最多 60 秒后在所有进程生效
+    app.config['PRINCIPAL_CACHE_TTL'] = 60
+    principal_cache.init_app(app)
+    
+    # 审计日志异步批量写入，数据库不可用时转存到 logs/audit_spill.jsonl
+    app.config['AUDIT_BATCH_SIZE'] = 100
+    app.config['AUDIT_FLUSH_INTERVAL'] = 1.0
+    audit_writer.init_app(app, AuditLog.insert_batch)
+    
+    # 变更事件推送：EVENTS_BACKEND 可选 'memory'（单进程）或 'redis'（多 worker 之间转发）
+    app.config['EVENTS_BACKEND'] = os.environ.get('EVENTS_BACKEND', 'memory')
+    app.config['EVENTS_REDIS_URL'] = os.environ.get('EVENTS_REDIS_URL', app.config['CACHE_REDIS_URL'])
+    events.init_app(app)
+    
     # 注册蓝图
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(device_bp, url_prefix='/api/devices')
@@ -36,6 +86,7 @@ def create_app():
     app.register_blueprint(maintenance_bp, url_prefix='/api/maintenances')
     app.register_blueprint(stats_bp, url_prefix='/api/stats')
     app.register_blueprint(audit_bp, url_prefix='/api/audit')
+    app.register_blueprint(event_bp, url_prefix='/api/events')
     
     # 主页路由
     @app.route('/')
@@ -8,6 +8,9 @@
 from flask import Blueprint, request, jsonify, session
 from app.models.audit_log import AuditLog
 from app.controllers.auth_controller import login_required
+from app.utils.pagination import parse_page_args, next_cursor, MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE
+from app.utils.query_filter import parse_time_arg
+from app.utils.export import export_response, parse_export_args
 
 audit_bp = Blueprint('audit', __name__)
 
@@ -22,17 +25,47 @@ def get_audit_logs():
     action = request.args.get('action')
     target_table = request.args.get('target_table')
     
-    if user_id:
-        logs = AuditLog.get_logs_by_user(user_id)
-    elif action:
-        logs = AuditLog.get_logs_by_action(action)
-    elif target_table:
-        logs = AuditLog.get_logs_by_table(target_table)
-    else:
-        # 获取详细审计日志（包含用户名）
-        logs = AuditLog.get_detailed_logs()
+    try:
+        limit, cursor = parse_page_args(request.args)
+        if user_id:
+            logs = AuditLog.get_logs_by_user(user_id, limit, cursor)
+        elif action:
+            logs = AuditLog.get_logs_by_action(action, limit, cursor)
+        elif target_table:
+            logs = AuditLog.get_logs_by_table(target_table, limit, cursor)
+        else:
+            # 获取详细审计日志（包含用户名）
+            logs = AuditLog.get_detailed_logs(limit, cursor)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     
-    return jsonify({'status': 'success', 'audit_logs': logs})
+    return jsonify({
+        'status': 'success',
+        'audit_logs': logs,
+        'next_cursor': next_cursor(logs, limit, 'log_id', 'action_time')
+    })
+
+@audit_bp.route('/audit_logs/export', methods=['GET'])
+@login_required(role='管理员')
+def export_audit_logs():
+    """
+    流式导出审计日志（仅管理员）
+    过滤参数：user_id、action、target_table、from、to，
+    format=csv|jsonl，gzip=1 时使用 gzip 压缩
+    """
+    try:
+        fmt, use_gzip = parse_export_args(request.args)
+        rows = AuditLog.stream_logs(
+            user_id=request.args.get('user_id', type=int),
+            action=request.args.get('action'),
+            target_table=request.args.get('target_table'),
+            time_from=parse_time_arg(request.args, 'from'),
+            time_to=parse_time_arg(request.args, 'to')
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    return export_response(rows, AuditLog.EXPORT_COLUMNS, fmt, 'audit_logs', use_gzip)
 
 @audit_bp.route('/audit_logs/add', methods=['POST'])
 @login_required(role='管理员')
@@ -60,3 +93,44 @@ def add_audit_log():
         return jsonify({'status': 'success', 'message': '审计日志添加成功'})
     else:
         return jsonify({'status': 'error', 'message': '审计日志添加失败'}), 500
+
+@audit_bp.route('/archives', methods=['GET'])
+@login_required(role='管理员')
+def search_archived_logs():
+    """
+    检索已归档的审计日志（仅管理员）
+    支持 user_id、action、target_table、from、to、limit 参数
+    """
+    user_id = request.args.get('user_id', type=int)
+    action = request.args.get('action')
+    target_table = request.args.get('target_table')
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    
+    try:
+        time_from = parse_time_arg(request.args, 'from')
+        time_to = parse_time_arg(request.args, 'to')
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        return jsonify({'status': 'error', 'message': f'limit 必须在 1 到 {MAX_PAGE_SIZE} 之间'}), 400
+    
+    logs = AuditLog.search_archived_logs(user_id, action, target_table, time_from, time_to, limit)
+    return jsonify({'status': 'success', 'audit_logs': logs})
+
+@audit_bp.route('/archives', methods=['POST'])
+@login_required(role='管理员')
+def archive_audit_logs():
+    """
+    立即归档冷分区（仅管理员）
+    请求体可选 keep_months（默认6），同时创建未来3个月的分区
+    """
+    data = request.get_json(silent=True) or {}
+    keep_months = data.get('keep_months', 6)
+    if not isinstance(keep_months, int) or keep_months < 1:
+        return jsonify({'status': 'error', 'message': 'keep_months 必须为正整数'}), 400
+    
+    created = AuditLog.ensure_partitions()
+    archived = AuditLog.archive_cold_partitions(keep_months)
+    for item in archived:
+        item.pop('path', None)
+    return jsonify({'status': 'success', 'created_partitions': created, 'archived': archived})
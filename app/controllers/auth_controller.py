@@ -8,7 +8,13 @@
 from flask import Blueprint, request, jsonify, session, redirect, url_for, render_template
 from app.models.user import User
 from app.models.audit_log import AuditLog
-import hashlib
+from app.utils.pagination import parse_page_args, next_cursor
+from app.utils.session_store import regenerate_session
+from app.utils.rate_limit import get_limiter
+from app.utils.stage_timer import login_timings
+from app.utils.passwords import PasswordHasherBusy
+from app.utils.principal_cache import PrincipalUnavailable
+import time
 import functools
 
 auth_bp = Blueprint('auth', __name__)
@@ -24,6 +30,18 @@ def login_required(role=None):
             if 'user_id' not in session:
                 return jsonify({'status': 'error', 'message': '请先登录'}), 401
             
+            # 会话中的用户已被删除时拒绝访问；角色、姓名以数据库为准（进程内缓存，TTL 内生效）
+            # 数据库查询失败时返回503，不能当作用户已删除
+            try:
+                user = User.get_principal(session['user_id'])
+            except PrincipalUnavailable as e:
+                return _busy_response(e)
+            if not user:
+                return jsonify({'status': 'error', 'message': '登录已失效，请重新登录'}), 401
+            if session.get('user_role') != user.role or session.get('user_name') != user.uname:
+                session['user_role'] = user.role
+                session['user_name'] = user.uname
+            
             if role and session.get('user_role') != role:
                 return jsonify({'status': 'error', 'message': '权限不足'}), 403
                 
@@ -31,6 +49,12 @@ def login_required(role=None):
         return wrapper
     return decorator
 
+def _busy_response(error):
+    """密码哈希线程池繁忙或用户信息无法加载时的响应（503，客户端稍后重试）"""
+    response = jsonify({'status': 'error', 'message': str(error)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     """
@@ -46,23 +70,58 @@ def login():
     if not code or not password:
         return jsonify({'status': 'error', 'message': '学号/工号和密码不能为空'}), 400
     
-    user = User.authenticate(code, password)
-    if not user:
+    started = time.perf_counter()
+    ip_limiter = get_limiter('login_ip')
+    code_limiter = get_limiter('login_code')
+    
+    # 失败次数过多的 IP / 学号工号在查询数据库之前直接拒绝
+    with login_timings.stage('rate_limit'):
+        retry_after = max(ip_limiter.peek(request.remote_addr), code_limiter.peek(code))
+    if retry_after:
+        login_timings.count('throttled')
+        response = jsonify({'status': 'error', 'message': '登录失败次数过多，请稍后再试'})
+        response.headers['Retry-After'] = str(int(retry_after) + 1)
+        return response, 429
+    
+    # 查询失败（数据库不可用）时返回503，不算作密码错误，也不消耗限流令牌
+    try:
+        with login_timings.stage('lookup'):
+            user = User.lookup_by_code(code)
+    except PrincipalUnavailable as e:
+        login_timings.count('unavailable')
+        return _busy_response(e)
+    try:
+        with login_timings.stage('verify'):
+            verified = User.verify_credentials(user, password)
+    except PasswordHasherBusy as e:
+        login_timings.count('busy')
+        return _busy_response(e)
+    if not verified:
+        ip_limiter.consume(request.remote_addr)
+        code_limiter.consume(code)
+        login_timings.count('failed')
+        login_timings.record('total', (time.perf_counter() - started) * 1000)
         return jsonify({'status': 'error', 'message': '学号/工号或密码错误'}), 401
+    code_limiter.reset(code)
     
-    # 记录登录信息到会话
-    session['user_id'] = user.uid
-    session['user_name'] = user.uname
-    session['user_role'] = user.role
+    with login_timings.stage('session'):
+        # 记录登录信息到会话（更换会话ID，防止会话固定）
+        regenerate_session(session)
+        session['user_id'] = user.uid
+        session['user_name'] = user.uname
+        session['user_role'] = user.role
     
-    # 记录审计日志
-    AuditLog.add_log(
-        user_id=user.uid,
-        action='LOGIN',
-        target_table='users',
-        sql_text=f'用户登录: {user.uname}',
-        ip_address=request.remote_addr
-    )
+    with login_timings.stage('audit'):
+        # 记录审计日志（异步批量写入）
+        AuditLog.add_log(
+            user_id=user.uid,
+            action='LOGIN',
+            target_table='users',
+            sql_text=f'用户登录: {user.uname}',
+            ip_address=request.remote_addr
+        )
+    login_timings.count('success')
+    login_timings.record('total', (time.perf_counter() - started) * 1000)
     
     return jsonify({
         'status': 'success',
@@ -100,7 +159,10 @@ def profile():
     """
     获取当前用户信息
     """
-    user = User.get_by_id(session['user_id'])
+    try:
+        user = User.get_principal(session['user_id'])
+    except PrincipalUnavailable as e:
+        return _busy_response(e)
     if not user:
         session.clear()
         return jsonify({'status': 'error', 'message': '用户不存在'}), 404
@@ -129,17 +191,22 @@ def change_password():
     if not old_password or not new_password:
         return jsonify({'status': 'error', 'message': '原密码和新密码不能为空'}), 400
     
-    user = User.get_by_id(session['user_id'])
+    try:
+        user = User.get_principal(session['user_id'])
+    except PrincipalUnavailable as e:
+        return _busy_response(e)
     if not user:
         return jsonify({'status': 'error', 'message': '用户不存在'}), 404
     
-    # 验证原密码
-    hashed_old_password = hashlib.sha256(old_password.encode()).hexdigest()
-    if user.password != hashed_old_password:
-        return jsonify({'status': 'error', 'message': '原密码错误'}), 401
+    # 验证原密码并更新密码
+    try:
+        if not user.check_password(old_password):
+            return jsonify({'status': 'error', 'message': '原密码错误'}), 401
+        updated = user.update_password(new_password)
+    except PasswordHasherBusy as e:
+        return _busy_response(e)
     
-    # 更新密码
-    if user.update_password(new_password):
+    if updated:
         # 记录审计日志
         AuditLog.add_log(
             user_id=user.uid,
@@ -158,7 +225,12 @@ def get_users():
     """
     获取所有用户（仅管理员）
     """
-    users = User.get_all_users()
+    try:
+        limit, cursor = parse_page_args(request.args)
+        users = User.get_all_users(limit, cursor)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
     users_data = []
     
     for user in users:
@@ -170,7 +242,7 @@ def get_users():
             'phone': user.phone
         })
     
-    return jsonify({'status': 'success', 'users': users_data})
+    return jsonify({'status': 'success', 'users': users_data, 'next_cursor': next_cursor(users, limit, 'uid')})
 
 @auth_bp.route('/users', methods=['POST'])
 @login_required(role='管理员')
@@ -199,7 +271,12 @@ def create_user():
         phone=data.get('phone')
     )
     
-    if user.save():
+    try:
+        saved = user.save()
+    except PasswordHasherBusy as e:
+        return _busy_response(e)
+    
+    if saved:
         # 记录审计日志
         AuditLog.add_log(
             user_id=session['user_id'],
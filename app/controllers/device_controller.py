@@ -6,15 +6,63 @@
 """
 
 from flask import Blueprint, request, jsonify, session
-from app.models.device import Device
+from app.models.device import Device, DEVICE_STATUSES
 from app.models.room import Room
 from app.models.audit_log import AuditLog
 from app.controllers.auth_controller import login_required
+from app.utils.etag import conditional
+from app.utils.pagination import parse_page_args, next_cursor
 
 device_bp = Blueprint('device', __name__)
 
+# 批量接口单次请求的最大设备数
+MAX_BULK_ITEMS = 1000
+
+def _bulk_response(results, action, summary):
+    """
+    批量操作的统一响应：记录一条汇总审计日志并返回逐项结果
+    :param results: 逐项结果列表，None表示数据库错误
+    :param action: 审计操作类型
+    :param summary: 审计日志摘要（不含成功/失败数量）
+    """
+    if results is None:
+        return jsonify({'status': 'error', 'message': '批量操作失败'}), 500
+    
+    succeeded = list(dict.fromkeys(item['did'] for item in results if item['status'] == 'success'))
+    succeeded_count = sum(1 for item in results if item['status'] == 'success')
+    if succeeded:
+        AuditLog.add_log(
+            user_id=session['user_id'],
+            action=action,
+            target_table='devices',
+            sql_text=f'{summary}: 成功 {succeeded_count} 台, 失败 {len(results) - succeeded_count} 台, '
+                     f'设备ID {",".join(str(did) for did in succeeded)}',
+            ip_address=request.remote_addr
+        )
+    return jsonify({
+        'status': 'success',
+        'succeeded': succeeded_count,
+        'failed': len(results) - succeeded_count,
+        'results': results
+    })
+
+def _parse_bulk_dids(data):
+    """
+    校验批量接口的设备ID列表
+    :return: (设备ID列表, 错误信息)
+    """
+    dids = data.get('dids') if isinstance(data, dict) else None
+    if not isinstance(dids, list) or not dids:
+        return None, '缺少设备ID列表: dids'
+    if len(dids) > MAX_BULK_ITEMS:
+        return None, f'单次最多处理 {MAX_BULK_ITEMS} 台设备'
+    if not all(isinstance(did, int) and not isinstance(did, bool) for did in dids):
+        return None, '设备ID必须为整数'
+    return dids, None
+
 @device_bp.route('/', methods=['GET'])
 @login_required()
+@conditional('devices')
 def get_devices():
 
     """
@@ -24,33 +72,19 @@ def get_devices():
     room_id = request.args.get('room_id', type=int)
     status = request.args.get('status')
     
-    if room_id:
-        devices = Device.get_devices_by_room(room_id)
-    elif status:
-        if status == '空闲':
-            devices = Device.get_available_devices()
-        else:
-            # 根据状态过滤设备
-            all_devices = Device.get_all_devices()
-            devices = [d for d in all_devices if d.status == status]
-    else:
-        devices = Device.get_all_devices()
-    
-    devices_data = []
-    for device in devices:
-        devices_data.append({
-            'did': device.did,
-            'dname': device.dname,
-            'type': device.type,
-            'spec': device.spec,
-            'status': device.status,
-            'room_id': device.room_id
-        })
+    try:
+        limit, cursor = parse_page_args(request.args)
+        # 机房和状态条件在SQL中组合过滤
+        devices = Device.find_devices(status=status, room_id=room_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     
-    return jsonify({'status': 'success', 'devices': devices_data})
+    # 模型对象列表由 JSON provider 直接按字段序列化
+    return jsonify({'status': 'success', 'devices': devices, 'next_cursor': next_cursor(devices, limit, 'did')})
 
 @device_bp.route('/details', methods=['GET'])
 @login_required()
+@conditional('devices', 'rooms')
 def get_device_details():
     """
     获取设备详情（包含机房位置）
@@ -68,17 +102,7 @@ def get_device(did):
     if not device:
         return jsonify({'status': 'error', 'message': '设备不存在'}), 404
     
-    return jsonify({
-        'status': 'success',
-        'device': {
-            'did': device.did,
-            'dname': device.dname,
-            'type': device.type,
-            'spec': device.spec,
-            'status': device.status,
-            'room_id': device.room_id
-        }
-    })
+    return jsonify({'status': 'success', 'device': device})
 
 @device_bp.route('/', methods=['POST'])
 @login_required(role='管理员')
@@ -121,6 +145,56 @@ def create_device():
     else:
         return jsonify({'status': 'error', 'message': '设备创建失败'}), 500
 
+@device_bp.route('/bulk', methods=['POST'])
+@login_required(role='管理员')
+def bulk_create_devices():
+    """
+    批量创建设备（仅管理员）
+    请求体：{"devices": [{"dname", "type", "room_id", "spec", "status"}, ...]}
+    """
+    data = request.get_json()
+    items = data.get('devices') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'status': 'error', 'message': '缺少设备列表: devices'}), 400
+    if len(items) > MAX_BULK_ITEMS:
+        return jsonify({'status': 'error', 'message': f'单次最多创建 {MAX_BULK_ITEMS} 台设备'}), 400
+    
+    return _bulk_response(Device.bulk_create(items), 'INSERT', '批量创建设备')
+
+@device_bp.route('/bulk/status', methods=['PUT'])
+@login_required(role='管理员')
+def bulk_update_device_status():
+    """
+    批量更新设备状态（仅管理员）
+    请求体：{"dids": [1, 2, 3], "status": "维护中"}
+    """
+    data = request.get_json()
+    dids, error = _parse_bulk_dids(data)
+    if error:
+        return jsonify({'status': 'error', 'message': error}), 400
+    new_status = data.get('status')
+    if new_status not in DEVICE_STATUSES:
+        return jsonify({'status': 'error', 'message': '设备状态无效'}), 400
+    
+    return _bulk_response(Device.bulk_update_status(dids, new_status), 'UPDATE', f'批量更新设备状态 -> {new_status}')
+
+@device_bp.route('/bulk/room', methods=['PUT'])
+@login_required(role='管理员')
+def bulk_move_devices():
+    """
+    批量迁移设备到另一个机房（仅管理员）
+    请求体：{"dids": [1, 2, 3], "room_id": 2}
+    """
+    data = request.get_json()
+    dids, error = _parse_bulk_dids(data)
+    if error:
+        return jsonify({'status': 'error', 'message': error}), 400
+    room_id = data.get('room_id')
+    if not isinstance(room_id, int) or not Room.get_by_id(room_id):
+        return jsonify({'status': 'error', 'message': '机房不存在'}), 400
+    
+    return _bulk_response(Device.bulk_move(dids, room_id), 'UPDATE', f'批量迁移设备 -> 机房 {room_id}')
+
 @device_bp.route('/<int:did>', methods=['PUT'])
 @login_required(role='管理员')
 def update_device(did):
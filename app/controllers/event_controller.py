@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+变更事件推送控制器（Server-Sent Events）
+"""
+
+from flask import Blueprint, Response, request, jsonify, session, current_app
+from app.controllers.auth_controller import login_required
+from app.utils import events
+
+event_bp = Blueprint('event', __name__)
+
+# 事件数据只对所属用户可见时，这些角色仍可看到全部事件
+PRIVILEGED_ROLES = ('管理员', '教师')
+
+@event_bp.route('', methods=['GET'])
+@login_required()
+def stream_events():
+    """
+    推送设备状态、预约状态和维护记录的变更事件
+    断线重连时浏览器会携带 Last-Event-ID 请求头，补发断线期间的事件
+    """
+    user_id = session.get('user_id')
+    see_all = session.get('user_role') in PRIVILEGED_ROLES
+    heartbeat = current_app.config.get('EVENTS_HEARTBEAT', 15)
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+    # 先订阅再返回响应，保证补发的事件与之后推送的事件之间没有遗漏
+    subscription, missed = events.subscribe(last_event_id)
+
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            for event in missed:
+                if see_all or event[3] is None or event[3] == user_id:
+                    yield events.format_sse(event)
+            while not subscription.overflowed:
+                event = subscription.get(heartbeat)
+                if event is None:
+                    # 心跳，防止代理因连接空闲而断开
+                    yield ': keep-alive\n\n'
+                elif see_all or event[3] is None or event[3] == user_id:
+                    yield events.format_sse(event)
+        finally:
+            events.get_bus().unsubscribe(subscription)
+
+    return Response(generate(), content_type='text/event-stream; charset=utf-8', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@event_bp.route('/stats', methods=['GET'])
+@login_required(role='管理员')
+def get_event_stats():
+    """
+    获取事件总线的发布数量与订阅连接数（仅管理员）
+    """
+    return jsonify({'status': 'success', 'event_stats': events.get_bus().stats()})
@@ -10,6 +10,8 @@ from app.models.maintenance import Maintenance
 from app.models.device import Device
 from app.models.audit_log import AuditLog
 from app.controllers.auth_controller import login_required
+from app.utils.pagination import parse_page_args, next_cursor
+from app.utils.query_filter import parse_time_arg
 from datetime import datetime
 
 maintenance_bp = Blueprint('maintenance', __name__)
@@ -23,37 +25,37 @@ def get_maintenances():
     # 获取查询参数
     status = request.args.get('status')
     device_id = request.args.get('did', type=int)
+    room_id = request.args.get('room_id', type=int)
     
-    if device_id:
-        maintenances = Maintenance.get_by_device(device_id)
-    else:
-        # 获取详细维护信息（包含设备名称）
-        maintenances_data = Maintenance.get_detailed_maintenances()
-        
-        # 如果有状态过滤
-        if status:
-            maintenances_data = [m for m in maintenances_data if m['status'] == status]
-            
-        return jsonify({'status': 'success', 'maintenances': maintenances_data})
-    
-    # 如果有状态过滤
-    if status and isinstance(maintenances, list):
-        maintenances = [m for m in maintenances if m.status == status]
-    
-    # 转换为JSON格式
-    maintenances_data = []
-    for maint in maintenances:
-        maintenances_data.append({
-            'mid': maint.mid,
-            'did': maint.did,
-            'issue': maint.issue,
-            'report_time': maint.report_time.strftime('%Y-%m-%d %H:%M:%S') if isinstance(maint.report_time, datetime) else maint.report_time,
-            'handler': maint.handler,
-            'status': maint.status,
-            'complete_time': maint.complete_time.strftime('%Y-%m-%d %H:%M:%S') if isinstance(maint.complete_time, datetime) and maint.complete_time else None
-        })
+    # 所有过滤条件在SQL中组合
+    try:
+        limit, cursor = parse_page_args(request.args)
+        filters = {
+            'status': status,
+            'did': device_id,
+            'room_id': room_id,
+            'time_from': parse_time_arg(request.args, 'from'),
+            'time_to': parse_time_arg(request.args, 'to')
+        }
+        if device_id:
+            maintenances = Maintenance.find_maintenances(limit=limit, cursor=cursor, **filters)
+        else:
+            # 获取详细维护信息（包含设备名称）
+            maintenances_data = Maintenance.get_detailed_maintenances(limit, cursor, **filters)
+            return jsonify({
+                'status': 'success',
+                'maintenances': maintenances_data,
+                'next_cursor': next_cursor(maintenances_data, limit, 'mid', 'report_time')
+            })
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     
-    return jsonify({'status': 'success', 'maintenances': maintenances_data})
+    # 模型对象列表由 JSON provider 直接按字段序列化（时间格式统一处理）
+    return jsonify({
+        'status': 'success',
+        'maintenances': maintenances,
+        'next_cursor': next_cursor(maintenances, limit, 'mid', 'report_time')
+    })
 
 @maintenance_bp.route('/maintenances/pending', methods=['GET'])
 @login_required()
@@ -83,18 +85,7 @@ def get_maintenance(mid):
     if not maintenance:
         return jsonify({'status': 'error', 'message': '维护记录不存在'}), 404
     
-    return jsonify({
-        'status': 'success',
-        'maintenance': {
-            'mid': maintenance.mid,
-            'did': maintenance.did,
-            'issue': maintenance.issue,
-            'report_time': maintenance.report_time.strftime('%Y-%m-%d %H:%M:%S') if isinstance(maintenance.report_time, datetime) else maintenance.report_time,
-            'handler': maintenance.handler,
-            'status': maintenance.status,
-            'complete_time': maintenance.complete_time.strftime('%Y-%m-%d %H:%M:%S') if isinstance(maintenance.complete_time, datetime) and maintenance.complete_time else None
-        }
-    })
+    return jsonify({'status': 'success', 'maintenance': maintenance})
 
 @maintenance_bp.route('/maintenances', methods=['POST'])
 @login_required()
@@ -6,15 +6,25 @@
 """
 
 from flask import Blueprint, request, jsonify, session
-from app.models.reservation import Reservation
-from app.models.device import Device
+from app.models.reservation import Reservation, BookingError
 from app.models.user import User
 from app.models.audit_log import AuditLog
 from app.controllers.auth_controller import login_required
-from datetime import datetime
+from app.utils.pagination import parse_page_args, next_cursor
+from app.utils.query_filter import parse_time_arg
+from app.utils.export import export_response, parse_export_args
+from datetime import datetime, timedelta
 
 reservation_bp = Blueprint('reservation', __name__)
 
+# 批量审核单次请求的最大预约数
+MAX_REVIEW_ITEMS = 500
+
+# 空闲时段查询的默认/最大时间窗口和每个设备的最大时段数
+AVAILABILITY_DEFAULT_DAYS = 7
+AVAILABILITY_MAX_DAYS = 31
+AVAILABILITY_MAX_SLOTS = 20
+
 @reservation_bp.route('/', methods=['GET'])
 @login_required()
 def get_reservations():
@@ -29,41 +39,66 @@ def get_reservations():
     # 获取查询参数
     status = request.args.get('status')
     device_id = request.args.get('did', type=int)
+    room_id = request.args.get('room_id', type=int)
     
-    if user_role == '管理员':
-        # 管理员可以查看所有预约
-        if device_id:
-            reservations = Reservation.get_by_device(device_id)
+    # 所有过滤条件在SQL中组合
+    try:
+        limit, cursor = parse_page_args(request.args)
+        filters = {
+            'status': status,
+            'did': device_id,
+            'room_id': room_id,
+            'time_from': parse_time_arg(request.args, 'from'),
+            'time_to': parse_time_arg(request.args, 'to')
+        }
+        if user_role == '管理员':
+            # 管理员可以查看所有预约
+            filters['uid'] = request.args.get('uid', type=int)
+            if device_id:
+                reservations = Reservation.find_reservations(limit=limit, cursor=cursor, **filters)
+            else:
+                # 获取详细预约信息（包含用户名和设备名）
+                reservations_data = Reservation.get_detailed_reservations(limit, cursor, **filters)
+                return jsonify({
+                    'status': 'success',
+                    'reservations': reservations_data,
+                    'next_cursor': next_cursor(reservations_data, limit, 'res_id', 'start_time')
+                })
         else:
-            # 获取详细预约信息（包含用户名和设备名）
-            reservations_data = Reservation.get_detailed_reservations()
-            
-            # 如果有状态过滤
-            if status:
-                reservations_data = [r for r in reservations_data if r['status'] == status]
-                
-            return jsonify({'status': 'success', 'reservations': reservations_data})
-    else:
-        # 普通用户只能查看自己的预约
-        reservations = Reservation.get_by_user(user_id)
-    
-    # 如果有状态过滤
-    if status and isinstance(reservations, list):
-        reservations = [r for r in reservations if r.status == status]
-    
-    # 转换为JSON格式
-    reservations_data = []
-    for res in reservations:
-        reservations_data.append({
-            'res_id': res.res_id,
-            'uid': res.uid,
-            'did': res.did,
-            'start_time': res.start_time.strftime('%Y-%m-%d %H:%M:%S') if isinstance(res.start_time, datetime) else res.start_time,
-            'end_time': res.end_time.strftime('%Y-%m-%d %H:%M:%S') if isinstance(res.end_time, datetime) else res.end_time,
-            'status': res.status
-        })
-    
-    return jsonify({'status': 'success', 'reservations': reservations_data})
+            # 普通用户只能查看自己的预约
+            reservations = Reservation.find_reservations(uid=user_id, limit=limit, cursor=cursor, **filters)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    # 模型对象列表由 JSON provider 直接按字段序列化（时间格式统一处理）
+    return jsonify({
+        'status': 'success',
+        'reservations': reservations,
+        'next_cursor': next_cursor(reservations, limit, 'res_id', 'start_time')
+    })
+
+@reservation_bp.route('/reservations/export', methods=['GET'])
+@login_required(role='管理员')
+def export_reservations():
+    """
+    流式导出预约记录（仅管理员）
+    过滤参数与预约列表一致（status、did、uid、room_id、from、to），
+    format=csv|jsonl，gzip=1 时使用 gzip 压缩
+    """
+    try:
+        fmt, use_gzip = parse_export_args(request.args)
+        rows = Reservation.stream_reservations(
+            status=request.args.get('status'),
+            did=request.args.get('did', type=int),
+            uid=request.args.get('uid', type=int),
+            room_id=request.args.get('room_id', type=int),
+            time_from=parse_time_arg(request.args, 'from'),
+            time_to=parse_time_arg(request.args, 'to')
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    return export_response(rows, Reservation.EXPORT_COLUMNS, fmt, 'reservations', use_gzip)
 
 @reservation_bp.route('/reservations/pending', methods=['GET'])
 @login_required(role='教师')
@@ -74,6 +109,100 @@ def get_pending_reviews():
     pending_reviews = Reservation.get_pending_reviews()
     return jsonify({'status': 'success', 'pending_reviews': pending_reviews})
 
+@reservation_bp.route('/reservations/availability', methods=['GET'])
+@login_required()
+def get_availability():
+    """
+    查询空闲时段：按设备类型或机房筛选设备，返回每个设备在时间窗口内最早的若干个空闲时段
+    参数：type、room_id（至少一个）、time_from、time_to、duration（分钟）、limit（每个设备的时段数）
+    """
+    device_type = request.args.get('type')
+    room_id = request.args.get('room_id', type=int)
+    if not device_type and room_id is None:
+        return jsonify({'status': 'error', 'message': '请指定设备类型 type 或机房 room_id'}), 400
+    
+    duration = request.args.get('duration', type=int)
+    if not duration or duration <= 0 or duration > 24 * 60:
+        return jsonify({'status': 'error', 'message': 'duration 必须为 1-1440 之间的分钟数'}), 400
+    limit = request.args.get('limit', 3, type=int)
+    if limit <= 0 or limit > AVAILABILITY_MAX_SLOTS:
+        return jsonify({'status': 'error', 'message': f'limit 必须为 1-{AVAILABILITY_MAX_SLOTS} 之间的整数'}), 400
+    
+    try:
+        time_from = parse_time_arg(request.args, 'time_from') or datetime.now().replace(microsecond=0)
+        time_to = parse_time_arg(request.args, 'time_to') or time_from + timedelta(days=AVAILABILITY_DEFAULT_DAYS)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    if time_to <= time_from:
+        return jsonify({'status': 'error', 'message': '结束时间必须晚于开始时间'}), 400
+    if time_to - time_from > timedelta(days=AVAILABILITY_MAX_DAYS):
+        return jsonify({'status': 'error', 'message': f'时间范围不能超过 {AVAILABILITY_MAX_DAYS} 天'}), 400
+    
+    availability = Reservation.find_availability(
+        time_from, time_to, timedelta(minutes=duration),
+        device_type=device_type, room_id=room_id, limit=limit
+    )
+    if availability is None:
+        return jsonify({'status': 'error', 'message': '空闲时段查询失败'}), 500
+    return jsonify({'status': 'success', 'availability': availability})
+
+@reservation_bp.route('/reservations/review', methods=['POST'])
+@login_required(role='教师')
+def batch_review_reservations():
+    """
+    批量审核预约（仅教师）
+    请求体：{"items": [{"res_id": 1, "status": "已确认"}, {"res_id": 2, "status": "已取消"}]}
+    或：{"res_ids": [1, 2, 3], "status": "已确认"}
+    同一设备上批准的预约按请求中的顺序检查冲突，与前面已批准的预约冲突的会被拒绝
+    """
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'status': 'error', 'message': '请求数据格式错误'}), 400
+    
+    if 'items' in data:
+        items = data['items']
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return jsonify({'status': 'error', 'message': 'items 格式错误'}), 400
+        decisions = [(item.get('res_id'), item.get('status')) for item in items]
+    else:
+        res_ids = data.get('res_ids')
+        if not isinstance(res_ids, list):
+            return jsonify({'status': 'error', 'message': '缺少预约ID列表: res_ids'}), 400
+        decisions = [(res_id, data.get('status')) for res_id in res_ids]
+    
+    if not decisions:
+        return jsonify({'status': 'error', 'message': '审核列表为空'}), 400
+    if len(decisions) > MAX_REVIEW_ITEMS:
+        return jsonify({'status': 'error', 'message': f'单次最多审核 {MAX_REVIEW_ITEMS} 条预约'}), 400
+    for res_id, new_status in decisions:
+        if not isinstance(res_id, int) or isinstance(res_id, bool):
+            return jsonify({'status': 'error', 'message': '预约ID必须为整数'}), 400
+        if new_status not in ('已确认', '已取消'):
+            return jsonify({'status': 'error', 'message': '教师只能确认或取消预约'}), 400
+    
+    results = Reservation.batch_review(decisions)
+    if results is None:
+        return jsonify({'status': 'error', 'message': '批量审核失败'}), 500
+    
+    succeeded = [item for item in results if item['status'] == 'success']
+    if succeeded:
+        approved = [str(item['res_id']) for item in succeeded if item['new_status'] == '已确认']
+        rejected = [str(item['res_id']) for item in succeeded if item['new_status'] == '已取消']
+        AuditLog.add_log(
+            user_id=session.get('user_id'),
+            action='UPDATE',
+            target_table='reservations',
+            sql_text=f'批量审核预约: 确认 {",".join(approved) or "-"}; 取消 {",".join(rejected) or "-"}; '
+                     f'失败 {len(results) - len(succeeded)} 条',
+            ip_address=request.remote_addr
+        )
+    return jsonify({
+        'status': 'success',
+        'succeeded': len(succeeded),
+        'failed': len(results) - len(succeeded),
+        'results': results
+    })
+
 @reservation_bp.route('/reservations/<int:res_id>', methods=['GET'])
 @login_required()
 def get_reservation(res_id):
@@ -93,17 +222,7 @@ def get_reservation(res_id):
     if user_role != '管理员' and reservation.uid != user_id:
         return jsonify({'status': 'error', 'message': '无权查看此预约记录'}), 403
     
-    return jsonify({
-        'status': 'success',
-        'reservation': {
-            'res_id': reservation.res_id,
-            'uid': reservation.uid,
-            'did': reservation.did,
-            'start_time': reservation.start_time.strftime('%Y-%m-%d %H:%M:%S') if isinstance(reservation.start_time, datetime) else reservation.start_time,
-            'end_time': reservation.end_time.strftime('%Y-%m-%d %H:%M:%S') if isinstance(reservation.end_time, datetime) else reservation.end_time,
-            'status': reservation.status
-        }
-    })
+    return jsonify({'status': 'success', 'reservation': reservation})
 
 @reservation_bp.route('/reservations', methods=['POST'])
 @login_required()
@@ -119,15 +238,6 @@ def create_reservation():
         if field not in data:
             return jsonify({'status': 'error', 'message': f'缺少必填字段: {field}'}), 400
     
-    # 验证设备是否存在
-    device = Device.get_by_id(data['did'])
-    if not device:
-        return jsonify({'status': 'error', 'message': '设备不存在'}), 400
-    
-    # 验证设备是否可用
-    if device.status != '空闲':
-        return jsonify({'status': 'error', 'message': '设备当前不可用'}), 400
-    
     # 解析时间
     try:
         start_time = datetime.strptime(data['start_time'], '%Y-%m-%d %H:%M:%S')
@@ -152,13 +262,9 @@ def create_reservation():
         status='待审核'
     )
     
-    # 检查时间冲突
-    if Reservation.check_conflict(data['did'], start_time, end_time):
-        return jsonify({'status': 'error', 'message': '预约时间与已有预约冲突'}), 400
-    
-    # 使用存储过程创建预约（包含冲突检查）
+    # 原子预约：锁定设备行后校验设备状态并只做一次冲突检查
     try:
-        if reservation.create_with_conflict_check():
+        if reservation.book():
             # 记录审计日志
             AuditLog.add_log(
                 user_id=user_id,
@@ -170,6 +276,8 @@ def create_reservation():
             return jsonify({'status': 'success', 'message': '预约创建成功，等待审核'})
         else:
             return jsonify({'status': 'error', 'message': '预约创建失败'}), 500
+    except BookingError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'预约创建失败: {str(e)}'}), 500
 
@@ -208,8 +316,13 @@ def update_reservation_status(res_id):
         if new_status not in ['已确认', '已取消']:
             return jsonify({'status': 'error', 'message': '教师只能确认或取消预约'}), 403
     
-    # 更新预约状态
-    if reservation.update_status(new_status):
+    # 更新预约状态（确认时在设备行锁内检查冲突）
+    try:
+        updated = reservation.update_status(new_status)
+    except BookingError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    if updated:
         # 记录审计日志
         AuditLog.add_log(
             user_id=user_id,
@@ -9,27 +9,19 @@ from flask import Blueprint, request, jsonify, session
 from app.models.room import Room
 from app.models.audit_log import AuditLog
 from app.controllers.auth_controller import login_required
+from app.utils.etag import conditional
 
 room_bp = Blueprint('room', __name__)
 
 @room_bp.route('/', methods=['GET'])
 @login_required()
+@conditional('rooms')
 def get_rooms():
     """
     获取所有机房
     """
     rooms = Room.get_all_rooms()
-    rooms_data = []
-    
-    for room in rooms:
-        rooms_data.append({
-            'rid': room.rid,
-            'location': room.location,
-            'capacity': room.capacity,
-            'open_time': room.open_time
-        })
-    
-    return jsonify({'status': 'success', 'rooms': rooms_data})
+    return jsonify({'status': 'success', 'rooms': rooms})
 
 @room_bp.route('/rooms/<int:rid>', methods=['GET'])
 @login_required()
@@ -41,15 +33,7 @@ def get_room(rid):
     if not room:
         return jsonify({'status': 'error', 'message': '机房不存在'}), 404
     
-    return jsonify({
-        'status': 'success',
-        'room': {
-            'rid': room.rid,
-            'location': room.location,
-            'capacity': room.capacity,
-            'open_time': room.open_time
-        }
-    })
+    return jsonify({'status': 'success', 'room': room})
 
 @room_bp.route('/rooms', methods=['POST'])
 @login_required(role='管理员')
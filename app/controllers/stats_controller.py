@@ -5,14 +5,27 @@
 统计分析控制器
 """
 
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
 from app.models.statistics import Statistics
 from app.controllers.auth_controller import login_required
+from app.utils.cache import cached_call, get_cache
+from app.utils.parallel import get_query_timings
+from app.utils.audit_writer import get_writer
+from app.utils.principal_cache import get_principal_cache
+from app.utils.interval_index import get_timeline_index
+from app.utils.rate_limit import get_limiter
+from app.utils.stage_timer import login_timings
+from app.utils.passwords import get_hasher
+from app.utils.etag import conditional
 
 stats_bp = Blueprint('stats', __name__)
 
+# 仪表盘数据依赖的表，任一表被写入后仪表盘缓存失效
+DASHBOARD_TABLES = ('devices', 'reservations', 'maintenances', 'users')
+
 @stats_bp.route('/device_usage', methods=['GET'])
 @login_required()
+@conditional('devices', 'reservations')
 def get_device_usage_stats():
     """
     获取设备使用率统计
@@ -22,6 +35,7 @@ def get_device_usage_stats():
 
 @stats_bp.route('/room_usage', methods=['GET'])
 @login_required()
+@conditional('rooms', 'devices', 'reservations')
 def get_room_usage_stats():
     """
     获取机房使用率统计
@@ -31,6 +45,7 @@ def get_room_usage_stats():
 
 @stats_bp.route('/user_role', methods=['GET'])
 @login_required(role='管理员')
+@conditional('users', 'reservations')
 def get_user_role_stats():
     """
     按角色统计设备使用率（仅管理员）
@@ -40,6 +55,7 @@ def get_user_role_stats():
 
 @stats_bp.route('/maintenance', methods=['GET'])
 @login_required(role='管理员')
+@conditional('maintenances', 'devices')
 def get_maintenance_stats():
     """
     获取维护统计数据（仅管理员）
@@ -49,6 +65,7 @@ def get_maintenance_stats():
 
 @stats_bp.route('/monthly_usage', methods=['GET'])
 @login_required(role='管理员')
+@conditional('reservations')
 def get_monthly_usage_trend():
     """
     获取月度使用趋势（仅管理员）
@@ -58,6 +75,7 @@ def get_monthly_usage_trend():
 
 @stats_bp.route('/device_status', methods=['GET'])
 @login_required()
+@conditional('devices')
 def get_device_status_summary():
     """
     获取设备状态汇总
@@ -67,6 +85,7 @@ def get_device_status_summary():
 
 @stats_bp.route('/reservation_status', methods=['GET'])
 @login_required()
+@conditional('reservations')
 def get_reservation_status_summary():
     """
     获取预约状态汇总
@@ -76,27 +95,63 @@ def get_reservation_status_summary():
 
 @stats_bp.route('/dashboard', methods=['GET'])
 @login_required()
+@conditional(*DASHBOARD_TABLES)
 def get_dashboard_stats():
     """
     获取仪表盘统计数据
     """
     user_role = session.get('user_role')
     
-    # 基础统计数据（所有角色可见）
-    device_status = Statistics.get_device_status_summary()
-    reservation_status = Statistics.get_reservation_status_summary()
-    
-    dashboard_data = {
-        'device_status': device_status,
-        'reservation_status': reservation_status
-    }
-    
-    # 管理员可见的高级统计数据
-    if user_role == '管理员':
-        dashboard_data.update({
-            'user_role_stats': Statistics.get_user_role_stats(),
-            'maintenance_stats': Statistics.get_maintenance_stats(),
-            'monthly_usage_trend': Statistics.get_monthly_usage_trend()
-        })
+    # 按角色缓存，缓存在TTL到期或相关表被写入后失效
+    dashboard_data = cached_call(
+        f'dashboard:{user_role}',
+        DASHBOARD_TABLES,
+        current_app.config['DASHBOARD_CACHE_TTL'],
+        lambda: Statistics.get_dashboard_stats(user_role == '管理员')
+    )
     
     return jsonify({'status': 'success', 'dashboard': dashboard_data})
+
+@stats_bp.route('/cache', methods=['GET'])
+@login_required(role='管理员')
+def get_cache_stats():
+    """
+    获取缓存命中/未命中统计（仅管理员）
+    """
+    timeline_index = get_timeline_index()
+    return jsonify({
+        'status': 'success',
+        'cache_stats': get_cache().stats(),
+        'principal_cache_stats': get_principal_cache().stats(),
+        'timeline_index_stats': timeline_index.stats() if timeline_index is not None else None
+    })
+
+@stats_bp.route('/query_timings', methods=['GET'])
+@login_required(role='管理员')
+def get_query_timing_stats():
+    """
+    获取统计查询的耗时记录（仅管理员）
+    """
+    return jsonify({'status': 'success', 'query_timings': get_query_timings()})
+
+@stats_bp.route('/audit_writer', methods=['GET'])
+@login_required(role='管理员')
+def get_audit_writer_stats():
+    """
+    获取审计日志异步写入的队列与批量写入统计（仅管理员）
+    """
+    writer = get_writer()
+    return jsonify({'status': 'success', 'audit_writer_stats': writer.stats() if writer else None})
+
+@stats_bp.route('/login', methods=['GET'])
+@login_required(role='管理员')
+def get_login_stats():
+    """
+    获取登录流程各阶段耗时、结果计数和限流状态（仅管理员）
+    """
+    return jsonify({
+        'status': 'success',
+        'login_timings': login_timings.stats(),
+        'password_hasher': get_hasher().stats(),
+        'rate_limits': {name: get_limiter(name).stats() for name in ('login_ip', 'login_code')}
+    })
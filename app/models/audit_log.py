@@ -5,9 +5,24 @@
 审计日志模型
 """
 
-from app.utils.db_config import execute_query, execute_update
+import re
+from datetime import date, datetime
+
+from pymysql.cursors import SSDictCursor
+
+from app.utils.db_config import execute_query, execute_query_rows, execute_update, get_connection_pool, stream_query
+from app.utils.pagination import paginate_query
+from app.utils.query_filter import QueryFilter
+from app.utils.audit_writer import get_writer
+from app.utils.db_session import get_current_session
+from app.utils import audit_archive
+
+# 分区名只允许字母、数字和下划线，拼接到 DDL 前校验
+_PARTITION_NAME = re.compile(r'^p\w+$')
 
 class AuditLog:
+    __slots__ = ('log_id', 'user_id', 'action', 'target_table', 'sql_text', 'ip_address', 'action_time')
+    
     def __init__(self, log_id=None, user_id=None, action=None, target_table=None, sql_text=None, ip_address=None, action_time=None):
         self.log_id = log_id
         self.user_id = user_id
@@ -18,48 +33,70 @@ class AuditLog:
         self.action_time = action_time
     
     @staticmethod
-    def get_all_logs():
+    def get_all_logs(limit=None, cursor=None):
         """
         获取所有审计日志
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (action_time, log_id)
         :return: 审计日志列表
         """
-        query = "SELECT * FROM audit_log ORDER BY action_time DESC"
-        return execute_query(query)
+        query, params = paginate_query(
+            "SELECT * FROM audit_log", [], [],
+            limit, cursor, 'log_id', sort_column='action_time'
+        )
+        return execute_query_rows(query, params)
     
     @staticmethod
-    def get_logs_by_user(user_id):
+    def get_logs_by_user(user_id, limit=None, cursor=None):
         """
         获取指定用户的审计日志
         :param user_id: 用户ID
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (action_time, log_id)
         :return: 审计日志列表
         """
-        query = "SELECT * FROM audit_log WHERE user_id = %s ORDER BY action_time DESC"
-        return execute_query(query, (user_id,))
+        query, params = paginate_query(
+            "SELECT * FROM audit_log", ["user_id = %s"], [user_id],
+            limit, cursor, 'log_id', sort_column='action_time'
+        )
+        return execute_query_rows(query, params)
     
     @staticmethod
-    def get_logs_by_action(action):
+    def get_logs_by_action(action, limit=None, cursor=None):
         """
         获取指定操作类型的审计日志
         :param action: 操作类型
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (action_time, log_id)
         :return: 审计日志列表
         """
-        query = "SELECT * FROM audit_log WHERE action = %s ORDER BY action_time DESC"
-        return execute_query(query, (action,))
+        query, params = paginate_query(
+            "SELECT * FROM audit_log", ["action = %s"], [action],
+            limit, cursor, 'log_id', sort_column='action_time'
+        )
+        return execute_query_rows(query, params)
     
     @staticmethod
-    def get_logs_by_table(target_table):
+    def get_logs_by_table(target_table, limit=None, cursor=None):
         """
         获取指定表的审计日志
         :param target_table: 目标表
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (action_time, log_id)
         :return: 审计日志列表
         """
-        query = "SELECT * FROM audit_log WHERE target_table = %s ORDER BY action_time DESC"
-        return execute_query(query, (target_table,))
+        query, params = paginate_query(
+            "SELECT * FROM audit_log", ["target_table = %s"], [target_table],
+            limit, cursor, 'log_id', sort_column='action_time'
+        )
+        return execute_query_rows(query, params)
     
     @staticmethod
     def add_log(user_id, action, target_table, sql_text, ip_address=None):
         """
         添加审计日志
+        启用异步写入时只放入内存队列，由后台线程批量写入；
+        在请求级事务中，请求的事务提交后才入队，回滚时丢弃（与同步写入时一致）
         :param user_id: 用户ID
         :param action: 操作类型
         :param target_table: 目标表
@@ -67,6 +104,18 @@ class AuditLog:
         :param ip_address: IP地址
         :return: 成功返回True，失败返回False
         """
+        writer = get_writer()
+        if writer is not None:
+            # 操作时间在调用时确定，而不是提交后入队时
+            action_time = datetime.now().replace(microsecond=0)
+            db_session = get_current_session()
+            if db_session is not None:
+                db_session.after_commit(
+                    lambda: writer.enqueue(user_id, action, target_table, sql_text, ip_address, action_time)
+                )
+                return True
+            return writer.enqueue(user_id, action, target_table, sql_text, ip_address, action_time)
+        
         query = """
             INSERT INTO audit_log (user_id, action, target_table, sql_text, ip_address)
             VALUES (%s, %s, %s, %s, %s)
@@ -75,15 +124,182 @@ class AuditLog:
         return execute_update(query, params) > 0
     
     @staticmethod
-    def get_detailed_logs():
+    def insert_batch(entries):
+        """
+        批量写入审计日志（多行 INSERT，单独的连接和事务，不参与请求级事务）
+        :param entries: [(user_id, action, target_table, sql_text, ip_address, action_time)]
+        :return: 成功返回True，失败返回False
+        """
+        if not entries:
+            return True
+        query = """
+            INSERT INTO audit_log (user_id, action, target_table, sql_text, ip_address, action_time)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        try:
+            with get_connection_pool().connection() as connection:
+                with connection.cursor() as cursor:
+                    # pymysql 会把 INSERT ... VALUES 的 executemany 改写为一条多行 INSERT
+                    cursor.executemany(query, entries)
+                connection.commit()
+            return True
+        except Exception as e:
+            print(f"审计日志批量写入失败: {e}")
+            return False
+    
+    @staticmethod
+    def get_detailed_logs(limit=None, cursor=None):
         """
         获取详细的审计日志（包含用户名）
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (action_time, log_id)
         :return: 审计日志详情列表
         """
-        query = """
+        base_query = """
             SELECT a.*, u.uname
             FROM audit_log a
             JOIN users u ON a.user_id = u.uid
-            ORDER BY a.action_time DESC
         """
-        return execute_query(query)
+        query, params = paginate_query(
+            base_query, [], [], limit, cursor, 'a.log_id', sort_column='a.action_time'
+        )
+        return execute_query_rows(query, params)
+    
+    # 导出的列
+    EXPORT_COLUMNS = ['log_id', 'action_time', 'user_id', 'uname', 'action', 'target_table', 'sql_text', 'ip_address']
+    
+    @staticmethod
+    def stream_logs(user_id=None, action=None, target_table=None, time_from=None, time_to=None):
+        """
+        按条件流式读取审计日志（用于导出），过滤条件与 get_logs_by_* 一致，按时间升序
+        :param user_id: 用户ID
+        :param action: 操作类型
+        :param target_table: 目标表
+        :param time_from: 起始时间（包含）
+        :param time_to: 结束时间（不包含）
+        :return: 逐行产出日志字典的生成器
+        """
+        query_filter = (QueryFilter()
+                        .eq('a.user_id', user_id)
+                        .eq('a.action', action)
+                        .eq('a.target_table', target_table)
+                        .ge('a.action_time', time_from)
+                        .lt('a.action_time', time_to))
+        where, params = query_filter.where_clause()
+        query = f"""
+            SELECT a.*, u.uname
+            FROM audit_log a
+            LEFT JOIN users u ON a.user_id = u.uid
+            {where}
+            ORDER BY a.action_time, a.log_id
+        """
+        return stream_query(query, params)
+    
+    @staticmethod
+    def list_partitions():
+        """
+        获取 audit_log 的分区信息
+        :return: [{'name', 'upper_bound', 'rows'}] 列表，upper_bound 为分区上界日期（MAXVALUE 分区为None）
+        """
+        query = """
+            SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS description, TABLE_ROWS AS table_rows
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'audit_log' AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+        """
+        partitions = []
+        for row in execute_query(query) or []:
+            description = row['description']
+            # 分区表达式为 TO_DAYS(action_time)，TO_DAYS(d) = d.toordinal() + 365
+            upper_bound = None if description == 'MAXVALUE' else date.fromordinal(int(description) - 365)
+            partitions.append({'name': row['name'], 'upper_bound': upper_bound, 'rows': row['table_rows']})
+        return partitions
+    
+    @staticmethod
+    def ensure_partitions(months_ahead=3):
+        """
+        从 p_future 中拆分出未来几个月的按月分区，保证新日志落在按月分区中
+        DDL 会隐式提交事务，使用单独的连接执行，不加入请求级事务
+        :param months_ahead: 提前创建的月数
+        :return: 新建的分区名列表
+        """
+        partitions = AuditLog.list_partitions()
+        bounds = [p['upper_bound'] for p in partitions if p['upper_bound'] is not None]
+        if not partitions or partitions[-1]['upper_bound'] is not None:
+            print("audit_log 未按月分区或缺少 MAXVALUE 分区")
+            return []
+        
+        today = date.today()
+        last = max(bounds) if bounds else date(today.year, today.month, 1)
+        month_index = today.year * 12 + today.month - 1 + months_ahead
+        target = date(month_index // 12, month_index % 12 + 1, 1)
+        
+        definitions, created = [], []
+        while last <= target:
+            upper = date(last.year + 1, 1, 1) if last.month == 12 else date(last.year, last.month + 1, 1)
+            name = f"p{last.year:04d}{last.month:02d}"
+            definitions.append(f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{upper.isoformat()}'))")
+            created.append(name)
+            last = upper
+        if not definitions:
+            return []
+        
+        definitions.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+        query = f"ALTER TABLE audit_log REORGANIZE PARTITION p_future INTO ({', '.join(definitions)})"
+        try:
+            with get_connection_pool().connection() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(query)
+        except Exception as e:
+            print(f"创建 audit_log 分区失败: {e}")
+            return []
+        return created
+    
+    @staticmethod
+    def archive_cold_partitions(keep_months=6, archive_dir=None):
+        """
+        归档冷分区：上界早于 keep_months 个月前月初的分区导出为 gzip JSONL 文件后删除
+        导出使用流式游标，不会把整个分区读入内存；文件写完后才删除分区
+        :param keep_months: 保留在数据库中的月数
+        :param archive_dir: 归档目录
+        :return: [{'partition', 'path', 'rows'}] 已归档的分区
+        """
+        today = date.today()
+        month_index = today.year * 12 + today.month - 1 - keep_months
+        cutoff = date(month_index // 12, month_index % 12 + 1, 1)
+        
+        archived = []
+        for partition in AuditLog.list_partitions():
+            name = partition['name']
+            if partition['upper_bound'] is None or partition['upper_bound'] > cutoff:
+                continue
+            if not _PARTITION_NAME.match(name):
+                print(f"跳过无效的分区名: {name}")
+                continue
+            try:
+                with get_connection_pool().connection() as connection:
+                    with connection.cursor(SSDictCursor) as cursor:
+                        cursor.execute(f"SELECT * FROM audit_log PARTITION ({name}) ORDER BY action_time, log_id")
+                        path, count = audit_archive.write_archive(name, cursor, archive_dir)
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"ALTER TABLE audit_log DROP PARTITION {name}")
+            except Exception as e:
+                print(f"归档分区 {name} 失败: {e}")
+                break
+            archived.append({'partition': name, 'path': path, 'rows': count})
+        return archived
+    
+    @staticmethod
+    def search_archived_logs(user_id=None, action=None, target_table=None, time_from=None, time_to=None,
+                             limit=None, archive_dir=None):
+        """
+        检索已归档的审计日志
+        :param user_id: 用户ID
+        :param action: 操作类型
+        :param target_table: 目标表
+        :param time_from: 起始时间（包含）
+        :param time_to: 结束时间（不包含）
+        :param limit: 最多返回条数
+        :return: 审计日志列表
+        """
+        return audit_archive.search_archives(user_id, action, target_table, time_from, time_to, limit, archive_dir)
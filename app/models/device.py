@@ -5,9 +5,24 @@
 设备模型
 """
 
-from app.utils.db_config import execute_query, execute_update
+from app.utils.db_config import execute_query_rows, execute_update, transaction
+from app.utils.cache import touch_tables
+from app.utils.events import emit
+from app.models.statistics import Statistics
+from app.models.room import Room
+from app.utils.pagination import paginate_query
+from app.utils.query_filter import QueryFilter
+from app.utils.mapper import Mapper
+
+# 设备状态（与 devices.status 的 ENUM 一致）
+DEVICE_STATUSES = ('空闲', '使用中', '维护中')
+
+# 批量写入时每条多行 INSERT / IN 列表包含的最大行数
+BULK_CHUNK_SIZE = 500
 
 class Device:
+    __slots__ = ('did', 'dname', 'type', 'spec', 'status', 'room_id')
+    
     def __init__(self, did=None, dname=None, type=None, spec=None, status=None, room_id=None):
         self.did = did
         self.dname = dname
@@ -23,85 +38,57 @@ class Device:
         :param did: 设备ID
         :return: 设备对象
         """
-        query = "SELECT * FROM devices WHERE did = %s"
-        device_data = execute_query(query, (did,), fetch_one=True)
-        if device_data:
-            return Device(
-                did=device_data['did'],
-                dname=device_data['dname'],
-                type=device_data['type'],
-                spec=device_data['spec'],
-                status=device_data['status'],
-                room_id=device_data['room_id']
-            )
-        return None
+        query = f"SELECT {_mapper.columns} FROM devices WHERE did = %s"
+        return _mapper.fetch_one(query, (did,))
+    
+    @staticmethod
+    def find_devices(status=None, room_id=None, limit=None, cursor=None, device_type=None):
+        """
+        按任意组合的条件查询设备（条件在SQL中过滤）
+        :param status: 设备状态
+        :param room_id: 机房ID
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (did)
+        :param device_type: 设备类型
+        :return: 设备列表
+        """
+        query_filter = QueryFilter().eq('status', status).eq('room_id', room_id).eq('type', device_type)
+        query, params = paginate_query(
+            f"SELECT {_mapper.columns} FROM devices", query_filter.conditions, query_filter.params,
+            limit, cursor, 'did', descending=False
+        )
+        return _mapper.fetch_all(query, params)
     
     @staticmethod
-    def get_all_devices():
+    def get_all_devices(limit=None, cursor=None):
         """
         获取所有设备
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (did)
         :return: 设备列表
         """
-        query = "SELECT * FROM devices"
-        devices_data = execute_query(query)
-        devices = []
-        
-        if devices_data:
-            for device_data in devices_data:
-                devices.append(Device(
-                    did=device_data['did'],
-                    dname=device_data['dname'],
-                    type=device_data['type'],
-                    spec=device_data['spec'],
-                    status=device_data['status'],
-                    room_id=device_data['room_id']
-                ))
-        return devices
+        return Device.find_devices(limit=limit, cursor=cursor)
     
     @staticmethod
-    def get_devices_by_room(room_id):
+    def get_devices_by_room(room_id, limit=None, cursor=None):
         """
         根据机房ID获取设备
         :param room_id: 机房ID
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (did)
         :return: 设备列表
         """
-        query = "SELECT * FROM devices WHERE room_id = %s"
-        devices_data = execute_query(query, (room_id,))
-        devices = []
-        
-        if devices_data:
-            for device_data in devices_data:
-                devices.append(Device(
-                    did=device_data['did'],
-                    dname=device_data['dname'],
-                    type=device_data['type'],
-                    spec=device_data['spec'],
-                    status=device_data['status'],
-                    room_id=device_data['room_id']
-                ))
-        return devices
+        return Device.find_devices(room_id=room_id, limit=limit, cursor=cursor)
     
     @staticmethod
-    def get_available_devices():
+    def get_available_devices(limit=None, cursor=None):
         """
         获取所有空闲设备
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (did)
         :return: 设备列表
         """
-        query = "SELECT * FROM devices WHERE status = '空闲'"
-        devices_data = execute_query(query)
-        devices = []
-        
-        if devices_data:
-            for device_data in devices_data:
-                devices.append(Device(
-                    did=device_data['did'],
-                    dname=device_data['dname'],
-                    type=device_data['type'],
-                    spec=device_data['spec'],
-                    status=device_data['status'],
-                    room_id=device_data['room_id']
-                ))
-        return devices
+        return Device.find_devices(status='空闲', limit=limit, cursor=cursor)
     
     @staticmethod
     def get_device_details():
@@ -110,7 +97,7 @@ class Device:
         :return: 设备详情列表
         """
         query = "SELECT * FROM device_details"
-        return execute_query(query)
+        return execute_query_rows(query)
     
     def save(self):
         """
@@ -125,7 +112,8 @@ class Device:
                 WHERE did = %s
             """
             params = (self.dname, self.type, self.spec, self.status, self.room_id, self.did)
-            return execute_update(query, params) > 0
+            result = execute_update(query, params) > 0
+            event_type = 'device.updated'
         else:
             # 新增设备
             query = """
@@ -133,7 +121,160 @@ class Device:
                 VALUES (%s, %s, %s, %s, %s)
             """
             params = (self.dname, self.type, self.spec, self.status, self.room_id)
-            return execute_update(query, params) > 0
+            try:
+                with transaction() as connection:
+                    with connection.cursor() as cursor:
+                        cursor.execute(query, params)
+                        self.did = cursor.lastrowid
+                result = True
+            except Exception as e:
+                print(f"设备创建失败: {e}")
+                result = False
+            event_type = 'device.created'
+        
+        if result:
+            touch_tables('devices')
+            emit(event_type, did=self.did, dname=self.dname, status=self.status, room_id=self.room_id)
+        return result
+    
+    @staticmethod
+    def _consecutive_autoinc(cursor):
+        """
+        多行INSERT是否分配连续的自增ID：
+        auto_increment_increment 为 1（Galera/多主复制会改为大于 1），
+        且 innodb_autoinc_lock_mode 不是 2（交错模式，MySQL 8 的默认值，并发插入时ID可能交错）
+        :return: 连续返回True
+        """
+        cursor.execute("SELECT @@auto_increment_increment AS increment, @@innodb_autoinc_lock_mode AS lock_mode")
+        row = cursor.fetchone()
+        return int(row['increment']) == 1 and int(row['lock_mode']) < 2
+    
+    @staticmethod
+    def bulk_create(items):
+        """
+        批量创建设备：一次查询校验全部机房ID，在一个事务中写入
+        自增ID保证连续时用多行INSERT，否则逐行INSERT
+        :param items: 设备数据字典列表（dname、type、room_id 必填，spec、status 可选）
+        :return: 逐项结果列表 [{'index', 'status': 'success'/'error', 'did'/'message'}]，数据库错误返回None
+        """
+        existing_rooms = Room.get_existing_ids(
+            item['room_id'] for item in items if isinstance(item, dict) and item.get('room_id') is not None
+        )
+        if existing_rooms is None:
+            return None
+        
+        results = [None] * len(items)
+        devices = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = {'index': index, 'status': 'error', 'message': '设备数据格式错误'}
+                continue
+            missing = [field for field in ('dname', 'type', 'room_id') if not item.get(field)]
+            if missing:
+                results[index] = {'index': index, 'status': 'error', 'message': f'缺少必填字段: {missing[0]}'}
+            elif item.get('status', '空闲') not in DEVICE_STATUSES:
+                results[index] = {'index': index, 'status': 'error', 'message': '设备状态无效'}
+            elif item['room_id'] not in existing_rooms:
+                results[index] = {'index': index, 'status': 'error', 'message': '机房不存在'}
+            else:
+                devices.append((index, Device(dname=item['dname'], type=item['type'], spec=item.get('spec'),
+                                              status=item.get('status', '空闲'), room_id=item['room_id'])))
+        
+        query = "INSERT INTO devices (dname, type, spec, status, room_id) VALUES "
+        try:
+            with transaction() as connection:
+                with connection.cursor() as cursor:
+                    if devices and Device._consecutive_autoinc(cursor):
+                        for start in range(0, len(devices), BULK_CHUNK_SIZE):
+                            chunk = devices[start:start + BULK_CHUNK_SIZE]
+                            params = []
+                            for _, device in chunk:
+                                params.extend((device.dname, device.type, device.spec, device.status, device.room_id))
+                            cursor.execute(query + ', '.join(['(%s, %s, %s, %s, %s)'] * len(chunk)), params)
+                            # 多行INSERT分配连续的自增ID，lastrowid 为第一行的ID
+                            for offset, (_, device) in enumerate(chunk):
+                                device.did = cursor.lastrowid + offset
+                    else:
+                        # 自增ID不保证连续时逐行插入，取每行的 lastrowid
+                        for _, device in devices:
+                            cursor.execute(query + "(%s, %s, %s, %s, %s)",
+                                           (device.dname, device.type, device.spec, device.status, device.room_id))
+                            device.did = cursor.lastrowid
+        except Exception as e:
+            print(f"批量创建设备失败: {e}")
+            return None
+        
+        if devices:
+            touch_tables('devices')
+        for index, device in devices:
+            results[index] = {'index': index, 'status': 'success', 'did': device.did}
+            emit('device.created', did=device.did, dname=device.dname, status=device.status, room_id=device.room_id)
+        return results
+    
+    @staticmethod
+    def _bulk_update(dids, assignment, value, event_type, event_field):
+        """
+        批量更新设备的一个字段：锁定存在的设备行后一条UPDATE写入
+        :param dids: 设备ID列表
+        :param assignment: SET 子句，如 'status = %s'
+        :param value: 新值
+        :param event_type: 每台设备发布的事件类型
+        :param event_field: 事件数据中新值的字段名
+        :return: 逐项结果列表，数据库错误返回None
+        """
+        unique_dids = list(dict.fromkeys(dids))
+        found = set()
+        try:
+            with transaction() as connection:
+                with connection.cursor() as cursor:
+                    for start in range(0, len(unique_dids), BULK_CHUNK_SIZE):
+                        chunk = unique_dids[start:start + BULK_CHUNK_SIZE]
+                        placeholders = ', '.join(['%s'] * len(chunk))
+                        cursor.execute(f"SELECT did FROM devices WHERE did IN ({placeholders}) FOR UPDATE", chunk)
+                        chunk_found = [row['did'] for row in cursor.fetchall()]
+                        if chunk_found:
+                            placeholders = ', '.join(['%s'] * len(chunk_found))
+                            cursor.execute(
+                                f"UPDATE devices SET {assignment} WHERE did IN ({placeholders})",
+                                [value] + chunk_found
+                            )
+                            found.update(chunk_found)
+        except Exception as e:
+            print(f"批量更新设备失败: {e}")
+            return None
+        
+        if found:
+            touch_tables('devices')
+        results = []
+        for index, did in enumerate(dids):
+            if did in found:
+                results.append({'index': index, 'status': 'success', 'did': did})
+            else:
+                results.append({'index': index, 'status': 'error', 'did': did, 'message': '设备不存在'})
+        for did in unique_dids:
+            if did in found:
+                emit(event_type, did=did, **{event_field: value})
+        return results
+    
+    @staticmethod
+    def bulk_update_status(dids, new_status):
+        """
+        批量更新设备状态（一个事务）
+        :param dids: 设备ID列表
+        :param new_status: 新状态
+        :return: 逐项结果列表，数据库错误返回None
+        """
+        return Device._bulk_update(dids, 'status = %s', new_status, 'device.status', 'status')
+    
+    @staticmethod
+    def bulk_move(dids, room_id):
+        """
+        批量把设备迁移到另一个机房（一个事务，机房需由调用方校验）
+        :param dids: 设备ID列表
+        :param room_id: 目标机房ID
+        :return: 逐项结果列表，数据库错误返回None
+        """
+        return Device._bulk_update(dids, 'room_id = %s', room_id, 'device.updated', 'room_id')
     
     def update_status(self, new_status):
         """
@@ -148,7 +289,9 @@ class Device:
         params = (new_status, self.did)
         result = execute_update(query, params) > 0
         if result:
+            touch_tables('devices')
             self.status = new_status
+            emit('device.status', did=self.did, status=new_status)
         return result
     
     def delete(self):
@@ -160,4 +303,14 @@ class Device:
             return False
         
         query = "DELETE FROM devices WHERE did = %s"
-        return execute_update(query, (self.did,)) > 0
+        result = execute_update(query, (self.did,)) > 0
+        if result:
+            touch_tables('devices', 'reservations', 'maintenances')
+            # 级联删除的预约不会触发统计触发器，需要重建统计汇总表
+            Statistics.rebuild_usage_stats()
+            emit('device.deleted', did=self.did)
+        return result
+
+
+# 设备行映射器（元组行按位置构造 Device）
+_mapper = Mapper(Device)
@@ -5,10 +5,18 @@
 维护记录模型
 """
 
-from app.utils.db_config import execute_query, execute_update, call_procedure
+from app.utils.db_config import execute_query_rows, execute_update, transaction
+from app.utils.cache import touch_tables
+from app.utils.events import emit
+from app.utils.pagination import paginate_query
+from app.utils.query_filter import QueryFilter
+from app.utils.mapper import Mapper
+from app.models.reservation import Reservation
 from datetime import datetime
 
 class Maintenance:
+    __slots__ = ('mid', 'did', 'issue', 'report_time', 'handler', 'status', 'complete_time')
+    
     def __init__(self, mid=None, did=None, issue=None, report_time=None, handler=None, status=None, complete_time=None):
         self.mid = mid
         self.did = did
@@ -25,66 +33,62 @@ class Maintenance:
         :param mid: 维护ID
         :return: 维护对象
         """
-        query = "SELECT * FROM maintenances WHERE mid = %s"
-        maint_data = execute_query(query, (mid,), fetch_one=True)
-        if maint_data:
-            return Maintenance(
-                mid=maint_data['mid'],
-                did=maint_data['did'],
-                issue=maint_data['issue'],
-                report_time=maint_data['report_time'],
-                handler=maint_data['handler'],
-                status=maint_data['status'],
-                complete_time=maint_data['complete_time']
-            )
-        return None
+        query = f"SELECT {_mapper.columns} FROM maintenances WHERE mid = %s"
+        return _mapper.fetch_one(query, (mid,))
+    
+    @staticmethod
+    def _build_filter(alias='', status=None, did=None, room_id=None, time_from=None, time_to=None):
+        """
+        构造维护记录查询的过滤条件（时间范围按报修时间判断）
+        """
+        return (QueryFilter()
+                .eq(f'{alias}status', status)
+                .eq(f'{alias}did', did)
+                .in_subquery(f'{alias}did', "SELECT did FROM devices WHERE room_id = %s", room_id)
+                .ge(f'{alias}report_time', time_from)
+                .lt(f'{alias}report_time', time_to))
+    
+    @staticmethod
+    def find_maintenances(status=None, did=None, room_id=None, time_from=None, time_to=None,
+                          limit=None, cursor=None):
+        """
+        按任意组合的条件查询维护记录（条件在SQL中过滤）
+        :param status: 维护状态
+        :param did: 设备ID
+        :param room_id: 机房ID
+        :param time_from: 报修时间起点
+        :param time_to: 报修时间终点
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (report_time, mid)
+        :return: 维护记录列表
+        """
+        query_filter = Maintenance._build_filter('', status, did, room_id, time_from, time_to)
+        query, params = paginate_query(
+            f"SELECT {_mapper.columns} FROM maintenances", query_filter.conditions, query_filter.params,
+            limit, cursor, 'mid', sort_column='report_time'
+        )
+        return _mapper.fetch_all(query, params)
     
     @staticmethod
-    def get_by_device(did):
+    def get_by_device(did, limit=None, cursor=None):
         """
         获取设备的所有维护记录
         :param did: 设备ID
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (report_time, mid)
         :return: 维护记录列表
         """
-        query = "SELECT * FROM maintenances WHERE did = %s ORDER BY report_time DESC"
-        maint_data_list = execute_query(query, (did,))
-        maintenances = []
-        
-        if maint_data_list:
-            for maint_data in maint_data_list:
-                maintenances.append(Maintenance(
-                    mid=maint_data['mid'],
-                    did=maint_data['did'],
-                    issue=maint_data['issue'],
-                    report_time=maint_data['report_time'],
-                    handler=maint_data['handler'],
-                    status=maint_data['status'],
-                    complete_time=maint_data['complete_time']
-                ))
-        return maintenances
+        return Maintenance.find_maintenances(did=did, limit=limit, cursor=cursor)
     
     @staticmethod
-    def get_all_maintenances():
+    def get_all_maintenances(limit=None, cursor=None):
         """
         获取所有维护记录
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (report_time, mid)
         :return: 维护记录列表
         """
-        query = "SELECT * FROM maintenances ORDER BY report_time DESC"
-        maint_data_list = execute_query(query)
-        maintenances = []
-        
-        if maint_data_list:
-            for maint_data in maint_data_list:
-                maintenances.append(Maintenance(
-                    mid=maint_data['mid'],
-                    did=maint_data['did'],
-                    issue=maint_data['issue'],
-                    report_time=maint_data['report_time'],
-                    handler=maint_data['handler'],
-                    status=maint_data['status'],
-                    complete_time=maint_data['complete_time']
-                ))
-        return maintenances
+        return Maintenance.find_maintenances(limit=limit, cursor=cursor)
     
     @staticmethod
     def get_pending_maintenances():
@@ -93,7 +97,7 @@ class Maintenance:
         :return: 维护记录列表
         """
         query = "SELECT * FROM maintenances WHERE status = '待处理' ORDER BY report_time ASC"
-        return execute_query(query)
+        return execute_query_rows(query)
     
     @staticmethod
     def get_overdue_maintenances():
@@ -108,7 +112,7 @@ class Maintenance:
             WHERE m.status = '待处理'
               AND m.report_time < NOW() - INTERVAL 24 HOUR
         """
-        return execute_query(query)
+        return execute_query_rows(query)
     
     def create_with_device_update(self, reporter_id):
         """
@@ -120,11 +124,33 @@ class Maintenance:
             return False  # 已有ID，不应使用此方法
         
         try:
-            call_procedure('ProcessMaintenance', (self.did, self.issue, reporter_id))
-            return True
+            with transaction() as connection:
+                with connection.cursor() as cursor:
+                    # 存储过程会取消的预约（设备未结束的已确认预约），加锁保证与过程中的 UPDATE 一致
+                    cursor.execute("""
+                        SELECT res_id, uid, did, start_time, end_time
+                        FROM reservations
+                        WHERE did = %s AND status = '已确认' AND end_time > NOW()
+                        FOR UPDATE
+                    """, (self.did,))
+                    cancelled = cursor.fetchall()
+                    cursor.callproc('ProcessMaintenance', (self.did, self.issue, reporter_id))
+                    # 读尽存储过程返回的结果集，保证连接可以安全复用
+                    while cursor.nextset():
+                        pass
         except Exception as e:
             print(f"维护记录创建失败: {e}")
             return False
+        
+        touch_tables('maintenances', 'devices', 'reservations')
+        # 存储过程 ProcessMaintenance 同时把设备标记为维护中并取消其后续已确认预约
+        emit('maintenance.created', did=self.did, issue=self.issue, reporter_id=reporter_id)
+        emit('device.status', did=self.did, status='维护中')
+        for row in cancelled:
+            reservation = Reservation(res_id=row['res_id'], uid=row['uid'], did=row['did'],
+                                      start_time=row['start_time'], end_time=row['end_time'], status='已取消')
+            reservation._emit('reservation.status', old_status='已确认')
+        return True
     
     def save(self):
         """
@@ -139,7 +165,8 @@ class Maintenance:
                 WHERE mid = %s
             """
             params = (self.did, self.issue, self.handler, self.status, self.complete_time, self.mid)
-            return execute_update(query, params) > 0
+            result = execute_update(query, params) > 0
+            event_type = 'maintenance.updated'
         else:
             # 新增维护记录
             query = """
@@ -147,7 +174,22 @@ class Maintenance:
                 VALUES (%s, %s, %s, %s, %s)
             """
             params = (self.did, self.issue, self.report_time or datetime.now(), self.handler, self.status or '待处理')
-            return execute_update(query, params) > 0
+            try:
+                with transaction() as connection:
+                    with connection.cursor() as cursor:
+                        cursor.execute(query, params)
+                        self.mid = cursor.lastrowid
+                result = True
+            except Exception as e:
+                print(f"维护记录创建失败: {e}")
+                result = False
+            event_type = 'maintenance.created'
+        
+        if result:
+            touch_tables('maintenances', 'devices')
+            emit(event_type, mid=self.mid, did=self.did, issue=self.issue, handler=self.handler,
+                 status=self.status or '待处理')
+        return result
     
     def update_status(self, new_status, handler=None):
         """
@@ -159,6 +201,7 @@ class Maintenance:
         if not self.mid:
             return False
         
+        old_status = self.status
         query = "UPDATE maintenances SET status = %s"
         params = [new_status]
         
@@ -174,11 +217,17 @@ class Maintenance:
         
         result = execute_update(query, tuple(params)) > 0
         if result:
+            touch_tables('maintenances', 'devices')
             self.status = new_status
             if handler:
                 self.handler = handler
             if new_status == '已完成':
                 self.complete_time = datetime.now()
+            emit('maintenance.status', mid=self.mid, did=self.did, handler=self.handler,
+                 status=new_status, old_status=old_status)
+            # 与触发器 trg_maintenance_complete 一致：维护完成时设备恢复空闲
+            if new_status == '已完成' and old_status != '已完成':
+                emit('device.status', did=self.did, status='空闲')
         return result
     
     def delete(self):
@@ -190,18 +239,38 @@ class Maintenance:
             return False
         
         query = "DELETE FROM maintenances WHERE mid = %s"
-        return execute_update(query, (self.mid,)) > 0
+        result = execute_update(query, (self.mid,)) > 0
+        if result:
+            touch_tables('maintenances')
+            emit('maintenance.deleted', mid=self.mid, did=self.did)
+        return result
     
     @staticmethod
-    def get_detailed_maintenances():
+    def get_detailed_maintenances(limit=None, cursor=None, status=None, did=None, room_id=None,
+                                  time_from=None, time_to=None):
         """
         获取详细的维护信息（包含设备名称）
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (report_time, mid)
+        :param status: 维护状态
+        :param did: 设备ID
+        :param room_id: 机房ID
+        :param time_from: 报修时间起点
+        :param time_to: 报修时间终点
         :return: 维护详情列表
         """
-        query = """
+        base_query = """
             SELECT m.*, d.dname, d.type
             FROM maintenances m
             JOIN devices d ON m.did = d.did
-            ORDER BY m.report_time DESC
         """
-        return execute_query(query)
+        query_filter = Maintenance._build_filter('m.', status, did, room_id, time_from, time_to)
+        query, params = paginate_query(
+            base_query, query_filter.conditions, query_filter.params,
+            limit, cursor, 'm.mid', sort_column='m.report_time'
+        )
+        return execute_query_rows(query, params)
+
+
+# 维护记录行映射器（元组行按位置构造 Maintenance）
+_mapper = Mapper(Maintenance)
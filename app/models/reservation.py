@@ -5,10 +5,24 @@
 预约模型
 """
 
-from app.utils.db_config import execute_query, execute_update, call_procedure
+from app.utils.db_config import execute_query, execute_query_rows, execute_update, transaction, stream_query
+from app.utils.cache import touch_tables
+from app.utils.events import emit
+from app.utils.pagination import paginate_query
+from app.utils.query_filter import QueryFilter
+from app.utils.mapper import Mapper
+from app.utils.interval_index import IntervalTimeline, get_timeline_index
+from app.utils.open_hours import parse_open_time, open_windows
+from app.models.device import Device
+from app.models.room import Room
 from datetime import datetime
 
+class BookingError(Exception):
+    """预约业务校验失败（设备不存在、设备不可用、时间冲突）"""
+
 class Reservation:
+    __slots__ = ('res_id', 'uid', 'did', 'start_time', 'end_time', 'status')
+    
     def __init__(self, res_id=None, uid=None, did=None, start_time=None, end_time=None, status=None):
         self.res_id = res_id
         self.uid = uid
@@ -24,64 +38,66 @@ class Reservation:
         :param res_id: 预约ID
         :return: 预约对象
         """
-        query = "SELECT * FROM reservations WHERE res_id = %s"
-        res_data = execute_query(query, (res_id,), fetch_one=True)
-        if res_data:
-            return Reservation(
-                res_id=res_data['res_id'],
-                uid=res_data['uid'],
-                did=res_data['did'],
-                start_time=res_data['start_time'],
-                end_time=res_data['end_time'],
-                status=res_data['status']
-            )
-        return None
+        query = f"SELECT {_mapper.columns} FROM reservations WHERE res_id = %s"
+        return _mapper.fetch_one(query, (res_id,))
+    
+    @staticmethod
+    def _build_filter(alias='', status=None, did=None, uid=None, room_id=None, time_from=None, time_to=None):
+        """
+        构造预约查询的过滤条件
+        时间范围按区间重叠判断：end_time > time_from AND start_time < time_to
+        """
+        return (QueryFilter()
+                .eq(f'{alias}status', status)
+                .eq(f'{alias}did', did)
+                .eq(f'{alias}uid', uid)
+                .in_subquery(f'{alias}did', "SELECT did FROM devices WHERE room_id = %s", room_id)
+                .gt(f'{alias}end_time', time_from)
+                .lt(f'{alias}start_time', time_to))
     
     @staticmethod
-    def get_by_user(uid):
+    def find_reservations(status=None, did=None, uid=None, room_id=None, time_from=None, time_to=None,
+                          limit=None, cursor=None):
+        """
+        按任意组合的条件查询预约（条件在SQL中过滤）
+        :param status: 预约状态
+        :param did: 设备ID
+        :param uid: 用户ID
+        :param room_id: 机房ID
+        :param time_from: 时间范围起点
+        :param time_to: 时间范围终点
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (start_time, res_id)
+        :return: 预约列表
+        """
+        query_filter = Reservation._build_filter('', status, did, uid, room_id, time_from, time_to)
+        query, params = paginate_query(
+            f"SELECT {_mapper.columns} FROM reservations", query_filter.conditions, query_filter.params,
+            limit, cursor, 'res_id', sort_column='start_time'
+        )
+        return _mapper.fetch_all(query, params)
+    
+    @staticmethod
+    def get_by_user(uid, limit=None, cursor=None):
         """
         获取用户的所有预约
         :param uid: 用户ID
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (start_time, res_id)
         :return: 预约列表
         """
-        query = "SELECT * FROM reservations WHERE uid = %s ORDER BY start_time DESC"
-        res_data_list = execute_query(query, (uid,))
-        reservations = []
-        
-        if res_data_list:
-            for res_data in res_data_list:
-                reservations.append(Reservation(
-                    res_id=res_data['res_id'],
-                    uid=res_data['uid'],
-                    did=res_data['did'],
-                    start_time=res_data['start_time'],
-                    end_time=res_data['end_time'],
-                    status=res_data['status']
-                ))
-        return reservations
+        return Reservation.find_reservations(uid=uid, limit=limit, cursor=cursor)
     
     @staticmethod
-    def get_by_device(did):
+    def get_by_device(did, limit=None, cursor=None):
         """
         获取设备的所有预约
         :param did: 设备ID
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (start_time, res_id)
         :return: 预约列表
         """
-        query = "SELECT * FROM reservations WHERE did = %s ORDER BY start_time DESC"
-        res_data_list = execute_query(query, (did,))
-        reservations = []
-        
-        if res_data_list:
-            for res_data in res_data_list:
-                reservations.append(Reservation(
-                    res_id=res_data['res_id'],
-                    uid=res_data['uid'],
-                    did=res_data['did'],
-                    start_time=res_data['start_time'],
-                    end_time=res_data['end_time'],
-                    status=res_data['status']
-                ))
-        return reservations
+        return Reservation.find_reservations(did=did, limit=limit, cursor=cursor)
     
     @staticmethod
     def get_pending_reviews():
@@ -90,20 +106,142 @@ class Reservation:
         :return: 预约列表
         """
         query = "SELECT * FROM teacher_review"
-        return execute_query(query)
+        return execute_query_rows(query)
     
     @staticmethod
-    def check_conflict(did, start_time, end_time, exclude_res_id=None):
+    def load_confirmed_intervals(dids):
         """
-        检查预约时间是否冲突
-        :param did: 设备ID
-        :param start_time: 开始时间
-        :param end_time: 结束时间
-        :param exclude_res_id: 排除的预约ID（用于更新时）
-        :return: 有冲突返回True，无冲突返回False
+        一次查询加载多个设备当前及以后的已确认预约（供设备时间线索引使用）
+        :return: {did: [(start_time, end_time, res_id)]}，查询失败返回None
+        """
+        if not dids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(dids))
+        query = f"""
+            SELECT did, start_time, end_time, res_id
+            FROM reservations
+            WHERE did IN ({placeholders})
+              AND status = '已确认'
+              AND end_time > %s
+        """
+        rows = execute_query(query, tuple(dids) + (datetime.now(),))
+        if rows is None:
+            return None
+        intervals = {}
+        for row in rows:
+            intervals.setdefault(row['did'], []).append((row['start_time'], row['end_time'], row['res_id']))
+        return intervals
+    
+    @staticmethod
+    def _device_timelines(dids, window_start, window_end):
+        """
+        获取多个设备在时间窗口内的已确认预约时间线
+        启用设备时间线索引时从索引读取，否则（或索引不可用时）按窗口查询
+        :return: {did: IntervalTimeline}，查询失败返回None
+        """
+        index = get_timeline_index()
+        if index is not None:
+            timelines = index.get_many(dids)
+            if timelines is not None:
+                return timelines
+        return Reservation._load_window_timelines(dids, window_start, window_end)
+    
+    @staticmethod
+    def _load_window_timelines(dids, window_start, window_end):
+        """
+        一次查询加载多个设备在时间窗口内的已确认预约，按设备构造时间线
+        :return: {did: IntervalTimeline}，查询失败返回None
+        """
+        timelines = {did: IntervalTimeline() for did in dids}
+        if not dids:
+            return timelines
+        placeholders = ', '.join(['%s'] * len(dids))
+        query = f"""
+            SELECT did, start_time, end_time, res_id
+            FROM reservations
+            WHERE did IN ({placeholders})
+              AND status = '已确认'
+              AND start_time < %s
+              AND end_time > %s
+            ORDER BY did, start_time
+        """
+        rows = execute_query(query, tuple(dids) + (window_end, window_start))
+        if rows is None:
+            return None
+        intervals = {}
+        for row in rows:
+            intervals.setdefault(row['did'], []).append((row['start_time'], row['end_time'], row['res_id']))
+        for did, items in intervals.items():
+            timelines[did] = IntervalTimeline(items)
+        return timelines
+    
+    @staticmethod
+    def find_availability(window_start, window_end, duration, device_type=None, room_id=None,
+                          limit=3, max_devices=200):
+        """
+        查询按设备类型或机房筛选的空闲设备在时间窗口内最早的空闲时段
+        每个设备的时段只在所在机房的开放时间内，对已确认预约的有序区间逐个开放时段扫描
+        :param window_start: 窗口开始时间（早于当前时间时从当前时间开始）
+        :param window_end: 窗口结束时间
+        :param duration: 最短时长（timedelta）
+        :param device_type: 设备类型
+        :param room_id: 机房ID
+        :param limit: 每个设备最多返回的时段数
+        :param max_devices: 最多查询的设备数
+        :return: [{'did', 'dname', 'type', 'room_id', 'slots': [{'start_time', 'end_time'}]}]，查询失败返回None
+        """
+        window_start = max(window_start, datetime.now().replace(microsecond=0))
+        if window_start >= window_end:
+            return []
+        
+        # 只有空闲状态的设备可以预约（见 book）
+        devices = Device.find_devices(status='空闲', room_id=room_id, device_type=device_type, limit=max_devices)
+        if not devices:
+            return []
+        schedules = {room.rid: parse_open_time(room.open_time) for room in Room.get_all_rooms()}
+        timelines = Reservation._device_timelines([device.did for device in devices], window_start, window_end)
+        if timelines is None:
+            return None
+        
+        # 同一机房的开放时段只计算一次
+        windows_by_room = {}
+        availability = []
+        for device in devices:
+            if device.room_id not in windows_by_room:
+                windows_by_room[device.room_id] = open_windows(schedules.get(device.room_id), window_start, window_end)
+            timeline = timelines[device.did]
+            slots = []
+            for open_start, open_end in windows_by_room[device.room_id]:
+                slots.extend(timeline.free_slots(open_start, open_end, duration, limit - len(slots)))
+                if len(slots) >= limit:
+                    break
+            availability.append({
+                'did': device.did,
+                'dname': device.dname,
+                'type': device.type,
+                'room_id': device.room_id,
+                'slots': [{'start_time': start, 'end_time': end} for start, end in slots]
+            })
+        return availability
+    
+    @staticmethod
+    def _lock_device(cursor, did):
+        """
+        锁定设备行（SELECT ... FOR UPDATE），同一设备的预约/确认操作在此串行化
+        :return: 设备数据，不存在返回None
+        """
+        cursor.execute("SELECT did, status FROM devices WHERE did = %s FOR UPDATE", (did,))
+        return cursor.fetchone()
+    
+    @staticmethod
+    def _probe_conflict(cursor, did, start_time, end_time, exclude_res_id=None):
+        """
+        在持有设备行锁的事务中检查冲突
+        使用加锁读，读取最新已提交的数据而不是事务快照
+        :return: 有冲突返回True
         """
         query = """
-            SELECT COUNT(*) as conflict_count
+            SELECT res_id
             FROM reservations
             WHERE did = %s
               AND status = '已确认'
@@ -111,28 +249,56 @@ class Reservation:
               AND %s > start_time
         """
         params = [did, start_time, end_time]
-        
         if exclude_res_id:
             query += " AND res_id != %s"
             params.append(exclude_res_id)
-        
-        result = execute_query(query, tuple(params), fetch_one=True)
-        return result['conflict_count'] > 0
+        query += " LIMIT 1 LOCK IN SHARE MODE"
+        cursor.execute(query, tuple(params))
+        return cursor.fetchone() is not None
     
-    def create_with_conflict_check(self):
+    def book(self):
         """
-        创建预约并检查冲突（使用存储过程）
-        :return: 成功返回True，失败返回False
+        原子地创建预约：锁定设备行 -> 校验设备状态 -> 一次冲突检查 -> 插入
+        同一设备的并发预约在设备行锁上排队，不会出现检查与插入之间的竞争；
+        启用设备时间线索引时，与已确认预约冲突的请求在加锁之前直接拒绝
+        :return: 成功返回True，数据库错误返回False
+        :raises BookingError: 设备不存在、设备不可用或时间冲突
         """
         if self.res_id:
             return False  # 已有ID，不应使用此方法
         
+        index = get_timeline_index()
+        if index is not None:
+            timelines = index.get_many([self.did])
+            if timelines is not None and timelines[self.did].has_conflict(self.start_time, self.end_time):
+                raise BookingError('预约时间与已有预约冲突')
+        
         try:
-            call_procedure('CheckReservationConflict', (self.uid, self.did, self.start_time, self.end_time))
-            return True
+            with transaction() as connection:
+                with connection.cursor() as cursor:
+                    device = Reservation._lock_device(cursor, self.did)
+                    if not device:
+                        raise BookingError('设备不存在')
+                    if device['status'] != '空闲':
+                        raise BookingError('设备当前不可用')
+                    if Reservation._probe_conflict(cursor, self.did, self.start_time, self.end_time):
+                        raise BookingError('预约时间与已有预约冲突')
+                    
+                    cursor.execute("""
+                        INSERT INTO reservations (uid, did, start_time, end_time, status)
+                        VALUES (%s, %s, %s, %s, '待审核')
+                    """, (self.uid, self.did, self.start_time, self.end_time))
+                    self.res_id = cursor.lastrowid
+        except BookingError:
+            raise
         except Exception as e:
             print(f"预约创建失败: {e}")
             return False
+        
+        self.status = '待审核'
+        touch_tables('reservations')
+        self._emit('reservation.created')
+        return True
     
     def save(self):
         """
@@ -147,7 +313,7 @@ class Reservation:
                 WHERE res_id = %s
             """
             params = (self.uid, self.did, self.start_time, self.end_time, self.status, self.res_id)
-            return execute_update(query, params) > 0
+            result = execute_update(query, params) > 0
         else:
             # 新增预约
             query = """
@@ -155,7 +321,12 @@ class Reservation:
                 VALUES (%s, %s, %s, %s, %s)
             """
             params = (self.uid, self.did, self.start_time, self.end_time, self.status or '待审核')
-            return execute_update(query, params) > 0
+            result = execute_update(query, params) > 0
+        
+        if result:
+            touch_tables('reservations', 'devices')
+            self._emit('reservation.saved')
+        return result
     
     def update_status(self, new_status):
         """
@@ -166,13 +337,159 @@ class Reservation:
         if not self.res_id:
             return False
         
+        if new_status == '已确认' and self.status != '已确认':
+            return self._confirm()
+        
+        old_status = self.status
         query = "UPDATE reservations SET status = %s WHERE res_id = %s"
         params = (new_status, self.res_id)
         result = execute_update(query, params) > 0
         if result:
+            touch_tables('reservations', 'devices')
             self.status = new_status
+            self._emit_status_change(old_status)
+        return result
+    
+    def _confirm(self):
+        """
+        确认预约：与创建预约使用同一把设备行锁，确认前检查与已确认预约的冲突
+        :return: 成功返回True，数据库错误返回False
+        :raises BookingError: 时间冲突
+        """
+        try:
+            with transaction() as connection:
+                with connection.cursor() as cursor:
+                    Reservation._lock_device(cursor, self.did)
+                    if Reservation._probe_conflict(cursor, self.did, self.start_time, self.end_time, self.res_id):
+                        raise BookingError('预约时间与已确认的预约冲突')
+                    result = cursor.execute(
+                        "UPDATE reservations SET status = '已确认' WHERE res_id = %s", (self.res_id,)
+                    ) > 0
+        except BookingError:
+            raise
+        except Exception as e:
+            print(f"预约确认失败: {e}")
+            return False
+        
+        if result:
+            old_status = self.status
+            touch_tables('reservations', 'devices')
+            self.status = '已确认'
+            self._emit_status_change(old_status)
         return result
     
+    @staticmethod
+    def batch_review(decisions):
+        """
+        批量审核预约（一个事务）：
+        一次查询锁定全部预约 -> 按设备ID顺序锁定相关设备 -> 一次查询取出相关设备在批次时间范围内的已确认预约，
+        在内存中按批次顺序逐个检查冲突（同批次中先批准的预约也参与后续检查）-> 两条UPDATE写入
+        :param decisions: [(res_id, 新状态)]，新状态为 '已确认' 或 '已取消'
+        :return: 逐项结果列表 [{'index', 'res_id', 'status': 'success'/'error', 'new_status'/'message'}]，数据库错误返回None
+        """
+        res_ids = list(dict.fromkeys(res_id for res_id, _ in decisions))
+        results = [None] * len(decisions)
+        approved, rejected = [], []
+        try:
+            with transaction() as connection:
+                with connection.cursor() as cursor:
+                    reservations = {}
+                    if res_ids:
+                        placeholders = ', '.join(['%s'] * len(res_ids))
+                        cursor.execute(
+                            f"SELECT {_mapper.columns} FROM reservations WHERE res_id IN ({placeholders}) FOR UPDATE",
+                            res_ids
+                        )
+                        reservations = {row['res_id']: Reservation(**row) for row in cursor.fetchall()}
+                    
+                    seen = set()
+                    candidates = []
+                    for index, (res_id, new_status) in enumerate(decisions):
+                        reservation = reservations.get(res_id)
+                        if reservation is None:
+                            results[index] = {'index': index, 'res_id': res_id, 'status': 'error', 'message': '预约记录不存在'}
+                        elif res_id in seen:
+                            results[index] = {'index': index, 'res_id': res_id, 'status': 'error', 'message': '重复的预约ID'}
+                        elif reservation.status != '待审核':
+                            results[index] = {'index': index, 'res_id': res_id, 'status': 'error',
+                                              'message': f'预约当前状态为{reservation.status}，不能审核'}
+                        elif new_status == '已确认':
+                            candidates.append((index, reservation))
+                        else:
+                            rejected.append((index, reservation))
+                        seen.add(res_id)
+                    
+                    if candidates:
+                        dids = sorted({reservation.did for _, reservation in candidates})
+                        placeholders = ', '.join(['%s'] * len(dids))
+                        # 与单条预约/确认使用同一把设备行锁，按ID顺序加锁避免死锁
+                        cursor.execute(
+                            f"SELECT did FROM devices WHERE did IN ({placeholders}) ORDER BY did FOR UPDATE", dids
+                        )
+                        window_start = min(reservation.start_time for _, reservation in candidates)
+                        window_end = max(reservation.end_time for _, reservation in candidates)
+                        cursor.execute(f"""
+                            SELECT did, start_time, end_time, res_id
+                            FROM reservations
+                            WHERE did IN ({placeholders})
+                              AND status = '已确认'
+                              AND start_time < %s
+                              AND end_time > %s
+                            LOCK IN SHARE MODE
+                        """, dids + [window_end, window_start])
+                        timelines = {did: IntervalTimeline() for did in dids}
+                        for row in cursor.fetchall():
+                            timelines[row['did']].add(row['start_time'], row['end_time'], row['res_id'])
+                        
+                        for index, reservation in candidates:
+                            timeline = timelines[reservation.did]
+                            if timeline.has_conflict(reservation.start_time, reservation.end_time, reservation.res_id):
+                                results[index] = {'index': index, 'res_id': reservation.res_id, 'status': 'error',
+                                                  'message': '预约时间与已确认的预约冲突'}
+                            else:
+                                timeline.add(reservation.start_time, reservation.end_time, reservation.res_id)
+                                approved.append((index, reservation))
+                    
+                    for new_status, items in (('已确认', approved), ('已取消', rejected)):
+                        if items:
+                            placeholders = ', '.join(['%s'] * len(items))
+                            cursor.execute(
+                                f"UPDATE reservations SET status = %s WHERE res_id IN ({placeholders})",
+                                [new_status] + [reservation.res_id for _, reservation in items]
+                            )
+        except Exception as e:
+            print(f"批量审核预约失败: {e}")
+            return None
+        
+        if approved or rejected:
+            touch_tables('reservations', 'devices')
+        for new_status, items in (('已确认', approved), ('已取消', rejected)):
+            for index, reservation in items:
+                old_status = reservation.status
+                reservation.status = new_status
+                reservation._emit_status_change(old_status)
+                results[index] = {'index': index, 'res_id': reservation.res_id, 'status': 'success',
+                                  'new_status': new_status}
+        return results
+    
+    def _emit(self, event_type, **extra):
+        """发布预约事件（只推送给预约人和管理员/教师）"""
+        data = dict(res_id=self.res_id, uid=self.uid, did=self.did, start_time=self.start_time,
+                    end_time=self.end_time, status=self.status)
+        data.update(extra)
+        emit(event_type, owner=self.uid, **data)
+    
+    def _emit_status_change(self, old_status):
+        """
+        发布预约状态变更事件，并同步发布触发器 trg_device_status_update 引起的设备状态变更
+        :param old_status: 变更前的预约状态
+        """
+        self._emit('reservation.status', old_status=old_status)
+        if self.status == '已确认' and old_status != '已确认':
+            emit('device.status', did=self.did, status='使用中')
+        elif self.status == '已取消' and old_status == '已确认':
+            emit('device.status', did=self.did, status='空闲')
+    
     def delete(self):
         """
         删除预约
@@ -182,20 +499,60 @@ class Reservation:
             return False
         
         query = "DELETE FROM reservations WHERE res_id = %s"
-        return execute_update(query, (self.res_id,)) > 0
+        result = execute_update(query, (self.res_id,)) > 0
+        if result:
+            touch_tables('reservations', 'devices')
+            emit('reservation.deleted', owner=self.uid, res_id=self.res_id, uid=self.uid, did=self.did)
+        return result
     
     @staticmethod
-    def get_detailed_reservations():
+    def get_detailed_reservations(limit=None, cursor=None, status=None, did=None, uid=None, room_id=None,
+                                  time_from=None, time_to=None):
         """
         获取详细的预约信息（包含用户名和设备名）
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (start_time, res_id)
+        :param status: 预约状态
+        :param did: 设备ID
+        :param uid: 用户ID
+        :param room_id: 机房ID
+        :param time_from: 时间范围起点
+        :param time_to: 时间范围终点
         :return: 预约详情列表
         """
-        query = """
+        base_query = """
             SELECT r.res_id, r.uid, r.did, r.start_time, r.end_time, r.status,
                    u.uname, d.dname, d.type
             FROM reservations r
             JOIN users u ON r.uid = u.uid
             JOIN devices d ON r.did = d.did
-            ORDER BY r.start_time DESC
         """
-        return execute_query(query)
+        query_filter = Reservation._build_filter('r.', status, did, uid, room_id, time_from, time_to)
+        query, params = paginate_query(
+            base_query, query_filter.conditions, query_filter.params,
+            limit, cursor, 'r.res_id', sort_column='r.start_time'
+        )
+        return execute_query_rows(query, params)
+    
+    # 导出的列
+    EXPORT_COLUMNS = ['res_id', 'uid', 'uname', 'did', 'dname', 'type', 'room_id', 'start_time', 'end_time', 'status']
+    
+    @staticmethod
+    def stream_reservations(status=None, did=None, uid=None, room_id=None, time_from=None, time_to=None):
+        """
+        按条件流式读取预约详情（用于导出），过滤条件与 find_reservations 一致，按开始时间升序
+        :return: 逐行产出预约字典的生成器
+        """
+        base_query = """
+            SELECT r.res_id, r.uid, u.uname, r.did, d.dname, d.type, d.room_id,
+                   r.start_time, r.end_time, r.status
+            FROM reservations r
+            JOIN users u ON r.uid = u.uid
+            JOIN devices d ON r.did = d.did
+        """
+        where, params = Reservation._build_filter('r.', status, did, uid, room_id, time_from, time_to).where_clause()
+        return stream_query(base_query + where + " ORDER BY r.start_time, r.res_id", params)
+
+
+# 预约行映射器（元组行按位置构造 Reservation）
+_mapper = Mapper(Reservation)
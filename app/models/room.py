@@ -5,9 +5,14 @@
 机房模型
 """
 
-from app.utils.db_config import execute_query, execute_update
+from app.utils.db_config import execute_update, execute_query_tuples
+from app.utils.cache import touch_tables
+from app.models.statistics import Statistics
+from app.utils.mapper import Mapper
 
 class Room:
+    __slots__ = ('rid', 'location', 'capacity', 'open_time')
+    
     def __init__(self, rid=None, location=None, capacity=None, open_time=None):
         self.rid = rid
         self.location = location
@@ -21,16 +26,8 @@ class Room:
         :param rid: 机房ID
         :return: 机房对象
         """
-        query = "SELECT * FROM rooms WHERE rid = %s"
-        room_data = execute_query(query, (rid,), fetch_one=True)
-        if room_data:
-            return Room(
-                rid=room_data['rid'],
-                location=room_data['location'],
-                capacity=room_data['capacity'],
-                open_time=room_data['open_time']
-            )
-        return None
+        query = f"SELECT {_mapper.columns} FROM rooms WHERE rid = %s"
+        return _mapper.fetch_one(query, (rid,))
     
     @staticmethod
     def get_all_rooms():
@@ -38,19 +35,24 @@ class Room:
         获取所有机房
         :return: 机房列表
         """
-        query = "SELECT * FROM rooms"
-        rooms_data = execute_query(query)
-        rooms = []
-        
-        if rooms_data:
-            for room_data in rooms_data:
-                rooms.append(Room(
-                    rid=room_data['rid'],
-                    location=room_data['location'],
-                    capacity=room_data['capacity'],
-                    open_time=room_data['open_time']
-                ))
-        return rooms
+        query = f"SELECT {_mapper.columns} FROM rooms"
+        return _mapper.fetch_all(query)
+    
+    @staticmethod
+    def get_existing_ids(rids):
+        """
+        一次查询校验多个机房ID
+        :param rids: 机房ID列表
+        :return: 存在的机房ID集合，查询失败时返回None
+        """
+        rids = list(set(rids))
+        if not rids:
+            return set()
+        placeholders = ', '.join(['%s'] * len(rids))
+        rows = execute_query_tuples(f"SELECT rid FROM rooms WHERE rid IN ({placeholders})", tuple(rids))
+        if rows is None:
+            return None
+        return {row[0] for row in rows}
     
     def save(self):
         """
@@ -65,7 +67,7 @@ class Room:
                 WHERE rid = %s
             """
             params = (self.location, self.capacity, self.open_time, self.rid)
-            return execute_update(query, params) > 0
+            result = execute_update(query, params) > 0
         else:
             # 新增机房
             query = """
@@ -73,7 +75,11 @@ class Room:
                 VALUES (%s, %s, %s)
             """
             params = (self.location, self.capacity, self.open_time)
-            return execute_update(query, params) > 0
+            result = execute_update(query, params) > 0
+        
+        if result:
+            touch_tables('rooms')
+        return result
     
     def delete(self):
         """
@@ -84,4 +90,13 @@ class Room:
             return False
         
         query = "DELETE FROM rooms WHERE rid = %s"
-        return execute_update(query, (self.rid,)) > 0
+        result = execute_update(query, (self.rid,)) > 0
+        if result:
+            touch_tables('rooms', 'devices', 'reservations', 'maintenances')
+            # 级联删除的预约不会触发统计触发器，需要重建统计汇总表
+            Statistics.rebuild_usage_stats()
+        return result
+
+
+# 机房行映射器（元组行按位置构造 Room）
+_mapper = Mapper(Room)
@@ -3,11 +3,23 @@
 
 """
 统计分析模块
+设备/机房/角色/月度使用统计读取由触发器增量维护的汇总表（stats_*），
+不再对 reservations 全表做 GROUP BY
 """
 
-from app.utils.db_config import execute_query
+from app.utils.db_config import execute_query, call_procedure
+from app.utils.parallel import run_parallel
 
 class Statistics:
+    @staticmethod
+    def rebuild_usage_stats():
+        """
+        根据预约表全量重建统计汇总表
+        级联删除不会触发 reservations 上的触发器，删除用户/设备/机房后需调用
+        :return: 成功返回True，失败返回False
+        """
+        return call_procedure('RebuildUsageStats') is not None
+    
     @staticmethod
     def get_device_usage_stats():
         """
@@ -19,15 +31,15 @@ class Statistics:
                 d.did,
                 d.dname,
                 d.type,
-                COUNT(r.res_id) AS total_reservations,
-                COALESCE(SUM(TIMESTAMPDIFF(HOUR, r.start_time, r.end_time)), 0) AS total_hours_used
+                COALESCE(s.total_reservations, 0) AS total_reservations,
+                COALESCE(s.total_hours_used, 0) AS total_hours_used
             FROM devices d
-            LEFT JOIN reservations r ON d.did = r.did AND r.status = '已完成'
-            GROUP BY d.did, d.dname, d.type
+            LEFT JOIN stats_device_usage s ON d.did = s.did
         """
         results = execute_query(query)
         if results:
             for row in results:
+                row['total_reservations'] = int(row['total_reservations'])
                 row['total_hours_used'] = int(row['total_hours_used'])
         return results
     
@@ -41,15 +53,24 @@ class Statistics:
             SELECT 
                 r.rid,
                 r.location,
-                COUNT(res.res_id) AS total_reservations,
-                COUNT(DISTINCT d.did) AS total_devices,
-                COUNT(DISTINCT res.uid) AS unique_users
+                COALESCE(SUM(s.total_reservations), 0) AS total_reservations,
+                COUNT(d.did) AS total_devices,
+                (
+                    SELECT COUNT(DISTINCT du.uid)
+                    FROM stats_device_user du
+                    JOIN devices d2 ON du.did = d2.did
+                    WHERE d2.room_id = r.rid
+                ) AS unique_users
             FROM rooms r
             LEFT JOIN devices d ON r.rid = d.room_id
-            LEFT JOIN reservations res ON d.did = res.did AND res.status = '已完成'
+            LEFT JOIN stats_device_usage s ON d.did = s.did
             GROUP BY r.rid, r.location
         """
-        return execute_query(query)
+        results = execute_query(query)
+        if results:
+            for row in results:
+                row['total_reservations'] = int(row['total_reservations'])
+        return results
     
     @staticmethod
     def get_user_role_stats():
@@ -60,16 +81,17 @@ class Statistics:
         query = """
             SELECT 
                 u.role, 
-                COUNT(r.res_id) AS total_reservations,
-                COALESCE(AVG(TIMESTAMPDIFF(HOUR, r.start_time, r.end_time)), 0.0) AS avg_hours
-            FROM reservations r
-            JOIN users u ON r.uid = u.uid
-            WHERE r.status = '已完成'
+                SUM(s.total_reservations) AS total_reservations,
+                COALESCE(SUM(s.total_hours) / SUM(s.total_reservations), 0.0) AS avg_hours
+            FROM stats_user_usage s
+            JOIN users u ON s.uid = u.uid
+            WHERE s.total_reservations > 0
             GROUP BY u.role
         """
         results = execute_query(query)
         if results:
             for row in results:
+                row['total_reservations'] = int(row['total_reservations'])
                 row['avg_hours'] = float(row['avg_hours'])
         return results
     
@@ -79,43 +101,49 @@ class Statistics:
         获取维护统计数据
         :return: 包含汇总和按类型详情的维护统计数据字典
         """
-        query_total_completed = "SELECT COUNT(*) AS count FROM maintenances WHERE status = '已完成'"
-        total_completed_data = execute_query(query_total_completed, fetch_one=True)
-        total_completed_count = total_completed_data['count'] if total_completed_data else 0
-
-        query_total_pending = "SELECT COUNT(*) AS count FROM maintenances WHERE status = '待处理'"
-        total_pending_data = execute_query(query_total_pending, fetch_one=True)
-        total_pending_count = total_pending_data['count'] if total_pending_data else 0
-
-        query_avg_duration = """
-            SELECT COALESCE(AVG(TIMESTAMPDIFF(HOUR, report_time, complete_time)), 0.0) AS avg_hours
-            FROM maintenances
-            WHERE status = '已完成' AND complete_time IS NOT NULL
-        """
-        avg_duration_data = execute_query(query_avg_duration, fetch_one=True)
-        avg_duration_hours = float(avg_duration_data['avg_hours']) if avg_duration_data else 0.0
-
-        query_details_by_type = """
+        # 单次扫描：按设备类型分组，用条件聚合同时得到各项计数和维修耗时，
+        # 再在 Python 中汇总总数；idx_maint_stats 覆盖了 maintenances 中用到的所有列
+        query = """
             SELECT 
                 d.type,
-                COUNT(m.mid) AS maintenance_count,
-                COALESCE(AVG(TIMESTAMPDIFF(HOUR, m.report_time, m.complete_time)), 0.0) AS avg_repair_time_hours
+                SUM(m.status = '已完成') AS completed_count,
+                SUM(m.status = '待处理') AS pending_count,
+                SUM(m.status = '已完成' AND m.complete_time IS NOT NULL) AS maintenance_count,
+                COALESCE(SUM(CASE WHEN m.status = '已完成' AND m.complete_time IS NOT NULL
+                                  THEN TIMESTAMPDIFF(HOUR, m.report_time, m.complete_time) END), 0) AS repair_hours
             FROM maintenances m
             JOIN devices d ON m.did = d.did
-            WHERE m.status = '已完成' AND m.complete_time IS NOT NULL
             GROUP BY d.type
         """
-        details_by_type = execute_query(query_details_by_type)
+        rows = execute_query(query) or []
+        
+        total_completed_count = 0
+        total_pending_count = 0
+        total_repair_count = 0
+        total_repair_hours = 0
+        details_by_type = []
+        
+        for row in rows:
+            maintenance_count = int(row['maintenance_count'] or 0)
+            repair_hours = int(row['repair_hours'] or 0)
+            total_completed_count += int(row['completed_count'] or 0)
+            total_pending_count += int(row['pending_count'] or 0)
+            total_repair_count += maintenance_count
+            total_repair_hours += repair_hours
+            if maintenance_count:
+                details_by_type.append({
+                    'type': row['type'],
+                    'maintenance_count': maintenance_count,
+                    'avg_repair_time_hours': repair_hours / maintenance_count
+                })
         
-        if details_by_type:
-            for item in details_by_type:
-                item['avg_repair_time_hours'] = float(item['avg_repair_time_hours'])
+        avg_duration_hours = total_repair_hours / total_repair_count if total_repair_count else 0.0
         
         return {
             'total_completed_maintenances': total_completed_count,
             'total_pending_maintenances': total_pending_count,
             'average_completion_time_hours': avg_duration_hours,
-            'details_by_type': details_by_type if details_by_type else []
+            'details_by_type': details_by_type
         }
     
     @staticmethod
@@ -125,13 +153,9 @@ class Statistics:
         :return: 月度使用趋势数据
         """
         query = """
-            SELECT 
-                DATE_FORMAT(start_time, '%Y-%m') AS month,
-                COUNT(res_id) AS reservation_count,
-                COALESCE(SUM(TIMESTAMPDIFF(HOUR, start_time, end_time)), 0) AS total_hours
-            FROM reservations
-            WHERE status = '已完成'
-            GROUP BY DATE_FORMAT(start_time, '%Y-%m')
+            SELECT month, reservation_count, total_hours
+            FROM stats_monthly_usage
+            WHERE reservation_count > 0
             ORDER BY month
         """
         results = execute_query(query)
@@ -171,3 +195,26 @@ class Statistics:
             GROUP BY status
         """
         return execute_query(query)
+    
+    @staticmethod
+    def get_dashboard_stats(include_admin_stats=False):
+        """
+        获取仪表盘统计数据（各项统计互不依赖，并发执行）
+        :param include_admin_stats: 是否包含管理员可见的高级统计数据
+        :return: 仪表盘数据字典
+        """
+        # 基础统计数据（所有角色可见）
+        tasks = {
+            'device_status': Statistics.get_device_status_summary,
+            'reservation_status': Statistics.get_reservation_status_summary
+        }
+        
+        # 管理员可见的高级统计数据
+        if include_admin_stats:
+            tasks.update({
+                'user_role_stats': Statistics.get_user_role_stats,
+                'maintenance_stats': Statistics.get_maintenance_stats,
+                'monthly_usage_trend': Statistics.get_monthly_usage_trend
+            })
+        
+        return run_parallel(tasks)
@@ -5,10 +5,19 @@
 用户模型
 """
 
-from app.utils.db_config import execute_query, execute_update
-import hashlib
+from app.utils.db_config import execute_update, execute_query_tuples
+from app.utils.cache import touch_tables
+from app.models.statistics import Statistics
+from app.utils.pagination import paginate_query
+from app.utils.mapper import Mapper
+from app.utils.principal_cache import get_principal_cache, MISSING, PrincipalUnavailable
+from app.utils.passwords import hash_password, verify_password
 
 class User:
+    __slots__ = ('uid', 'uname', 'role', 'code', 'password', 'phone')
+    # 序列化为JSON时不输出的字段
+    JSON_EXCLUDE = ('password',)
+    
     def __init__(self, uid=None, uname=None, role=None, code=None, password=None, phone=None):
         self.uid = uid
         self.uname = uname
@@ -24,18 +33,30 @@ class User:
         :param uid: 用户ID
         :return: 用户对象
         """
-        query = "SELECT * FROM users WHERE uid = %s"
-        user_data = execute_query(query, (uid,), fetch_one=True)
-        if user_data:
-            return User(
-                uid=user_data['uid'],
-                uname=user_data['uname'],
-                role=user_data['role'],
-                code=user_data['code'],
-                password=user_data['password'],
-                phone=user_data['phone']
-            )
-        return None
+        query = f"SELECT {_mapper.columns} FROM users WHERE uid = %s"
+        return _mapper.fetch_one(query, (uid,))
+    
+    @staticmethod
+    def _load_principal(uid):
+        """
+        加载用户行（供登录用户缓存使用）
+        :return: 元组行，不存在返回MISSING，查询失败返回None
+        """
+        rows = execute_query_tuples(f"SELECT {_mapper.columns} FROM users WHERE uid = %s", (uid,))
+        if rows is None:
+            return None
+        return rows[0] if rows else MISSING
+    
+    @staticmethod
+    def get_principal(uid):
+        """
+        获取登录用户（优先使用进程内缓存）
+        每次返回新的用户对象，调用方修改对象不会影响缓存
+        :param uid: 用户ID
+        :return: 用户对象，不存在时返回None
+        :raises PrincipalUnavailable: 查询失败
+        """
+        return _mapper.from_row(get_principal_cache().get(uid, User._load_principal))
     
     @staticmethod
     def get_by_code(code):
@@ -44,65 +65,86 @@ class User:
         :param code: 学号/工号
         :return: 用户对象
         """
-        query = "SELECT * FROM users WHERE code = %s"
-        user_data = execute_query(query, (code,), fetch_one=True)
-        if user_data:
-            return User(
-                uid=user_data['uid'],
-                uname=user_data['uname'],
-                role=user_data['role'],
-                code=user_data['code'],
-                password=user_data['password'],
-                phone=user_data['phone']
-            )
-        return None
+        query = f"SELECT {_mapper.columns} FROM users WHERE code = %s"
+        return _mapper.fetch_one(query, (code,))
+    
+    @staticmethod
+    def lookup_by_code(code):
+        """
+        登录时根据学号/工号获取用户，区分用户不存在和查询失败
+        :param code: 学号/工号
+        :return: 用户对象，不存在返回None
+        :raises PrincipalUnavailable: 查询失败
+        """
+        rows = execute_query_tuples(f"SELECT {_mapper.columns} FROM users WHERE code = %s", (code,))
+        if rows is None:
+            raise PrincipalUnavailable('用户信息暂时无法加载，请稍后重试')
+        return _mapper.from_row(rows[0]) if rows else None
     
     @staticmethod
     def authenticate(code, password):
         """
-        用户认证
+        用户认证：按学号/工号（唯一索引）查询用户，在应用中校验密码哈希
         :param code: 学号/工号
         :param password: 密码
         :return: 认证成功返回用户对象，失败返回None
+        :raises PasswordHasherBusy: 密码哈希线程池繁忙
+        :raises PrincipalUnavailable: 查询用户失败
         """
-        # 对密码进行SHA-256加密
-        hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        
-        query = "SELECT * FROM users WHERE code = %s AND password = %s"
-        user_data = execute_query(query, (code, hashed_password), fetch_one=True)
-        
-        if user_data:
-            return User(
-                uid=user_data['uid'],
-                uname=user_data['uname'],
-                role=user_data['role'],
-                code=user_data['code'],
-                password=user_data['password'],
-                phone=user_data['phone']
-            )
-        return None
+        user = User.lookup_by_code(code)
+        return user if User.verify_credentials(user, password) else None
     
     @staticmethod
-    def get_all_users():
+    def verify_credentials(user, password):
+        """
+        校验密码（在密码哈希线程池中计算，常量时间比较）
+        用户不存在时同样计算一次哈希，响应时间不暴露学号/工号是否存在；
+        校验成功且存储的是旧的 SHA-256 哈希（或成本低于当前配置）时，顺便升级为新哈希
+        :param user: 用户对象，可以为None
+        :param password: 密码
+        :return: 密码正确返回True
+        :raises PasswordHasherBusy: 密码哈希线程池繁忙
+        """
+        ok, needs_rehash = verify_password(password, user.password if user is not None else None)
+        if ok and needs_rehash:
+            user._rehash_password(password)
+        return ok
+    
+    def check_password(self, password):
+        """
+        校验当前用户的密码
+        :param password: 密码
+        :return: 密码正确返回True
+        """
+        return User.verify_credentials(self, password)
+    
+    def _rehash_password(self, password):
+        """
+        把旧哈希升级为当前参数的哈希（只在密码未被并发修改时写入）
+        :param password: 已校验正确的明文密码
+        """
+        try:
+            new_hash = hash_password(password)
+        except Exception as e:
+            print(f"密码哈希升级失败: {e}")
+            return
+        query = "UPDATE users SET password = %s WHERE uid = %s AND password = %s"
+        if execute_update(query, (new_hash, self.uid, self.password)) > 0:
+            self.password = new_hash
+            get_principal_cache().invalidate(self.uid)
+    
+    @staticmethod
+    def get_all_users(limit=None, cursor=None):
         """
         获取所有用户
+        :param limit: 每页条数，None表示不分页
+        :param cursor: 分页游标 (uid)
         :return: 用户列表
         """
-        query = "SELECT * FROM users"
-        users_data = execute_query(query)
-        users = []
-        
-        if users_data:
-            for user_data in users_data:
-                users.append(User(
-                    uid=user_data['uid'],
-                    uname=user_data['uname'],
-                    role=user_data['role'],
-                    code=user_data['code'],
-                    password=user_data['password'],
-                    phone=user_data['phone']
-                ))
-        return users
+        query, params = paginate_query(
+            f"SELECT {_mapper.columns} FROM users", [], [], limit, cursor, 'uid', descending=False
+        )
+        return _mapper.fetch_all(query, params)
     
     def save(self):
         """
@@ -117,34 +159,41 @@ class User:
                 WHERE uid = %s
             """
             params = (self.uname, self.role, self.code, self.phone, self.uid)
-            return execute_update(query, params) > 0
+            result = execute_update(query, params) > 0
+            get_principal_cache().invalidate(self.uid)
         else:
-            # 新增用户
-            # 对密码进行SHA-256加密
-            hashed_password = hashlib.sha256(self.password.encode()).hexdigest()
+            # 新增用户（加盐 KDF 哈希）
+            hashed_password = hash_password(self.password)
             
             query = """
                 INSERT INTO users (uname, role, code, password, phone)
                 VALUES (%s, %s, %s, %s, %s)
             """
             params = (self.uname, self.role, self.code, hashed_password, self.phone)
-            return execute_update(query, params) > 0
+            result = execute_update(query, params) > 0
+        
+        if result:
+            touch_tables('users')
+        return result
     
     def update_password(self, new_password):
         """
         更新用户密码
         :param new_password: 新密码
         :return: 成功返回True，失败返回False
+        :raises PasswordHasherBusy: 密码哈希线程池繁忙
         """
         if not self.uid:
             return False
         
-        # 对密码进行SHA-256加密
-        hashed_password = hashlib.sha256(new_password.encode()).hexdigest()
+        # 加盐 KDF 哈希
+        hashed_password = hash_password(new_password)
         
         query = "UPDATE users SET password = %s WHERE uid = %s"
         params = (hashed_password, self.uid)
-        return execute_update(query, params) > 0
+        result = execute_update(query, params) > 0
+        get_principal_cache().invalidate(self.uid)
+        return result
     
     def delete(self):
         """
@@ -154,5 +203,17 @@ class User:
         if not self.uid:
             return False
         
+        # audit_log 为分区表，不能使用外键级联删除
+        execute_update("DELETE FROM audit_log WHERE user_id = %s", (self.uid,))
         query = "DELETE FROM users WHERE uid = %s"
-        return execute_update(query, (self.uid,)) > 0
+        result = execute_update(query, (self.uid,)) > 0
+        get_principal_cache().invalidate(self.uid)
+        if result:
+            touch_tables('users', 'reservations')
+            # 级联删除的预约不会触发统计触发器，需要重建统计汇总表
+            Statistics.rebuild_usage_stats()
+        return result
+
+
+# 用户行映射器（元组行按位置构造 User）
+_mapper = Mapper(User)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+审计日志归档文件模块
+冷分区按分区导出为 gzip 压缩的 JSONL 文件（archive/audit_log/audit_log_<分区名>.jsonl.gz），
+每行一条日志；提供按用户、操作、目标表和时间范围检索归档文件的接口
+"""
+
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+
+from app.utils.query_filter import TIME_FORMAT
+
+# 默认归档目录
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                           'archive', 'audit_log')
+
+_FILE_PATTERN = re.compile(r'^audit_log_(\w+)\.jsonl\.gz$')
+_MONTH_PATTERN = re.compile(r'^p(\d{4})(\d{2})$')
+
+
+def partition_month(partition):
+    """
+    解析按月分区名 pYYYYMM 对应的月份范围
+    :return: (月初, 下月初)，不是按月分区时返回None
+    """
+    match = _MONTH_PATTERN.match(partition)
+    if not match:
+        return None
+    year, month = int(match.group(1)), int(match.group(2))
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def archive_path(partition, archive_dir=None):
+    """
+    获取分区的归档文件路径
+    :param partition: 分区名
+    :param archive_dir: 归档目录
+    """
+    return os.path.join(archive_dir or ARCHIVE_DIR, f'audit_log_{partition}.jsonl.gz')
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.strftime(TIME_FORMAT)
+    return value
+
+
+def write_archive(partition, rows, archive_dir=None):
+    """
+    将分区的日志写入归档文件（先写临时文件再改名，中途失败不会留下不完整的归档）
+    :param partition: 分区名
+    :param rows: 日志字典的可迭代对象
+    :param archive_dir: 归档目录
+    :return: (文件路径, 写入条数)
+    """
+    path = archive_path(partition, archive_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    count = 0
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps({k: _encode_value(v) for k, v in row.items()}, ensure_ascii=False) + '\n')
+            count += 1
+    os.replace(tmp_path, path)
+    return path, count
+
+
+def list_archives(archive_dir=None):
+    """
+    列出归档文件
+    :param archive_dir: 归档目录
+    :return: [{'partition', 'path', 'size'}]，按分区名排序
+    """
+    directory = archive_dir or ARCHIVE_DIR
+    if not os.path.isdir(directory):
+        return []
+    archives = []
+    for name in sorted(os.listdir(directory)):
+        match = _FILE_PATTERN.match(name)
+        if match:
+            path = os.path.join(directory, name)
+            archives.append({'partition': match.group(1), 'path': path, 'size': os.path.getsize(path)})
+    return archives
+
+
+def _read_archive(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                if row.get('action_time'):
+                    row['action_time'] = datetime.strptime(row['action_time'], TIME_FORMAT)
+                yield row
+
+
+def search_archives(user_id=None, action=None, target_table=None, time_from=None, time_to=None,
+                    limit=None, archive_dir=None):
+    """
+    检索归档的审计日志，值为None的条件忽略
+    只读取月份与时间范围相交的归档文件，从最新的归档开始，找够 limit 条即停止
+    :param time_from: 起始时间（包含）
+    :param time_to: 结束时间（不包含）
+    :param limit: 最多返回条数，None表示不限制
+    :return: 日志字典列表，按 (action_time, log_id) 降序
+    """
+    def matches(row):
+        return ((user_id is None or row.get('user_id') == user_id)
+                and (action is None or row.get('action') == action)
+                and (target_table is None or row.get('target_table') == target_table)
+                and (time_from is None or row['action_time'] >= time_from)
+                and (time_to is None or row['action_time'] < time_to))
+
+    def newest_first(archive):
+        month = partition_month(archive['partition'])
+        # 非按月分区（如 p_history）保存的是最早的数据，最后读取
+        return month[0] if month else datetime.min
+
+    results = []
+    for archive in sorted(list_archives(archive_dir), key=newest_first, reverse=True):
+        month = partition_month(archive['partition'])
+        if month and ((time_from and month[1] <= time_from) or (time_to and month[0] >= time_to)):
+            continue
+        rows = [row for row in _read_archive(archive['path']) if matches(row)]
+        rows.sort(key=lambda row: (row['action_time'], row.get('log_id') or 0), reverse=True)
+        results.extend(rows)
+        if limit and len(results) >= limit:
+            return results[:limit]
+    return results
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+异步批量审计日志写入模块
+请求线程只把日志放入内存队列，后台线程按条数或时间阈值用多行 INSERT 批量写入；
+数据库不可用时日志追加到本地文件（每行一条 JSON），数据库恢复后自动补写，进程退出时清空队列；
+无法解析或被数据库拒绝的转存日志移到隔离文件（转存文件名加 .quarantine），不阻塞其余日志的补写
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from app.utils.query_filter import TIME_FORMAT
+
+
+class AuditWriter:
+    """
+    审计日志批量写入器
+    日志条目为 (user_id, action, target_table, sql_text, ip_address, action_time) 元组，
+    action_time 在入队时确定，保证批量写入后时间顺序不变
+    """
+
+    def __init__(self, sink, batch_size=100, flush_interval=1.0, max_queue=10000, spill_path='logs/audit_spill.jsonl'):
+        """
+        :param sink: sink(entries) -> bool，批量写入数据库，失败返回False
+        :param batch_size: 队列达到该条数时立即写入
+        :param flush_interval: 最长写入间隔（秒）
+        :param max_queue: 队列上限，超出时直接写入本地文件，避免占用过多内存
+        :param spill_path: 数据库不可用时的本地追加文件
+        """
+        self._sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.spill_path = spill_path
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._stats = {'enqueued': 0, 'written': 0, 'batches': 0, 'spilled': 0, 'replayed': 0, 'failures': 0,
+                       'quarantined': 0}
+
+    def _ensure_thread(self):
+        # 进程 fork 后后台线程不会被继承，需要在子进程中重新启动
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        if self._pid != pid:
+            self._queue.clear()
+        self._pid = pid
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+
+    def enqueue(self, user_id, action, target_table, sql_text, ip_address=None, action_time=None):
+        """
+        将一条日志放入队列（请求线程中只做这一步）
+        :param action_time: 操作时间，None表示当前时间
+        :return: 成功返回True
+        """
+        entry = (user_id, action, target_table, sql_text, ip_address,
+                 action_time or datetime.now().replace(microsecond=0))
+        overflow = False
+        with self._cond:
+            if self._closed:
+                overflow = True
+            else:
+                self._ensure_thread()
+                if len(self._queue) >= self.max_queue:
+                    overflow = True
+                else:
+                    self._queue.append(entry)
+                    self._stats['enqueued'] += 1
+                    if len(self._queue) >= self.batch_size:
+                        self._cond.notify()
+        if overflow:
+            self._spill([entry])
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and len(self._queue) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"审计日志写入线程异常: {e}")
+            if closed:
+                return
+
+    def flush(self):
+        """
+        立即写入队列中的全部日志，写入失败的日志转存到本地文件
+        :return: 写入数据库的条数
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if not batch:
+                    break
+                if self._write(batch):
+                    written += len(batch)
+                else:
+                    with self._cond:
+                        rest = list(self._queue)
+                        self._queue.clear()
+                    self._spill(batch + rest)
+                    return written
+            # 数据库可用，补写之前转存的日志
+            self._replay(db_available=written > 0)
+        return written
+
+    def _write(self, batch):
+        try:
+            ok = self._sink(batch)
+        except Exception as e:
+            print(f"审计日志批量写入失败: {e}")
+            ok = False
+        with self._cond:
+            if ok:
+                self._stats['written'] += len(batch)
+                self._stats['batches'] += 1
+            else:
+                self._stats['failures'] += 1
+        return ok
+
+    @staticmethod
+    def _encode(entry):
+        user_id, action, target_table, sql_text, ip_address, action_time = entry
+        return json.dumps({
+            'user_id': user_id, 'action': action, 'target_table': target_table,
+            'sql_text': sql_text, 'ip_address': ip_address,
+            'action_time': action_time.strftime(TIME_FORMAT)
+        }, ensure_ascii=False)
+
+    @staticmethod
+    def _decode(line):
+        data = json.loads(line)
+        return (data['user_id'], data['action'], data['target_table'], data['sql_text'],
+                data['ip_address'], datetime.strptime(data['action_time'], TIME_FORMAT))
+
+    def _spill(self, entries):
+        try:
+            with self._spill_lock:
+                directory = os.path.dirname(self.spill_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.spill_path, 'a', encoding='utf-8') as f:
+                    for entry in entries:
+                        f.write(self._encode(entry) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+        except Exception as e:
+            print(f"审计日志转存失败: {e}")
+            return
+        with self._cond:
+            self._stats['spilled'] += len(entries)
+
+    def _quarantine(self, lines):
+        """无法解析或被数据库拒绝的日志移到隔离文件，不再阻塞后续补写"""
+        try:
+            with open(self.spill_path + '.quarantine', 'a', encoding='utf-8') as f:
+                for line in lines:
+                    f.write(line + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            print(f"审计日志隔离失败: {e}")
+            return
+        with self._cond:
+            self._stats['quarantined'] += len(lines)
+
+    def _replay(self, db_available=False):
+        """
+        补写转存的日志
+        :param db_available: 本次 flush 中数据库已接受过写入
+        """
+        replay_path = self.spill_path + '.replay'
+        with self._spill_lock:
+            # 先改名，补写期间新的转存写入新文件；上次未补写完的文件优先处理
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spill_path) or os.path.getsize(self.spill_path) == 0:
+                    return
+                os.replace(self.spill_path, replay_path)
+
+        entries, bad_lines = [], []
+        with open(replay_path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(self._decode(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"无法解析的审计日志移到隔离文件: {e}")
+                    bad_lines.append(line)
+        if bad_lines:
+            self._quarantine(bad_lines)
+
+        for i in range(0, len(entries), self.batch_size):
+            batch = entries[i:i + self.batch_size]
+            if self._write(batch):
+                db_available = True
+                with self._cond:
+                    self._stats['replayed'] += len(batch)
+                continue
+            # 批量写入失败：逐条重试，区分数据库不可用和被数据库拒绝的日志
+            rejected = []
+            for entry in batch:
+                if self._write([entry]):
+                    db_available = True
+                    with self._cond:
+                        self._stats['replayed'] += 1
+                else:
+                    rejected.append(entry)
+            if not db_available:
+                # 数据库仍不可用，保留未写入的部分，下次再补写
+                with open(replay_path + '.tmp', 'w', encoding='utf-8') as f:
+                    for entry in rejected + entries[i + self.batch_size:]:
+                        f.write(self._encode(entry) + '\n')
+                os.replace(replay_path + '.tmp', replay_path)
+                return
+            if rejected:
+                print(f"{len(rejected)} 条审计日志被数据库拒绝，移到隔离文件")
+                self._quarantine([self._encode(entry) for entry in rejected])
+        os.remove(replay_path)
+
+    def close(self):
+        """停止后台线程并写入剩余日志（进程退出时调用）"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread if self._pid == os.getpid() else None
+            self._cond.notify()
+        if thread is not None and thread.is_alive():
+            thread.join(timeout=max(self.flush_interval * 5, 5))
+        self.flush()
+
+    def stats(self):
+        """
+        获取写入指标
+        :return: 指标字典
+        """
+        with self._cond:
+            data = dict(self._stats)
+            data['queued'] = len(self._queue)
+        return data
+
+
+_writer = None
+
+
+def init_app(app, sink):
+    """
+    根据应用配置创建审计日志写入器
+    - AUDIT_ASYNC: 是否异步批量写入（默认开启，关闭时 add_log 同步写入）
+    - AUDIT_BATCH_SIZE / AUDIT_FLUSH_INTERVAL: 批量写入的条数和时间阈值
+    - AUDIT_SPILL_PATH: 数据库不可用时的本地追加文件
+    :param app: Flask 应用实例
+    :param sink: 批量写入函数
+    """
+    global _writer
+    app.config.setdefault('AUDIT_ASYNC', True)
+    app.config.setdefault('AUDIT_BATCH_SIZE', 100)
+    app.config.setdefault('AUDIT_FLUSH_INTERVAL', 1.0)
+    app.config.setdefault('AUDIT_MAX_QUEUE', 10000)
+    app.config.setdefault('AUDIT_SPILL_PATH', os.path.join(os.path.dirname(app.root_path), 'logs', 'audit_spill.jsonl'))
+
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+    if not app.config['AUDIT_ASYNC']:
+        return
+
+    _writer = AuditWriter(
+        sink,
+        batch_size=app.config['AUDIT_BATCH_SIZE'],
+        flush_interval=app.config['AUDIT_FLUSH_INTERVAL'],
+        max_queue=app.config['AUDIT_MAX_QUEUE'],
+        spill_path=app.config['AUDIT_SPILL_PATH']
+    )
+
+
+def get_writer():
+    """
+    获取审计日志写入器
+    :return: AuditWriter 对象，未启用异步写入时返回None
+    """
+    return _writer
+
+
+@atexit.register
+def _close_writer():
+    if _writer is not None:
+        _writer.close()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+缓存模块
+- MemoryCache：进程内 LRU + TTL 缓存（开发环境/单进程）
+- RedisCache：Redis 兼容的共享缓存（多 worker 部署，需要安装 redis 包）
+缓存失效基于按表维护的版本号：写入某张表后版本号加一，
+缓存键中包含其依赖表的版本号，旧版本的缓存条目自然失效
+"""
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from app.utils.db_session import get_current_session
+
+
+class MemoryCache:
+    """进程内 LRU + TTL 缓存"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._versions = {}
+        self._epoch = os.urandom(8).hex()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, key):
+        """
+        获取缓存值
+        :param key: 缓存键
+        :return: 缓存值，不存在或已过期时返回None
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        写入缓存
+        :param key: 缓存键
+        :param value: 缓存值
+        :param ttl: 过期秒数，None表示不过期
+        """
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            self._stats['sets'] += 1
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def delete(self, key):
+        """删除缓存"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def get_versions(self, tables):
+        """
+        获取多张表的版本号
+        :param tables: 表名列表
+        :return: 版本号列表
+        """
+        with self._lock:
+            return [self._versions.get(table, 0) for table in tables]
+
+    def get_epoch(self):
+        """
+        版本号的纪元标识：版本号在进程重启后从0开始，纪元用于区分不同的计数周期
+        :return: 纪元字符串
+        """
+        return self._epoch
+    
+    def bump_versions(self, tables):
+        """将多张表的版本号加一"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        获取缓存指标
+        :return: 指标字典
+        """
+        with self._lock:
+            data = dict(self._stats)
+            data['entries'] = len(self._data)
+        data['backend'] = 'memory'
+        return data
+
+
+class RedisCache:
+    """Redis 兼容的共享缓存（值使用 pickle 序列化，仅用于受信任的本地实例）"""
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='roommgmt:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("使用 Redis 缓存需要先安装 redis 包：pip install redis")
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        try:
+            raw = self._client.get(self.prefix + key)
+        except Exception as e:
+            print(f"缓存读取失败: {e}")
+            self._count('errors')
+            return None
+        if raw is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        try:
+            self._client.set(self.prefix + key, pickle.dumps(value), ex=int(ttl) if ttl else None)
+            self._count('sets')
+        except Exception as e:
+            print(f"缓存写入失败: {e}")
+            self._count('errors')
+
+    def delete(self, key):
+        try:
+            self._client.delete(self.prefix + key)
+        except Exception as e:
+            print(f"缓存删除失败: {e}")
+            self._count('errors')
+
+    def get_versions(self, tables):
+        try:
+            values = self._client.mget([f"{self.prefix}version:{table}" for table in tables])
+        except Exception as e:
+            print(f"缓存读取失败: {e}")
+            self._count('errors')
+            return None
+        return [int(v) if v is not None else 0 for v in values]
+
+    def get_epoch(self):
+        # 版本号随 Redis 数据一起清空时，纪元也随之重新生成
+        try:
+            key = f"{self.prefix}epoch"
+            self._client.set(key, os.urandom(8).hex(), nx=True)
+            value = self._client.get(key)
+        except Exception as e:
+            print(f"缓存读取失败: {e}")
+            self._count('errors')
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    def bump_versions(self, tables):
+        try:
+            pipe = self._client.pipeline()
+            for table in tables:
+                pipe.incr(f"{self.prefix}version:{table}")
+            pipe.execute()
+        except Exception as e:
+            print(f"缓存版本更新失败: {e}")
+            self._count('errors')
+
+    def clear(self):
+        try:
+            for key in self._client.scan_iter(self.prefix + '*'):
+                self._client.delete(key)
+        except Exception as e:
+            print(f"缓存清空失败: {e}")
+            self._count('errors')
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+        data['backend'] = 'redis'
+        return data
+
+
+_cache = MemoryCache()
+
+
+def init_app(app):
+    """
+    根据应用配置初始化缓存后端
+    - CACHE_BACKEND: 'memory'（默认）或 'redis'
+    - CACHE_MAX_ENTRIES: 进程内缓存的最大条目数
+    - CACHE_REDIS_URL: Redis 连接地址
+    """
+    global _cache
+    app.config.setdefault('CACHE_BACKEND', 'memory')
+    app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+    app.config.setdefault('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+    if app.config['CACHE_BACKEND'] == 'redis':
+        _cache = RedisCache(app.config['CACHE_REDIS_URL'])
+    else:
+        _cache = MemoryCache(app.config['CACHE_MAX_ENTRIES'])
+
+
+def get_cache():
+    """
+    获取当前缓存后端
+    :return: 缓存对象
+    """
+    return _cache
+
+
+def table_versions(*tables):
+    """
+    获取多张表的版本号
+    :param tables: 表名
+    :return: 版本号元组，后端不可用时返回None
+    """
+    versions = _cache.get_versions(tables)
+    return tuple(versions) if versions is not None else None
+
+
+def versions_epoch():
+    """
+    获取版本号的纪元标识
+    :return: 纪元字符串，后端不可用时返回None
+    """
+    return _cache.get_epoch()
+
+
+def touch_tables(*tables):
+    """
+    标记表已被写入，使依赖这些表的缓存失效
+    在请求级事务中，版本号在事务提交后才更新，避免并发请求把未提交前的数据缓存到新版本下
+    :param tables: 表名
+    """
+    db_session = get_current_session()
+    if db_session is not None:
+        db_session.after_transaction(lambda: _cache.bump_versions(tables))
+    else:
+        _cache.bump_versions(tables)
+
+
+def cached_call(key, tables, ttl, loader):
+    """
+    读取缓存，不存在时调用 loader 计算并写入缓存
+    :param key: 缓存键
+    :param tables: 结果依赖的表，任一表被写入后缓存失效
+    :param ttl: 过期秒数
+    :param loader: 计算结果的函数
+    :return: 结果
+    """
+    versions = table_versions(*tables)
+    if versions is None:
+        return loader()
+
+    full_key = f"{key}:{'.'.join(str(v) for v in versions)}"
+    value = _cache.get(full_key)
+    if value is not None:
+        return value
+
+    value = loader()
+    if value is not None:
+        _cache.set(full_key, value, ttl)
+    return value
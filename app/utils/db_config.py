@@ -5,8 +5,14 @@
 数据库配置模块
 """
 
+from contextlib import contextmanager
+
 import pymysql
-from pymysql.cursors import DictCursor
+from pymysql.cursors import Cursor, DictCursor, SSDictCursor
+
+from app.utils.db_pool import get_pool
+from app.utils.db_session import get_current_session
+from app.utils.json_provider import RowSet
 
 # 数据库配置
 DB_CONFIG = {
@@ -18,6 +24,15 @@ DB_CONFIG = {
     'cursorclass': DictCursor
 }
 
+# 连接池配置
+DB_POOL_CONFIG = {
+    'max_size': 10,
+    'max_idle_time': 300,
+    'max_lifetime': 3600,
+    'ping_interval': 5,
+    'checkout_timeout': 10
+}
+
 def get_db_connection():
     """
     获取数据库连接
@@ -30,6 +45,62 @@ def get_db_connection():
         print(f"数据库连接失败: {e}")
         return None
 
+def get_connection_pool():
+    """
+    获取数据库连接池
+    :return: 连接池对象
+    """
+    return get_pool(DB_CONFIG, DB_POOL_CONFIG)
+
+def get_pool_stats():
+    """
+    获取连接池指标（借出次数、未命中次数、等待时间等）
+    :return: 指标字典
+    """
+    return get_connection_pool().stats()
+
+@contextmanager
+def db_connection():
+    """
+    借用一个数据库连接
+    - 在 HTTP 请求中：使用请求级会话的连接（同一事务，请求结束时统一提交/回滚）
+    - 在请求之外：从连接池借出自动提交模式的连接
+    出现异常时，请求级会话被标记为只能回滚
+    """
+    db_session = get_current_session()
+    if db_session is None:
+        with get_connection_pool().connection() as connection:
+            yield connection
+        return
+
+    try:
+        yield db_session.get_connection()
+    except BaseException:
+        db_session.mark_failed()
+        raise
+
+@contextmanager
+def transaction():
+    """
+    在一个事务中执行多条语句
+    - 在 HTTP 请求中：加入请求级事务，随请求统一提交/回滚
+    - 在请求之外：借出连接并显式开启事务，正常退出时提交，出现异常时回滚
+    :return: 数据库连接对象
+    """
+    if get_current_session() is not None:
+        with db_connection() as connection:
+            yield connection
+        return
+
+    with get_connection_pool().connection() as connection:
+        connection.begin()
+        try:
+            yield connection
+        except BaseException:
+            connection.rollback()
+            raise
+        connection.commit()
+
 def execute_query(query, params=None, fetch_one=False):
     """
     执行查询语句
@@ -38,23 +109,80 @@ def execute_query(query, params=None, fetch_one=False):
     :param fetch_one: 是否只获取一条记录
     :return: 查询结果
     """
-    connection = get_db_connection()
-    if not connection:
+    try:
+        with db_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(query, params)
+                if fetch_one:
+                    result = cursor.fetchone()
+                else:
+                    result = cursor.fetchall()
+        return result
+    except Exception as e:
+        print(f"查询执行失败: {e}")
         return None
-    
+
+def execute_query_tuples(query, params=None, fetch_one=False):
+    """
+    使用元组游标执行查询（结果行为元组，按 SELECT 列顺序），供映射器按位置构造模型对象
+    :param query: SQL查询语句
+    :param params: 查询参数
+    :param fetch_one: 是否只获取一条记录
+    :return: 查询结果
+    """
     try:
-        with connection.cursor() as cursor:
-            cursor.execute(query, params)
-            if fetch_one:
-                result = cursor.fetchone()
-            else:
-                result = cursor.fetchall()
+        with db_connection() as connection:
+            with connection.cursor(Cursor) as cursor:
+                cursor.execute(query, params)
+                if fetch_one:
+                    result = cursor.fetchone()
+                else:
+                    result = cursor.fetchall()
         return result
     except Exception as e:
         print(f"查询执行失败: {e}")
         return None
+
+def execute_query_rows(query, params=None):
+    """
+    使用元组游标执行查询，结果包装为 RowSet（列名 + 元组行）
+    直接返回给 jsonify 时按元组序列化，不构造中间字典
+    :param query: SQL查询语句
+    :param params: 查询参数
+    :return: RowSet，失败返回None
+    """
+    try:
+        with db_connection() as connection:
+            with connection.cursor(Cursor) as cursor:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                columns = [column[0] for column in cursor.description or ()]
+        return RowSet(columns, rows)
+    except Exception as e:
+        print(f"查询执行失败: {e}")
+        return None
+
+def stream_query(query, params=None):
+    """
+    使用服务端游标（SSDictCursor）逐行读取查询结果，内存占用与结果集大小无关
+    单独从连接池借出连接，不参与请求级事务（流式响应在请求处理函数返回后才被读取）
+    :param query: SQL查询语句
+    :param params: 查询参数
+    :return: 逐行产出字典的生成器
+    """
+    pool = get_connection_pool()
+    connection = pool.acquire()
+    finished = False
+    try:
+        cursor = connection.cursor(SSDictCursor)
+        cursor.execute(query, params)
+        for row in cursor:
+            yield row
+        cursor.close()
+        finished = True
     finally:
-        connection.close()
+        # 未读完的服务端结果集会占用连接，提前结束（如客户端断开）时直接丢弃连接而不是读完剩余数据
+        pool.release(connection, discard=not finished)
 
 def execute_update(query, params=None):
     """
@@ -63,45 +191,35 @@ def execute_update(query, params=None):
     :param params: 更新参数
     :return: 受影响的行数，失败返回-1
     """
-    connection = get_db_connection()
-    if not connection:
-        return -1
-    
     try:
-        with connection.cursor() as cursor:
-            affected_rows = cursor.execute(query, params)
-            connection.commit()
-            return affected_rows
+        with db_connection() as connection:
+            with connection.cursor() as cursor:
+                affected_rows = cursor.execute(query, params)
+        return affected_rows
     except Exception as e:
-        connection.rollback()
         print(f"更新执行失败: {e}")
         return -1
-    finally:
-        connection.close()
 
 def call_procedure(proc_name, params=None):
     """
     调用存储过程
+    存储过程内部不控制事务：在请求中加入请求级事务，在请求之外单独开启事务，过程中的多条语句一起提交或回滚
     :param proc_name: 存储过程名称
     :param params: 存储过程参数
     :return: 存储过程执行结果
     """
-    connection = get_db_connection()
-    if not connection:
-        return None
-    
     try:
-        with connection.cursor() as cursor:
-            if params:
-                cursor.callproc(proc_name, params)
-            else:
-                cursor.callproc(proc_name)
-            result = cursor.fetchall()
-            connection.commit()
-            return result
+        with transaction() as connection:
+            with connection.cursor() as cursor:
+                if params:
+                    cursor.callproc(proc_name, params)
+                else:
+                    cursor.callproc(proc_name)
+                result = cursor.fetchall()
+                # 读尽存储过程返回的剩余结果集，保证连接可以安全复用
+                while cursor.nextset():
+                    pass
+        return result
     except Exception as e:
-        connection.rollback()
         print(f"存储过程调用失败: {e}")
         return None
-    finally:
-        connection.close()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据库连接池模块
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql
+
+
+class PoolTimeoutError(Exception):
+    """等待空闲连接超时"""
+
+
+class _PooledConnection:
+    """连接池中的连接及其元数据"""
+
+    __slots__ = ('connection', 'created_at', 'last_used')
+
+    def __init__(self, connection):
+        now = time.monotonic()
+        self.connection = connection
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    有界、线程安全的 MySQL 连接池
+    - max_size: 最大连接数（含已借出的连接）
+    - max_idle_time: 空闲超过该秒数的连接在借出时被回收
+    - max_lifetime: 创建超过该秒数的连接在借出或归还时被回收
+    - ping_interval: 空闲超过该秒数的连接在借出前执行 ping 健康检查
+    - checkout_timeout: 连接耗尽时等待的最长秒数
+    """
+
+    def __init__(self, db_config, max_size=10, max_idle_time=300, max_lifetime=3600,
+                 ping_interval=5, checkout_timeout=10):
+        self.db_config = dict(db_config)
+        # 连接池中的连接默认自动提交，避免只读查询长期持有事务快照
+        self.db_config.setdefault('autocommit', True)
+        self.max_size = max_size
+        self.max_idle_time = max_idle_time
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = deque()
+        self._size = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._in_use = {}
+        self._stats = {
+            'checkouts': 0,
+            'hits': 0,
+            'misses': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'closed': 0,
+            'recycled_idle': 0,
+            'recycled_lifetime': 0,
+            'failed_health_checks': 0,
+        }
+
+    def _expired(self, item, now):
+        """判断连接是否超过最大空闲时间或最大生命周期"""
+        if self.max_lifetime and now - item.created_at > self.max_lifetime:
+            self._stats['recycled_lifetime'] += 1
+            return True
+        if self.max_idle_time and now - item.last_used > self.max_idle_time:
+            self._stats['recycled_idle'] += 1
+            return True
+        return False
+
+    def _close(self, connection):
+        """关闭连接（忽略关闭时的错误）"""
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _healthy(self, item, now):
+        """空闲时间较长的连接在借出前执行 ping 检查"""
+        if now - item.last_used < self.ping_interval:
+            return True
+        try:
+            item.connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        """
+        借出一个连接
+        :return: 数据库连接对象
+        """
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        waited = False
+
+        while True:
+            discard = []
+            item = None
+            create = False
+
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        candidate = self._idle.pop()
+                        if self._expired(candidate, now):
+                            self._size -= 1
+                            discard.append(candidate)
+                            continue
+                        item = candidate
+                        break
+                    if item or self._size < self.max_size:
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        break
+                    waited = True
+                    self._cond.wait(remaining)
+
+                if item is None and self._size < self.max_size:
+                    self._size += 1
+                    create = True
+
+            for stale in discard:
+                self._close(stale.connection)
+                self._record_closed()
+
+            if item is None and not create:
+                raise PoolTimeoutError(f"等待数据库连接超时（{self.checkout_timeout}秒）")
+
+            if create:
+                try:
+                    item = _PooledConnection(pymysql.connect(**self.db_config))
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                hit = False
+            else:
+                if not self._healthy(item, time.monotonic()):
+                    self._close(item.connection)
+                    with self._cond:
+                        self._size -= 1
+                        self._stats['failed_health_checks'] += 1
+                        self._stats['closed'] += 1
+                    continue
+                hit = True
+
+            wait_time = time.monotonic() - start
+            with self._cond:
+                self._stats['checkouts'] += 1
+                self._stats['hits' if hit else 'misses'] += 1
+                if create:
+                    self._stats['created'] += 1
+                if waited:
+                    self._stats['waits'] += 1
+                self._stats['wait_time_total'] += wait_time
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait_time)
+                self._in_use[id(item.connection)] = item
+            return item.connection
+
+    def release(self, connection, discard=False):
+        """
+        归还连接
+        :param connection: 由 acquire 借出的连接
+        :param discard: 是否直接关闭而不放回池中
+        """
+        with self._cond:
+            item = self._in_use.pop(id(connection), None)
+        if item is None:
+            self._close(connection)
+            return
+
+        now = time.monotonic()
+        if not discard and not connection.open:
+            discard = True
+        if not discard and self.max_lifetime and now - item.created_at > self.max_lifetime:
+            discard = True
+            with self._cond:
+                self._stats['recycled_lifetime'] += 1
+
+        if discard:
+            self._close(connection)
+            with self._cond:
+                self._size -= 1
+                self._stats['closed'] += 1
+                self._cond.notify()
+            return
+
+        item.last_used = now
+        with self._cond:
+            self._idle.append(item)
+            self._cond.notify()
+
+    def _record_closed(self):
+        with self._cond:
+            self._stats['closed'] += 1
+
+    @contextmanager
+    def connection(self):
+        """
+        以上下文管理器的方式借用连接，出现异常时丢弃该连接
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._stats['closed'] += len(idle)
+            self._cond.notify_all()
+        for item in idle:
+            self._close(item.connection)
+
+    def stats(self):
+        """
+        获取连接池指标
+        :return: 指标字典
+        """
+        with self._cond:
+            data = dict(self._stats)
+            data['size'] = self._size
+            data['idle'] = len(self._idle)
+            data['in_use'] = len(self._in_use)
+            data['max_size'] = self.max_size
+        checkouts = data['checkouts']
+        data['wait_time_avg'] = data['wait_time_total'] / checkouts if checkouts else 0.0
+        return data
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(db_config, pool_config=None):
+    """
+    获取当前进程的全局连接池（fork 之后自动重建）
+    :param db_config: 数据库连接配置
+    :param pool_config: 连接池配置
+    :return: ConnectionPool 对象
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = ConnectionPool(db_config, **(pool_config or {}))
+            _pool_pid = pid
+    return _pool
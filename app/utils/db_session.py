@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+请求级数据库会话（Unit of Work）模块
+每个 HTTP 请求最多借用一个连接、开启一个事务，请求结束时统一提交或回滚
+"""
+
+from flask import g, has_request_context, jsonify
+
+
+class DbSession:
+    """
+    请求级数据库会话
+    连接在第一次执行 SQL 时才从连接池借出，并立即开启事务
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.connection = None
+        self.rollback_only = False
+        self._callbacks = []
+        self._commit_callbacks = []
+
+    def get_connection(self):
+        """
+        获取会话连接（首次调用时借出并开启事务）
+        :return: 数据库连接对象
+        """
+        if self.connection is None:
+            connection = self.pool.acquire()
+            try:
+                connection.begin()
+            except Exception:
+                self.pool.release(connection, discard=True)
+                raise
+            self.connection = connection
+        return self.connection
+
+    def after_transaction(self, callback):
+        """
+        注册事务结束（提交或回滚）后执行的回调，如缓存失效
+        :param callback: 无参数的回调函数
+        """
+        self._callbacks.append(callback)
+
+    def after_commit(self, callback):
+        """
+        注册事务成功提交后才执行的回调，如推送变更事件（回滚时丢弃）
+        :param callback: 无参数的回调函数
+        """
+        self._commit_callbacks.append(callback)
+    
+    def _run_callbacks(self, committed=False):
+        callbacks, self._callbacks = self._callbacks, []
+        commit_callbacks, self._commit_callbacks = self._commit_callbacks, []
+        if committed:
+            callbacks.extend(commit_callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"事务回调执行失败: {e}")
+
+    def mark_failed(self):
+        """标记会话只能回滚（会话内任一语句失败时调用）"""
+        self.rollback_only = True
+
+    def commit(self):
+        """
+        提交事务并归还连接
+        会话内有语句失败（rollback_only）时整个事务回滚，同样返回False
+        :return: 成功返回True，失败返回False（此时事务已回滚）
+        """
+        if self.rollback_only:
+            self.rollback()
+            return False
+        if self.connection is None:
+            self._run_callbacks(committed=True)
+            return True
+        connection = self.connection
+        self.connection = None
+        try:
+            connection.commit()
+        except Exception as e:
+            print(f"事务提交失败: {e}")
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+            self.pool.release(connection, discard=True)
+            self._run_callbacks()
+            return False
+        self.pool.release(connection)
+        self._run_callbacks(committed=True)
+        return True
+
+    def rollback(self):
+        """回滚事务并归还连接"""
+        if self.connection is None:
+            self._run_callbacks()
+            return
+        connection = self.connection
+        self.connection = None
+        try:
+            connection.rollback()
+        except Exception as e:
+            print(f"事务回滚失败: {e}")
+            self.pool.release(connection, discard=True)
+        else:
+            self.pool.release(connection)
+        # 存储过程可能已自行提交，回滚后同样执行回调（多余的缓存失效是无害的）
+        self._run_callbacks()
+
+
+def get_current_session():
+    """
+    获取当前请求绑定的数据库会话
+    :return: DbSession 对象，不在请求上下文中时返回None
+    """
+    if not has_request_context():
+        return None
+    return g.get('_db_session')
+
+
+def init_app(app, pool_getter):
+    """
+    为 Flask 应用注册请求级数据库会话
+    :param app: Flask 应用实例
+    :param pool_getter: 返回连接池对象的函数
+    """
+    app.config.setdefault('DB_REQUEST_SESSION', True)
+
+    @app.before_request
+    def _open_db_session():
+        if app.config['DB_REQUEST_SESSION']:
+            g._db_session = DbSession(pool_getter())
+
+    @app.after_request
+    def _commit_db_session(response):
+        db_session = g.pop('_db_session', None)
+        if db_session is None:
+            return response
+        # 出错的响应不提交，避免多步写操作只完成一半
+        if response.status_code >= 400:
+            db_session.rollback()
+        elif not db_session.commit():
+            # 语句失败或提交失败时写入已全部回滚，不能再返回处理函数的成功响应
+            response = jsonify({'status': 'error', 'message': '数据库操作失败，事务已回滚'})
+            response.status_code = 500
+        return response
+
+    @app.teardown_request
+    def _close_db_session(exc):
+        # after_request 未执行（如出现未处理异常）时兜底回滚
+        db_session = g.pop('_db_session', None)
+        if db_session is not None:
+            db_session.rollback()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+条件请求（ETag / If-None-Match）模块
+响应的 ETag 由接口依赖的表的版本号（见 cache.touch_tables）计算，
+客户端携带的 If-None-Match 与当前 ETag 一致时直接返回 304，不执行视图函数，也不查询数据库
+- 版本号只在应用的写入路径中更新，进程内缓存（CACHE_BACKEND='memory'）的版本号每个 worker 各一份，
+  没有处理写入的 worker 会一直返回 304，因此默认只在共享后端（redis）下启用 ETag
+- 直接修改数据库的写入不会更新版本号，ETag 另外按 ETAG_MAX_AGE 秒分段，过期数据最多被确认这么久
+"""
+
+import functools
+import hashlib
+import time
+
+from flask import current_app, make_response, request, session
+
+from app.utils.cache import table_versions, versions_epoch
+
+
+def init_app(app):
+    """
+    根据应用配置初始化条件请求
+    - ETAG_ENABLED: 是否启用 ETag，默认仅在 CACHE_BACKEND 为 'redis'（多 worker 共享版本号）时启用
+    - ETAG_MAX_AGE: ETag 的最长有效秒数，用于兜底应用之外的数据库写入
+    """
+    app.config.setdefault('ETAG_ENABLED', app.config.get('CACHE_BACKEND') == 'redis')
+    app.config.setdefault('ETAG_MAX_AGE', 60)
+
+
+def _make_etag(versions, epoch):
+    # 同一接口的不同查询参数、不同角色看到的数据不同，都计入 ETag
+    period = int(time.time() // current_app.config.get('ETAG_MAX_AGE', 60))
+    raw = (f"{epoch}|{period}|{request.full_path}|{session.get('user_role')}|"
+           f"{'.'.join(str(v) for v in versions)}")
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:24]
+
+
+def conditional(*tables):
+    """
+    为只读接口添加 ETag 支持的装饰器（放在 login_required 之后）
+    版本号在执行视图之前读取：视图执行期间若有写入，下次请求的 ETag 必然不同，不会返回过期数据
+    :param tables: 接口数据依赖的表，任一表被写入后 ETag 变化
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('ETAG_ENABLED'):
+                return func(*args, **kwargs)
+            versions = table_versions(*tables)
+            epoch = versions_epoch() if versions is not None else None
+            if versions is None or epoch is None:
+                return func(*args, **kwargs)
+
+            etag = _make_etag(versions, epoch)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(func(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            # 允许缓存，但每次使用前必须用 If-None-Match 重新验证
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
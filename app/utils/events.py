@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+变更事件推送模块
+模型写入路径通过 emit() 发布设备、预约、维护记录的变更事件（在请求级事务提交后才发布），
+/api/events 以 Server-Sent Events 推送给前端
+- EventBus：进程内发布/订阅，保留最近的事件用于断线重连（Last-Event-ID）
+- RedisEventRelay：多 worker 部署时通过 Redis 发布/订阅在进程间转发事件（需要安装 redis 包）
+"""
+
+import json
+import os
+import threading
+from collections import deque
+
+from app.utils.db_session import get_current_session
+from app.utils.json_provider import dumps
+
+
+class Subscription:
+    """单个 SSE 连接的事件队列"""
+
+    def __init__(self, max_queue):
+        self.max_queue = max_queue
+        self.overflowed = False
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    def put(self, event):
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                # 客户端读取过慢，断开后由客户端携带 Last-Event-ID 重连补发
+                self.overflowed = True
+            else:
+                self._queue.append(event)
+            self._cond.notify()
+
+    def get(self, timeout):
+        """
+        等待下一个事件
+        :param timeout: 最长等待秒数
+        :return: 事件，超时返回None
+        """
+        with self._cond:
+            if not self._queue and not self.overflowed:
+                self._cond.wait(timeout)
+            return self._queue.popleft() if self._queue else None
+
+
+class EventBus:
+    """
+    进程内事件总线
+    事件为 (id, type, data_json, owner) 元组，id 为 '<纪元>-<序号>'，纪元区分不同进程/重启；
+    owner 不为None时事件只推送给该用户和管理员/教师（如学生自己的预约）
+    """
+
+    def __init__(self, history=1000, max_queue=256):
+        self.max_queue = max_queue
+        self.epoch = os.urandom(4).hex()
+        self._seq = 0
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data_json, owner=None):
+        """
+        发布事件给本进程的全部订阅者
+        :param event_type: 事件类型，如 'device.status'
+        :param data_json: 事件数据的 JSON 字符串
+        :param owner: 事件所属用户ID
+        """
+        with self._lock:
+            self._seq += 1
+            event = (f'{self.epoch}-{self._seq}', event_type, data_json, owner)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def subscribe(self, last_event_id=None):
+        """
+        订阅事件
+        :param last_event_id: 客户端最后收到的事件ID，用于补发断线期间的事件
+        :return: (Subscription, 需要补发的事件列表)
+        """
+        subscription = Subscription(self.max_queue)
+        with self._lock:
+            self._subscribers.add(subscription)
+            missed = self._missed_since(last_event_id)
+        return subscription, missed
+
+    def _missed_since(self, last_event_id):
+        if not last_event_id:
+            return []
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return []
+        seq = int(seq)
+        return [event for event in self._history if int(event[0].split('-')[1]) > seq]
+
+    def unsubscribe(self, subscription):
+        """取消订阅"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self):
+        """
+        获取事件总线指标
+        :return: 指标字典
+        """
+        with self._lock:
+            return {'published': self._seq, 'subscribers': len(self._subscribers), 'history': len(self._history)}
+
+
+class RedisEventRelay:
+    """通过 Redis 频道在多个 worker 之间转发事件，每个进程由后台线程把收到的事件发布到本地总线"""
+
+    def __init__(self, bus, url='redis://localhost:6379/0', channel='roommgmt:events'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("使用 Redis 事件转发需要先安装 redis 包：pip install redis")
+        self.bus = bus
+        self.channel = channel
+        self._client = redis.Redis.from_url(url)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_listener(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != pid or not self._thread.is_alive():
+                self._pid = pid
+                self._thread = threading.Thread(target=self._listen, name='event-relay', daemon=True)
+                self._thread.start()
+
+    def _listen(self):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            try:
+                event_type, data_json, owner = json.loads(message['data'])
+                self.bus.publish(event_type, data_json, owner)
+            except Exception as e:
+                print(f"事件转发失败: {e}")
+
+    def publish(self, event_type, data_json, owner=None):
+        self._ensure_listener()
+        try:
+            self._client.publish(self.channel, json.dumps([event_type, data_json, owner]))
+        except Exception as e:
+            print(f"事件发布失败: {e}")
+
+    def subscribe(self, last_event_id=None):
+        self._ensure_listener()
+        return self.bus.subscribe(last_event_id)
+
+
+_bus = EventBus()
+_publisher = _bus
+
+
+def init_app(app):
+    """
+    根据应用配置初始化事件推送
+    - EVENTS_BACKEND: 'memory'（默认，单进程）或 'redis'（多 worker）
+    - EVENTS_REDIS_URL: Redis 连接地址
+    - EVENTS_HEARTBEAT: SSE 心跳间隔（秒）
+    """
+    global _publisher
+    app.config.setdefault('EVENTS_BACKEND', 'memory')
+    app.config.setdefault('EVENTS_REDIS_URL', 'redis://localhost:6379/0')
+    app.config.setdefault('EVENTS_HEARTBEAT', 15)
+
+    if app.config['EVENTS_BACKEND'] == 'redis':
+        _publisher = RedisEventRelay(_bus, app.config['EVENTS_REDIS_URL'])
+    else:
+        _publisher = _bus
+
+
+def get_bus():
+    """
+    获取事件总线
+    :return: EventBus 对象
+    """
+    return _bus
+
+
+def subscribe(last_event_id=None):
+    """
+    订阅变更事件
+    :return: (Subscription, 需要补发的事件列表)
+    """
+    return _publisher.subscribe(last_event_id)
+
+
+def emit(event_type, owner=None, **data):
+    """
+    发布变更事件
+    在请求级事务中，事件在事务提交后才发布，回滚时丢弃
+    :param event_type: 事件类型
+    :param owner: 事件所属用户ID，None表示所有登录用户可见
+    :param data: 事件数据
+    """
+    data_json = dumps(data)
+    db_session = get_current_session()
+    if db_session is not None:
+        db_session.after_commit(lambda: _publisher.publish(event_type, data_json, owner))
+    else:
+        _publisher.publish(event_type, data_json, owner)
+
+
+def format_sse(event):
+    """
+    将事件编码为 SSE 消息
+    :param event: (id, type, data_json, owner)
+    :return: SSE 文本
+    """
+    event_id, event_type, data_json, _ = event
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data_json}\n\n"
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流式导出模块
+把逐行产出的查询结果编码为 CSV 或 JSONL 并以流式响应返回，可选 gzip 压缩，
+任意时刻只在内存中保留一个输出块
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response
+
+from app.utils.query_filter import TIME_FORMAT
+
+# 支持的导出格式
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8'
+}
+
+# 累积到该字节数后输出一个块
+CHUNK_SIZE = 64 * 1024
+
+
+def _to_text(value):
+    if isinstance(value, datetime):
+        return value.strftime(TIME_FORMAT)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _csv_chunks(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # 带 BOM，Excel 打开中文不乱码
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_to_text(row.get(column)) for column in columns])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _jsonl_chunks(rows, columns):
+    parts, size = [], 0
+    for row in rows:
+        line = json.dumps({column: _to_text(row.get(column)) for column in columns}, ensure_ascii=False) + '\n'
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(parts).encode('utf-8')
+            parts, size = [], 0
+    if parts:
+        yield ''.join(parts).encode('utf-8')
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 输出 gzip 格式
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(rows, columns, fmt='csv', filename='export', use_gzip=False):
+    """
+    生成流式导出响应
+    :param rows: 逐行产出字典的可迭代对象（如 stream_query 的结果）
+    :param columns: 导出的列名列表
+    :param fmt: 'csv' 或 'jsonl'
+    :param filename: 下载文件名（不含扩展名）
+    :param use_gzip: 是否使用 gzip 内容编码
+    :return: Flask Response
+    :raises ValueError: 不支持的导出格式
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}，可选 {', '.join(EXPORT_FORMATS)}")
+
+    chunks = _csv_chunks(rows, columns) if fmt == 'csv' else _jsonl_chunks(rows, columns)
+    headers = {'Content-Disposition': f'attachment; filename="{filename}.{fmt}"'}
+    if use_gzip:
+        chunks = _gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    return Response(chunks, content_type=EXPORT_FORMATS[fmt], headers=headers)
+
+
+def parse_export_args(args):
+    """
+    从请求参数中解析导出选项
+    - format: csv（默认）或 jsonl
+    - gzip: 1/true 时使用 gzip 内容编码
+    :param args: request.args
+    :return: (fmt, use_gzip)
+    :raises ValueError: 不支持的导出格式
+    """
+    fmt = args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}，可选 {', '.join(EXPORT_FORMATS)}")
+    use_gzip = args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    return fmt, use_gzip
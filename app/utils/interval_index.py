@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+区间索引模块
+- IntervalTimeline：单个设备的区间树（以最大结束时间增强的 treap），插入和冲突检测均为 O(log n)
+- TimelineIndex：按设备缓存已确认预约的时间线，用于空闲时段查询和预约前的快速冲突检查
+  每个时间线记录加载时 reservations 表的版本号，预约相关的写入（touch_tables，事务结束后更新版本号）后失效；
+  进程内缓存（CACHE_BACKEND='memory'）的版本号每个 worker 各一份，其他 worker 的写入不会使本进程的时间线失效，
+  因此默认只在共享后端（redis）下启用。时间线只用于提前拒绝，最终的冲突检查仍由持有设备行锁的 SQL 完成
+"""
+
+import random
+
+from app.utils.cache import MemoryCache, table_versions
+
+
+class _Node:
+    """treap 节点：按 (start, end, key) 排序，max_end 为子树中结束时间的最大值"""
+
+    __slots__ = ('item', 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, item):
+        self.item = item
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = item[1]
+
+
+def _update(node):
+    max_end = node.item[1]
+    for child in (node.left, node.right):
+        if child is not None and child.max_end > max_end:
+            max_end = child.max_end
+    node.max_end = max_end
+
+
+def _rotate_right(node):
+    left = node.left
+    node.left = left.right
+    left.right = node
+    _update(node)
+    _update(left)
+    return left
+
+
+def _rotate_left(node):
+    right = node.right
+    node.right = right.left
+    right.left = node
+    _update(node)
+    _update(right)
+    return right
+
+
+def _insert(node, item):
+    if node is None:
+        return _Node(item)
+    if item < node.item:
+        node.left = _insert(node.left, item)
+        if node.left.priority > node.priority:
+            return _rotate_right(node)
+    else:
+        node.right = _insert(node.right, item)
+        if node.right.priority > node.priority:
+            return _rotate_left(node)
+    _update(node)
+    return node
+
+
+def _collect(node, start, end, result):
+    # 子树中没有结束时间晚于 start 的区间时整棵剪掉
+    if node is None or node.max_end <= start:
+        return
+    _collect(node.left, start, end, result)
+    if node.item[0] >= end:
+        # 右子树的开始时间都不早于当前节点
+        return
+    if node.item[1] > start:
+        result.append(node.item)
+    _collect(node.right, start, end, result)
+
+
+class IntervalTimeline:
+    """
+    单个设备的时间线：[start, end) 区间集合，允许区间之间存在重叠
+    """
+
+    def __init__(self, intervals=()):
+        self._root = None
+        self._size = 0
+        for start, end, key in intervals:
+            self.add(start, end, key)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, start, end, key):
+        """添加区间"""
+        self._root = _insert(self._root, (start, end, key))
+        self._size += 1
+
+    def overlapping(self, start, end):
+        """
+        查找与 [start, end) 重叠的区间
+        中序遍历，按子树最大结束时间和节点开始时间剪枝
+        :return: 重叠区间列表 [(start, end, key)]，按开始时间排序
+        """
+        result = []
+        _collect(self._root, start, end, result)
+        return result
+
+    def has_conflict(self, start, end, exclude_key=None):
+        """
+        判断 [start, end) 是否与已有区间重叠
+        :param exclude_key: 忽略的区间键（用于更新自身时）
+        """
+        return any(item[2] != exclude_key for item in self.overlapping(start, end))
+
+    def free_slots(self, window_start, window_end, duration, limit=None):
+        """
+        在 [window_start, window_end) 内查找长度不小于 duration 的空闲时段
+        对与窗口相交的区间按开始时间做一次扫描
+        :param duration: timedelta
+        :param limit: 最多返回的时段数
+        :return: 空闲时段列表 [(start, end)]
+        """
+        slots = []
+        cursor = window_start
+        for start, end, key in self.overlapping(window_start, window_end):
+            if start - cursor >= duration:
+                slots.append((cursor, start))
+                if limit and len(slots) >= limit:
+                    return slots
+            if end > cursor:
+                cursor = end
+        if window_end - cursor >= duration:
+            slots.append((cursor, window_end))
+        return slots[:limit] if limit else slots
+
+
+class TimelineIndex:
+    """按设备缓存的已确认预约时间线"""
+
+    def __init__(self, loader, max_devices=1024, ttl=60):
+        """
+        :param loader: loader(dids) -> {did: [(start, end, key)]}，查询失败返回None
+        :param max_devices: 最多缓存的设备数
+        :param ttl: 缓存秒数，兜底应用之外的数据库写入
+        """
+        self._loader = loader
+        self.ttl = ttl
+        self._cache = MemoryCache(max_devices)
+
+    def get_many(self, dids):
+        """
+        获取多个设备的时间线，缺失或已失效的设备一次查询加载
+        版本号在查询之前读取：加载期间若有写入，下次读取时版本号不一致会重新加载
+        返回的时间线由多个请求共享，调用方不能修改
+        :param dids: 设备ID列表
+        :return: {did: IntervalTimeline}，缓存后端或查询失败时返回None
+        """
+        versions = table_versions('reservations')
+        if versions is None:
+            return None
+        version = versions[0]
+        timelines, missing = {}, []
+        for did in dids:
+            entry = self._cache.get(did)
+            if entry is not None and entry[0] == version:
+                timelines[did] = entry[1]
+            else:
+                missing.append(did)
+        if missing:
+            intervals = self._loader(missing)
+            if intervals is None:
+                return None
+            for did in missing:
+                timeline = IntervalTimeline(intervals.get(did, ()))
+                self._cache.set(did, (version, timeline), self.ttl)
+                timelines[did] = timeline
+        return timelines
+
+    def stats(self):
+        """
+        获取缓存指标
+        :return: 指标字典
+        """
+        data = self._cache.stats()
+        data['ttl'] = self.ttl
+        return data
+
+
+_index = None
+
+
+def init_app(app, loader):
+    """
+    根据应用配置初始化设备时间线索引
+    - TIMELINE_INDEX_ENABLED: 是否启用，默认仅在 CACHE_BACKEND 为 'redis'（多 worker 共享版本号）时启用
+    - TIMELINE_INDEX_TTL: 时间线的最长缓存秒数
+    - TIMELINE_INDEX_SIZE: 最多缓存的设备数
+    :param app: Flask 应用实例
+    :param loader: 按设备加载已确认预约区间的函数
+    """
+    global _index
+    app.config.setdefault('TIMELINE_INDEX_ENABLED', app.config.get('CACHE_BACKEND') == 'redis')
+    app.config.setdefault('TIMELINE_INDEX_TTL', 60)
+    app.config.setdefault('TIMELINE_INDEX_SIZE', 1024)
+    _index = None
+    if app.config['TIMELINE_INDEX_ENABLED']:
+        _index = TimelineIndex(loader, app.config['TIMELINE_INDEX_SIZE'], app.config['TIMELINE_INDEX_TTL'])
+
+
+def get_timeline_index():
+    """
+    获取设备时间线索引
+    :return: TimelineIndex 对象，未启用时返回None
+    """
+    return _index
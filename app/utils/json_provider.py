@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+JSON 序列化模块
+- FastJSONProvider：Flask 的 JSON provider，安装了 orjson 时使用 orjson，否则使用标准库 json
+- 与 Flask 默认 provider 的输出保持一致：查询结果中的日期时间输出为 HTTP 日期格式，Decimal 输出为字符串
+- __slots__ 模型对象按字段输出（模型类的 JSON_EXCLUDE 中的字段不输出，如用户密码），
+  其中的 datetime 输出为 'YYYY-MM-DD HH:MM:SS'（与原先控制器中手写的 strftime 一致）
+- RowSet：元组游标的查询结果，序列化时按列直接把元组写成 JSON 对象，不构造中间字典
+"""
+
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from operator import attrgetter
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _model_value(value):
+    # 输出 YYYY-MM-DD HH:MM:SS（与 query_filter.TIME_FORMAT 一致），比 strftime 快得多
+    return value.isoformat(' ', 'seconds') if isinstance(value, datetime) else value
+
+
+def _default(o):
+    """
+    两种编码器共用的非基本类型处理
+    日期、Decimal 等交给 Flask 默认 provider 的处理函数，保持原有输出格式
+    """
+    if isinstance(o, (time, timedelta)):
+        return str(o)
+    if isinstance(o, RowSet):
+        return list(o)
+    fields = _model_fields(type(o))
+    if fields:
+        return {field: _model_value(getattr(o, field)) for field in fields}
+    return DefaultJSONProvider.default(o)
+
+
+def _event_default(o):
+    """事件推送的非基本类型处理：datetime 与模型对象的格式一致"""
+    if isinstance(o, datetime):
+        return _model_value(o)
+    return _default(o)
+
+
+def _model_fields(cls):
+    """__slots__ 模型类需要输出的字段，不是模型类时返回None"""
+    slots = getattr(cls, '__slots__', None)
+    if not slots or issubclass(cls, RowSet):
+        return None
+    exclude = getattr(cls, 'JSON_EXCLUDE', ())
+    return tuple(field for field in slots if field not in exclude)
+
+
+_encode_string = json.encoder.encode_basestring
+
+
+def _encode_http_date(value):
+    return '"' + http_date(value) + '"'
+
+
+# 按值类型选择编码函数（bool 是 int 的子类，必须单独列出），输出与 _default 一致
+_VALUE_ENCODERS = {
+    str: _encode_string,
+    int: int.__repr__,
+    float: float.__repr__,
+    bool: lambda value: 'true' if value else 'false',
+    type(None): lambda value: 'null',
+    datetime: _encode_http_date,
+    date: _encode_http_date,
+    Decimal: lambda value: '"' + str(value) + '"',
+    timedelta: lambda value: '"' + str(value) + '"',
+}
+
+# 模型对象的字段值：datetime 输出为 YYYY-MM-DD HH:MM:SS
+_MODEL_VALUE_ENCODERS = {**_VALUE_ENCODERS, datetime: lambda value: '"' + _model_value(value) + '"'}
+
+
+def _encode_value(value):
+    encoder = _VALUE_ENCODERS.get(type(value))
+    if encoder is not None:
+        return encoder(value)
+    return json.dumps(value, ensure_ascii=False, default=_default)
+
+
+class RowSet:
+    """
+    元组游标的查询结果：列名 + 元组行
+    对调用方表现为字典序列（按下标或迭代时才构造字典），序列化时直接由元组生成 JSON
+    """
+
+    __slots__ = ('columns', 'rows')
+
+    _encoders = _VALUE_ENCODERS
+
+    def __init__(self, columns, rows):
+        self.columns = tuple(columns)
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return type(self)(self.columns, self.rows[index])
+        return dict(zip(self.columns, self.rows[index]))
+
+    def __iter__(self):
+        columns = self.columns
+        for row in self.rows:
+            yield dict(zip(columns, row))
+
+    def to_json(self):
+        """
+        直接由元组行生成 JSON 数组文本
+        每列的 '"列名":' 前缀只编码一次，每行只做值编码和字符串拼接
+        """
+        prefixes = ['{' + _encode_string(self.columns[0]) + ':'] + \
+                   [',' + _encode_string(column) + ':' for column in self.columns[1:]]
+        encoders = self._encoders
+        parts = []
+        for row in self.rows:
+            items = []
+            for prefix, value in zip(prefixes, row):
+                encoder = encoders.get(type(value))
+                items.append(prefix + (encoder(value) if encoder is not None else _encode_value(value)))
+            parts.append(''.join(items) + '}')
+        return '[' + ','.join(parts) + ']'
+
+
+class ModelRowSet(RowSet):
+    """由同一模型类的对象列表转换得到的 RowSet，字段值按模型对象的格式输出"""
+
+    __slots__ = ()
+
+    _encoders = _MODEL_VALUE_ENCODERS
+
+
+def _as_rowset(value):
+    """同一模型类的对象列表转换为 RowSet（用 attrgetter 一次取出一行的全部字段）"""
+    if not isinstance(value, list) or not value:
+        return None
+    cls = type(value[0])
+    fields = _model_fields(cls)
+    if not fields or any(type(item) is not cls for item in value):
+        return None
+    getter = attrgetter(*fields)
+    rows = [(getter(item),) for item in value] if len(fields) == 1 else list(map(getter, value))
+    return ModelRowSet(fields, rows)
+
+
+def _top_level_rowsets(obj):
+    """
+    找出顶层字典中的 RowSet（以及可转换为 RowSet 的模型对象列表）
+    响应一般形如 {'status': 'success', 'devices': RowSet}，只处理这一层即可
+    :return: {键: RowSet}，没有时返回None
+    """
+    if not isinstance(obj, dict):
+        return None
+    rowsets = {}
+    for key, value in obj.items():
+        if not isinstance(value, RowSet):
+            value = _as_rowset(value)
+        if value is not None and value.columns:
+            rowsets[key] = value
+    return rowsets or None
+
+
+def _encode_object(obj, rowsets, encode):
+    """
+    逐个键编码顶层字典并拼接，RowSet 的值直接使用 to_json() 的结果
+    不在文档中写入占位符再替换，字符串值中的任何内容都不会影响输出
+    :param encode: 单个值的编码函数
+    """
+    parts = []
+    for key, value in obj.items():
+        rowset = rowsets.get(key)
+        parts.append(encode(key if isinstance(key, str) else str(key)) + ':' +
+                     (rowset.to_json() if rowset is not None else encode(value)))
+    return '{' + ','.join(parts) + '}'
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    可替换编码器的 JSON provider
+    - 安装 orjson 时使用 orjson 编码/解码（时间类型交给 _default，与 Flask 默认 provider 格式一致）
+    - 否则使用标准库 json，行为与 Flask 默认 provider 一致
+    """
+
+    ensure_ascii = False
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        # 带额外参数（如 indent）时整体编码，RowSet 由 _default 转换
+        rowsets = None if kwargs else _top_level_rowsets(obj)
+        if orjson is not None and not kwargs:
+            def encode(value):
+                return orjson.dumps(
+                    value, default=_default,
+                    option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+                ).decode('utf-8')
+        else:
+            kwargs.setdefault('default', _default)
+            kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            kwargs.setdefault('separators', (',', ':'))
+
+            def encode(value):
+                return json.dumps(value, **kwargs)
+        if rowsets:
+            return _encode_object(obj, rowsets, encode)
+        return encode(obj)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps(obj) + '\n', mimetype=self.mimetype)
+
+
+def dumps(obj):
+    """
+    在应用上下文之外序列化对象（如 SSE 事件），datetime 格式与接口返回的模型对象一致
+    :return: JSON 字符串
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            obj, default=_event_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        ).decode('utf-8')
+    return json.dumps(obj, default=_event_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def backend_name():
+    """
+    当前使用的 JSON 编码器
+    :return: 'orjson' 或 'json'
+    """
+    return 'orjson' if orjson is not None else 'json'
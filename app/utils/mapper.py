@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+行到模型的映射模块
+模型类用 __slots__ 声明字段，映射器按字段顺序生成 SELECT 列表，
+并为每个模型生成一个按位置解包元组行的构造函数，省去逐行构造字典和按键取值的开销
+"""
+
+from app.utils.db_config import execute_query_tuples
+
+
+def _compile_hydrator(model_cls, fields):
+    """
+    生成 hydrate(row) 函数：object.__new__ 创建对象后一次性解包元组行
+    例如：obj.did, obj.dname, obj.type = row
+    """
+    targets = ', '.join(f'obj.{field}' for field in fields)
+    if len(fields) == 1:
+        targets += ','
+    source = (
+        "def hydrate(row):\n"
+        "    obj = new(cls)\n"
+        f"    {targets} = row\n"
+        "    return obj\n"
+    )
+    namespace = {'new': object.__new__, 'cls': model_cls}
+    exec(source, namespace)
+    return namespace['hydrate']
+
+
+class Mapper:
+    """
+    模型映射器
+    用法：_mapper = Mapper(Device)
+          devices = _mapper.fetch_all(f"SELECT {_mapper.columns} FROM devices")
+    """
+
+    def __init__(self, model_cls, fields=None):
+        """
+        :param model_cls: 模型类
+        :param fields: 字段列表，默认使用模型类的 __slots__（顺序即 SELECT 列顺序）
+        """
+        self.model_cls = model_cls
+        self.fields = tuple(fields or model_cls.__slots__)
+        self.columns = self.select_list()
+        self._hydrate = _compile_hydrator(model_cls, self.fields)
+
+    def select_list(self, alias=''):
+        """
+        生成 SELECT 列表
+        :param alias: 表别名前缀，如 'd.'
+        :return: 形如 'd.did, d.dname' 的字符串
+        """
+        return ', '.join(f'{alias}{field}' for field in self.fields)
+
+    def from_row(self, row):
+        """
+        将一个元组行转换为模型对象
+        :return: 模型对象，row 为None时返回None
+        """
+        return self._hydrate(row) if row is not None else None
+
+    def from_rows(self, rows):
+        """
+        将多个元组行转换为模型对象列表
+        :return: 模型对象列表
+        """
+        return list(map(self._hydrate, rows)) if rows else []
+
+    def fetch_one(self, query, params=None):
+        """
+        使用元组游标查询一条记录并转换为模型对象
+        :return: 模型对象，不存在或查询失败时返回None
+        """
+        return self.from_row(execute_query_tuples(query, params, fetch_one=True))
+
+    def fetch_all(self, query, params=None):
+        """
+        使用元组游标查询多条记录并转换为模型对象列表
+        :return: 模型对象列表，查询失败时返回空列表
+        """
+        return self.from_rows(execute_query_tuples(query, params))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+机房开放时间解析模块
+rooms.open_time 为自由文本，如 '周一至周五 8:00-22:00，周末 9:00-18:00'、'每天 8:00-22:00'，
+解析为按星期几的开放时段，用于空闲时段查询
+"""
+
+import re
+from datetime import datetime, time, timedelta
+
+# 星期名称 -> weekday()（周一为0）
+_DAY_NAMES = {'一': 0, '二': 1, '三': 2, '四': 3, '五': 4, '六': 5, '日': 6, '天': 6, '七': 6}
+
+# 表示一组星期的关键字
+_DAY_GROUPS = {
+    '每天': range(7),
+    '每日': range(7),
+    '全天': range(7),
+    '工作日': range(5),
+    '周末': (5, 6),
+}
+
+_SEGMENT_SPLIT = re.compile(r'[，,;；、\n]+')
+_TIME_RANGE = re.compile(r'(\d{1,2})[:：](\d{2})\s*[-~—至到]\s*(\d{1,2})[:：](\d{2})')
+_DAY_RANGE = re.compile(r'(?:周|星期)([一二三四五六日天七])\s*[至到\-~—]\s*(?:周|星期)?([一二三四五六日天七])')
+_SINGLE_DAY = re.compile(r'(?:周|星期)([一二三四五六日天七])')
+
+
+def _to_minutes(hour, minute):
+    """时刻转换为当天的分钟数（允许 24:00）"""
+    return min(int(hour) * 60 + int(minute), 24 * 60)
+
+
+def _parse_days(text):
+    """解析一个分段中的星期部分，未写星期时返回None"""
+    days = set()
+    for keyword, group in _DAY_GROUPS.items():
+        if keyword in text:
+            days.update(group)
+    for first, last in _DAY_RANGE.findall(text):
+        first, last = _DAY_NAMES[first], _DAY_NAMES[last]
+        days.update(range(first, last + 1) if first <= last else list(range(first, 7)) + list(range(0, last + 1)))
+    text = _DAY_RANGE.sub('', text)
+    for name in _SINGLE_DAY.findall(text):
+        days.add(_DAY_NAMES[name])
+    return days or None
+
+
+def parse_open_time(text):
+    """
+    解析开放时间文本
+    :param text: 开放时间文本
+    :return: {weekday: [(开始分钟, 结束分钟)]}，无法解析时返回None（按全天开放处理）
+    """
+    if not text:
+        return None
+    schedule = {}
+    for segment in _SEGMENT_SPLIT.split(text):
+        ranges = [(_to_minutes(h1, m1), _to_minutes(h2, m2)) for h1, m1, h2, m2 in _TIME_RANGE.findall(segment)]
+        ranges = [(start, end) for start, end in ranges if start < end]
+        if not ranges:
+            continue
+        # 分段未写星期时视为每天
+        days = _parse_days(_TIME_RANGE.sub('', segment)) or range(7)
+        for day in days:
+            schedule.setdefault(day, []).extend(ranges)
+    if not schedule:
+        return None
+    # 同一天的多个时段排序并合并重叠部分
+    for day, ranges in schedule.items():
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        schedule[day] = merged
+    return schedule
+
+
+def open_windows(schedule, window_start, window_end):
+    """
+    列出 [window_start, window_end) 内的开放时段
+    :param schedule: parse_open_time 的结果，None表示全天开放
+    :param window_start: 开始时间
+    :param window_end: 结束时间
+    :return: 按时间排序的开放时段列表 [(start, end)]
+    """
+    if schedule is None:
+        return [(window_start, window_end)] if window_start < window_end else []
+    windows = []
+    day = window_start.date()
+    while day <= window_end.date():
+        midnight = datetime.combine(day, time.min)
+        for start, end in schedule.get(day.weekday(), ()):
+            start = max(midnight + timedelta(minutes=start), window_start)
+            end = min(midnight + timedelta(minutes=end), window_end)
+            if start < end:
+                windows.append((start, end))
+        day += timedelta(days=1)
+    return windows
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分页工具模块（基于 (排序列, 主键) 的 keyset 游标分页）
+"""
+
+import base64
+import json
+from datetime import datetime
+
+# 默认每页条数
+DEFAULT_PAGE_SIZE = 50
+# 每页最大条数
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(*values):
+    """
+    将排序键编码为不透明的游标字符串
+    :param values: 排序列的值和主键值
+    :return: 游标字符串
+    """
+    data = [v.strftime('%Y-%m-%d %H:%M:%S') if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解码游标字符串
+    :param cursor: 游标字符串
+    :return: 排序键列表
+    :raises ValueError: 游标格式错误
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError('无效的分页游标')
+    if not isinstance(data, list) or not data:
+        raise ValueError('无效的分页游标')
+    return data
+
+
+def parse_page_args(args):
+    """
+    从请求参数中解析 limit 和 cursor
+    - 未提供 limit 和 cursor 时不分页（返回 limit=None）
+    - 提供 cursor 但未提供 limit 时使用默认每页条数
+    :param args: request.args
+    :return: (limit, cursor)
+    :raises ValueError: 参数格式错误
+    """
+    limit = args.get('limit')
+    cursor = args.get('cursor') or None
+
+    if limit is None:
+        return (DEFAULT_PAGE_SIZE if cursor else None), cursor
+
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError('limit 必须为整数')
+    if limit <= 0:
+        raise ValueError('limit 必须大于0')
+    return min(limit, MAX_PAGE_SIZE), cursor
+
+
+def keyset_condition(cursor, pk_column, sort_column=None, descending=True):
+    """
+    根据游标生成 keyset 分页的 WHERE 条件
+    :param cursor: 游标字符串
+    :param pk_column: 主键列名
+    :param sort_column: 排序列名，None表示仅按主键排序
+    :param descending: 是否降序
+    :return: (条件SQL, 参数列表)
+    :raises ValueError: 游标格式错误
+    """
+    values = decode_cursor(cursor)
+    op = '<' if descending else '>'
+
+    if sort_column is None:
+        return f"{pk_column} {op} %s", [values[-1]]
+
+    if len(values) != 2:
+        raise ValueError('无效的分页游标')
+    sort_value, pk_value = values
+    condition = f"({sort_column} {op} %s OR ({sort_column} = %s AND {pk_column} {op} %s))"
+    return condition, [sort_value, sort_value, pk_value]
+
+
+def next_cursor(rows, limit, pk_key, sort_key=None):
+    """
+    根据当前页数据生成下一页游标
+    :param rows: 当前页数据（字典列表或对象列表）
+    :param limit: 每页条数
+    :param pk_key: 主键字段名
+    :param sort_key: 排序字段名
+    :return: 下一页游标，没有更多数据时返回None
+    """
+    if not limit or not rows or len(rows) < limit:
+        return None
+
+    last = rows[-1]
+    get = last.get if isinstance(last, dict) else lambda key: getattr(last, key)
+    if sort_key is None:
+        return encode_cursor(get(pk_key))
+    return encode_cursor(get(sort_key), get(pk_key))
+
+
+def paginate_query(base_query, conditions, params, limit, cursor, pk_column,
+                   sort_column=None, descending=True):
+    """
+    为查询拼接 WHERE 条件、keyset 条件、ORDER BY 和 LIMIT
+    :param base_query: 不含 WHERE/ORDER BY 的查询语句
+    :param conditions: WHERE 条件列表
+    :param params: 条件参数列表
+    :param limit: 每页条数，None表示不分页
+    :param cursor: 游标字符串
+    :param pk_column: 主键列名
+    :param sort_column: 排序列名，None表示仅按主键排序
+    :param descending: 是否降序
+    :return: (SQL语句, 参数元组)
+    :raises ValueError: 游标格式错误
+    """
+    conditions = list(conditions)
+    params = list(params)
+
+    if cursor:
+        condition, cursor_params = keyset_condition(cursor, pk_column, sort_column, descending)
+        conditions.append(condition)
+        params.extend(cursor_params)
+
+    query = base_query
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+
+    direction = 'DESC' if descending else 'ASC'
+    order_by = [f"{pk_column} {direction}"]
+    if sort_column is not None:
+        order_by.insert(0, f"{sort_column} {direction}")
+    query += " ORDER BY " + ", ".join(order_by)
+
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, tuple(params)
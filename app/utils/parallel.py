@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+并行查询模块
+使用有界线程池并发执行互不依赖的查询，每个查询在工作线程中从连接池借用自己的连接，
+总耗时约为最慢查询的耗时，并记录每个查询的耗时
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 工作线程数（应小于连接池大小，避免并发查询耗尽连接）
+MAX_WORKERS = 4
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+_timings = {}
+_timings_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is not None and _executor_pid == pid:
+        return _executor
+    with _executor_lock:
+        if _executor is None or _executor_pid != pid:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='query')
+            _executor_pid = pid
+    return _executor
+
+
+def _record(name, elapsed):
+    with _timings_lock:
+        item = _timings.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0})
+        item['count'] += 1
+        item['total_ms'] += elapsed
+        item['max_ms'] = max(item['max_ms'], elapsed)
+        item['last_ms'] = elapsed
+
+
+def _timed_call(name, func, in_worker):
+    if in_worker:
+        _local.in_worker = True
+    start = time.perf_counter()
+    try:
+        return func()
+    finally:
+        _record(name, (time.perf_counter() - start) * 1000)
+        if in_worker:
+            _local.in_worker = False
+
+
+def run_parallel(tasks):
+    """
+    并发执行多个互不依赖的查询
+    已经在工作线程中时按顺序执行，避免嵌套提交导致线程池死锁
+    :param tasks: {名称: 无参数函数} 字典
+    :return: {名称: 结果} 字典
+    """
+    if len(tasks) <= 1 or getattr(_local, 'in_worker', False):
+        return {name: _timed_call(name, func, False) for name, func in tasks.items()}
+
+    executor = _get_executor()
+    futures = {name: executor.submit(_timed_call, name, func, True) for name, func in tasks.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def get_query_timings():
+    """
+    获取各查询的耗时统计（毫秒）
+    :return: {名称: {count, total_ms, max_ms, last_ms, avg_ms}} 字典
+    """
+    with _timings_lock:
+        data = {name: dict(item) for name, item in _timings.items()}
+    for item in data.values():
+        item['avg_ms'] = item['total_ms'] / item['count'] if item['count'] else 0.0
+    return data
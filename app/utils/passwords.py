@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+密码哈希模块
+- 新密码使用加盐的 KDF（hashlib.pbkdf2_hmac 或 hashlib.scrypt），参数按目标耗时（毫秒）在启动时标定
+- 哈希在有界线程池中计算（hashlib 计算期间释放 GIL），同时计算的数量受线程数限制，
+  排队过多时抛出 PasswordHasherBusy，由调用方返回 503，而不是让所有请求线程都卡在 CPU 上
+- 兼容旧的无盐 SHA-256 十六进制哈希，校验成功后由调用方升级（needs_rehash）
+
+存储格式：
+    pbkdf2_sha256$<迭代次数>$<盐hex>$<哈希hex>
+    scrypt$<n>$<r>$<p>$<盐hex>$<哈希hex>
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# 标定结果的下限，防止在很慢的机器上得到过弱的参数
+MIN_PBKDF2_ITERATIONS = 50000
+MIN_SCRYPT_N = 2 ** 12
+
+# 已存储哈希的成本低于当前参数的这个比例时才重新哈希（避免标定误差导致每次登录都重新哈希）
+REHASH_RATIO = 0.8
+
+
+class PasswordHasherBusy(Exception):
+    """密码哈希线程池排队已满"""
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations, HASH_BYTES)
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * r * (n + p + 2) + 1024 * 1024, dklen=HASH_BYTES)
+
+
+def _measure(func):
+    """取三次中最快的一次耗时（秒）"""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None or elapsed < best else best
+    return best
+
+
+def calibrate(scheme='pbkdf2_sha256', target_ms=100):
+    """
+    按目标耗时标定 KDF 参数
+    :param scheme: 'pbkdf2_sha256' 或 'scrypt'
+    :param target_ms: 单次哈希的目标耗时（毫秒）
+    :return: 参数字典
+    """
+    salt = os.urandom(SALT_BYTES)
+    if scheme == 'scrypt':
+        n, r, p = MIN_SCRYPT_N, 8, 1
+        elapsed = _measure(lambda: _scrypt('calibrate', salt, n, r, p))
+        # scrypt 的耗时与 n 成正比，n 必须是 2 的幂
+        while elapsed * 2 <= target_ms / 1000 and n < 2 ** 20:
+            n *= 2
+            elapsed *= 2
+        return {'scheme': 'scrypt', 'n': n, 'r': r, 'p': p}
+
+    probe = 20000
+    elapsed = _measure(lambda: _pbkdf2('calibrate', salt, probe))
+    iterations = int(probe * (target_ms / 1000) / elapsed / 10000) * 10000
+    return {'scheme': 'pbkdf2_sha256', 'iterations': max(iterations, MIN_PBKDF2_ITERATIONS)}
+
+
+def _encode(params, password):
+    """按参数计算哈希并编码为存储格式"""
+    salt = os.urandom(SALT_BYTES)
+    if params['scheme'] == 'scrypt':
+        digest = _scrypt(password, salt, params['n'], params['r'], params['p'])
+        return f"scrypt${params['n']}${params['r']}${params['p']}${salt.hex()}${digest.hex()}"
+    digest = _pbkdf2(password, salt, params['iterations'])
+    return f"pbkdf2_sha256${params['iterations']}${salt.hex()}${digest.hex()}"
+
+
+def _is_legacy(stored):
+    return len(stored) == 64 and '$' not in stored
+
+
+def _check(params, password, stored):
+    """
+    校验密码
+    :return: (是否正确, 是否需要重新哈希)
+    """
+    if _is_legacy(stored):
+        digest = hashlib.sha256(password.encode('utf-8')).hexdigest()
+        ok = hmac.compare_digest(digest, stored.lower())
+        return ok, ok
+
+    parts = stored.split('$')
+    try:
+        if parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+            iterations = int(parts[1])
+            digest = _pbkdf2(password, bytes.fromhex(parts[2]), iterations)
+            ok = hmac.compare_digest(digest, bytes.fromhex(parts[3]))
+            weaker = params['scheme'] != 'pbkdf2_sha256' or iterations < params['iterations'] * REHASH_RATIO
+            return ok, ok and weaker
+        if parts[0] == 'scrypt' and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            digest = _scrypt(password, bytes.fromhex(parts[4]), n, r, p)
+            ok = hmac.compare_digest(digest, bytes.fromhex(parts[5]))
+            weaker = params['scheme'] != 'scrypt' or n < params['n']
+            return ok, ok and weaker
+    except ValueError:
+        pass
+    return False, False
+
+
+class PasswordHasher:
+    """在有界线程池中计算/校验密码哈希"""
+
+    def __init__(self, params, workers=None, max_pending=64, timeout=10):
+        """
+        :param params: KDF 参数（见 calibrate）
+        :param workers: 线程数，默认为 CPU 核数
+        :param max_pending: 允许排队和执行中的最大任务数
+        :param timeout: 等待结果的最长秒数
+        """
+        self.params = params
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = {'hashed': 0, 'verified': 0, 'rejected': 0, 'total_ms': 0.0}
+
+    def _get_executor(self):
+        pid = os.getpid()
+        if self._executor is not None and self._pid == pid:
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != pid:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password')
+                self._pid = pid
+        return self._executor
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise PasswordHasherBusy('密码校验繁忙，请稍后再试')
+        start = time.perf_counter()
+        try:
+            return self._get_executor().submit(func, *args).result(self.timeout)
+        except FutureTimeoutError:
+            raise PasswordHasherBusy('密码校验超时，请稍后再试')
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._stats['total_ms'] += (time.perf_counter() - start) * 1000
+
+    def hash(self, password):
+        """
+        计算新密码的哈希
+        :return: 存储格式的哈希字符串
+        :raises PasswordHasherBusy: 线程池排队已满或超时
+        """
+        result = self._run(_encode, self.params, password)
+        with self._lock:
+            self._stats['hashed'] += 1
+        return result
+
+    def verify(self, password, stored):
+        """
+        校验密码
+        :param stored: 已存储的哈希，None表示用户不存在（仍计算一次哈希，响应时间不暴露用户是否存在）
+        :return: (是否正确, 是否需要重新哈希)
+        :raises PasswordHasherBusy: 线程池排队已满或超时
+        """
+        if not stored:
+            self._run(_encode, self.params, password)
+            return False, False
+        result = self._run(_check, self.params, password, stored)
+        with self._lock:
+            self._stats['verified'] += 1
+        return result
+
+    def stats(self):
+        """
+        获取哈希指标
+        :return: 指标字典
+        """
+        with self._lock:
+            data = dict(self._stats)
+        count = data['hashed'] + data['verified']
+        data['avg_ms'] = data['total_ms'] / count if count else 0.0
+        data['workers'] = self.workers
+        data['params'] = dict(self.params)
+        return data
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def init_app(app):
+    """
+    根据应用配置初始化密码哈希
+    - PASSWORD_HASH_SCHEME: 'pbkdf2_sha256'（默认）或 'scrypt'
+    - PASSWORD_HASH_TARGET_MS: 单次哈希的目标耗时（毫秒），启动时按此标定参数
+    - PASSWORD_HASH_ITERATIONS: 直接指定 PBKDF2 迭代次数（多台机器需要一致的成本时使用）
+    - PASSWORD_HASH_WORKERS: 哈希线程数，默认为 CPU 核数
+    - PASSWORD_HASH_MAX_PENDING: 允许排队的最大任务数，超出时登录返回 503
+    """
+    global _hasher
+    app.config.setdefault('PASSWORD_HASH_SCHEME', 'pbkdf2_sha256')
+    app.config.setdefault('PASSWORD_HASH_TARGET_MS', 100)
+    app.config.setdefault('PASSWORD_HASH_ITERATIONS', None)
+    app.config.setdefault('PASSWORD_HASH_WORKERS', None)
+    app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 64)
+
+    if app.config['PASSWORD_HASH_ITERATIONS'] and app.config['PASSWORD_HASH_SCHEME'] == 'pbkdf2_sha256':
+        params = {'scheme': 'pbkdf2_sha256', 'iterations': int(app.config['PASSWORD_HASH_ITERATIONS'])}
+    else:
+        params = calibrate(app.config['PASSWORD_HASH_SCHEME'], app.config['PASSWORD_HASH_TARGET_MS'])
+    _hasher = PasswordHasher(params, app.config['PASSWORD_HASH_WORKERS'], app.config['PASSWORD_HASH_MAX_PENDING'])
+
+
+def get_hasher():
+    """
+    获取密码哈希器，未初始化时按默认目标耗时标定
+    :return: PasswordHasher 对象
+    """
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = PasswordHasher(calibrate())
+    return _hasher
+
+
+def hash_password(password):
+    """
+    计算新密码的哈希
+    :return: 存储格式的哈希字符串
+    """
+    return get_hasher().hash(password)
+
+
+def verify_password(password, stored):
+    """
+    校验密码
+    :return: (是否正确, 是否需要重新哈希)
+    """
+    return get_hasher().verify(password, stored)
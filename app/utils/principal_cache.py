@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+登录用户（principal）缓存模块
+按用户ID在进程内缓存用户行（LRU + TTL），供 login_required、/profile、修改密码使用，
+用户被修改、改密码或删除时由 User 模型写穿失效；
+其他 worker 进程中的缓存最多在 TTL 秒后过期，删除用户/修改角色在该时间窗口内生效
+"""
+
+from app.utils.cache import MemoryCache
+from app.utils.db_session import get_current_session
+
+# 用户不存在时缓存的占位值（避免已删除用户的会话反复查询数据库）
+MISSING = object()
+
+
+class PrincipalUnavailable(Exception):
+    """查询用户失败（数据库不可用），区别于用户不存在"""
+
+
+class PrincipalCache:
+    """用户行缓存"""
+
+    def __init__(self, max_entries=4096, ttl=60):
+        self.ttl = ttl
+        self._cache = MemoryCache(max_entries)
+
+    def get(self, uid, loader):
+        """
+        获取用户行
+        :param uid: 用户ID
+        :param loader: loader(uid) -> 元组行 / MISSING（不存在）/ None（查询失败，不缓存）
+        :return: 元组行，用户不存在时返回None
+        :raises PrincipalUnavailable: 查询失败
+        """
+        row = self._cache.get(uid)
+        if row is None:
+            row = loader(uid)
+            if row is None:
+                raise PrincipalUnavailable('用户信息暂时无法加载，请稍后重试')
+            self._cache.set(uid, row, self.ttl)
+        return None if row is MISSING else row
+
+    def invalidate(self, uid):
+        """
+        使用户的缓存失效
+        在请求级事务中，事务结束后再失效一次，避免并发请求在提交前把旧数据重新放入缓存
+        :param uid: 用户ID
+        """
+        self._cache.delete(uid)
+        db_session = get_current_session()
+        if db_session is not None:
+            db_session.after_transaction(lambda: self._cache.delete(uid))
+
+    def stats(self):
+        """
+        获取缓存指标
+        :return: 指标字典
+        """
+        data = self._cache.stats()
+        data['ttl'] = self.ttl
+        return data
+
+
+_principals = PrincipalCache()
+
+
+def init_app(app):
+    """
+    根据应用配置初始化登录用户缓存
+    - PRINCIPAL_CACHE_TTL: 缓存秒数（即其他进程中撤销生效的最长时间）
+    - PRINCIPAL_CACHE_SIZE: 最大缓存用户数
+    """
+    global _principals
+    app.config.setdefault('PRINCIPAL_CACHE_TTL', 60)
+    app.config.setdefault('PRINCIPAL_CACHE_SIZE', 4096)
+    _principals = PrincipalCache(app.config['PRINCIPAL_CACHE_SIZE'], app.config['PRINCIPAL_CACHE_TTL'])
+
+
+def get_principal_cache():
+    """
+    获取登录用户缓存
+    :return: PrincipalCache 对象
+    """
+    return _principals
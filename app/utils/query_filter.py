@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+查询过滤条件构造模块
+将任意组合的过滤条件编译为参数化的 WHERE 子句，值为None的条件自动忽略
+"""
+
+from datetime import datetime
+
+# 请求参数中的时间格式
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class QueryFilter:
+    """
+    可组合的查询过滤条件
+    用法：QueryFilter().eq('status', status).eq('did', did).lt('start_time', until)
+    """
+
+    def __init__(self):
+        self.conditions = []
+        self.params = []
+
+    def _add(self, condition, *params):
+        self.conditions.append(condition)
+        self.params.extend(params)
+        return self
+
+    def eq(self, column, value):
+        """column = value"""
+        if value is None:
+            return self
+        return self._add(f"{column} = %s", value)
+
+    def ge(self, column, value):
+        """column >= value"""
+        if value is None:
+            return self
+        return self._add(f"{column} >= %s", value)
+
+    def lt(self, column, value):
+        """column < value"""
+        if value is None:
+            return self
+        return self._add(f"{column} < %s", value)
+
+    def gt(self, column, value):
+        """column > value"""
+        if value is None:
+            return self
+        return self._add(f"{column} > %s", value)
+
+    def in_subquery(self, column, subquery, value):
+        """column IN (subquery)，subquery 中包含一个 %s 占位符"""
+        if value is None:
+            return self
+        return self._add(f"{column} IN ({subquery})", value)
+
+    def raw(self, condition, *params):
+        """添加原始条件"""
+        return self._add(condition, *params)
+
+    def where_clause(self):
+        """
+        生成 WHERE 子句
+        :return: (WHERE子句, 参数元组)，没有条件时返回空字符串
+        """
+        if not self.conditions:
+            return "", ()
+        return " WHERE " + " AND ".join(self.conditions), tuple(self.params)
+
+
+def parse_time_arg(args, name):
+    """
+    从请求参数中解析时间
+    :param args: request.args
+    :param name: 参数名
+    :return: datetime对象，未提供时返回None
+    :raises ValueError: 时间格式错误
+    """
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, TIME_FORMAT)
+    except ValueError:
+        raise ValueError(f'{name} 时间格式错误，请使用 YYYY-MM-DD HH:MM:SS 格式')
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+令牌桶限流模块
+按键（如 IP、学号/工号）在进程内维护令牌桶，键的数量有上限，超出时淘汰最久未使用的桶
+（长时间未使用的桶已经回满，淘汰后重新创建的效果相同）
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """令牌桶限流器"""
+
+    def __init__(self, capacity, period, max_keys=100000):
+        """
+        :param capacity: 桶容量（允许的突发次数）
+        :param period: 桶从空到满的秒数
+        :param max_keys: 最多跟踪的键数
+        """
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'allowed': 0, 'limited': 0, 'evictions': 0}
+
+    def _bucket(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(self.capacity), now]
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self._stats['evictions'] += 1
+        else:
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def peek(self, key):
+        """
+        检查键是否还有令牌（不消耗）
+        :return: 需要等待的秒数，0 表示允许
+        """
+        with self._lock:
+            bucket = self._bucket(key, time.monotonic())
+            if bucket[0] >= 1:
+                self._stats['allowed'] += 1
+                return 0
+            self._stats['limited'] += 1
+            return (1 - bucket[0]) / self.rate
+
+    def consume(self, key, tokens=1):
+        """
+        消耗令牌
+        :return: 令牌不足时需要等待的秒数，0 表示已消耗
+        """
+        with self._lock:
+            bucket = self._bucket(key, time.monotonic())
+            if bucket[0] >= tokens:
+                bucket[0] -= tokens
+                return 0
+            return (tokens - bucket[0]) / self.rate
+
+    def reset(self, key):
+        """清除键的限流状态（如登录成功后）"""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def stats(self):
+        """
+        获取限流指标
+        :return: 指标字典
+        """
+        with self._lock:
+            data = dict(self._stats)
+            data['keys'] = len(self._buckets)
+        data['capacity'] = self.capacity
+        return data
+
+
+# 默认限流配置：(次数, 秒)
+DEFAULT_LIMITS = {'login_ip': (50, 60), 'login_code': (5, 300)}
+
+_limiters = {}
+
+
+def init_app(app):
+    """
+    根据应用配置初始化登录限流（只统计失败的登录）
+    - LOGIN_IP_LIMIT: (次数, 秒)，同一 IP 的失败登录（同一教室共用出口 IP，需留有余量）
+    - LOGIN_CODE_LIMIT: (次数, 秒)，同一学号/工号的失败登录
+    - LOGIN_LIMIT_MAX_KEYS: 每个限流器最多跟踪的键数
+    """
+    app.config.setdefault('LOGIN_IP_LIMIT', DEFAULT_LIMITS['login_ip'])
+    app.config.setdefault('LOGIN_CODE_LIMIT', DEFAULT_LIMITS['login_code'])
+    app.config.setdefault('LOGIN_LIMIT_MAX_KEYS', 100000)
+    max_keys = app.config['LOGIN_LIMIT_MAX_KEYS']
+    _limiters['login_ip'] = TokenBucketLimiter(*app.config['LOGIN_IP_LIMIT'], max_keys=max_keys)
+    _limiters['login_code'] = TokenBucketLimiter(*app.config['LOGIN_CODE_LIMIT'], max_keys=max_keys)
+
+
+def get_limiter(name):
+    """
+    获取限流器，未初始化时使用默认配置创建
+    :param name: 'login_ip' 或 'login_code'
+    :return: TokenBucketLimiter 对象
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = _limiters.setdefault(name, TokenBucketLimiter(*DEFAULT_LIMITS[name]))
+    return limiter
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+服务端会话存储模块
+Cookie 中只保存签名后的会话ID，会话数据保存在服务端，多个 worker 进程共享：
+- SQLiteSessionStore：本机 SQLite 文件（单机多 worker），按过期时间和条目上限淘汰
+- RedisSessionStore：Redis（或兼容协议的服务，多机部署），键带 TTL，内存上限由服务端的 LRU 淘汰策略控制
+SECRET_KEY 从环境变量读取，未设置时在 instance 目录生成并持久化，所有 worker 和重启后共用同一个密钥
+"""
+
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """服务端会话：数据为字典，sid 为会话ID"""
+
+    def __init__(self, initial=None, sid=None, new=False, expires_at=None):
+        def on_update(self):
+            self.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+        self.previous_sid = None
+
+    def regenerate(self):
+        """更换会话ID（登录时调用，防止会话固定攻击），旧ID的数据在保存时删除"""
+        if self.previous_sid is None and not self.new:
+            self.previous_sid = self.sid
+        self.sid = _new_sid()
+        self.modified = True
+
+
+def _new_sid():
+    return secrets.token_urlsafe(32)
+
+
+class SQLiteSessionStore:
+    """
+    SQLite 会话存储
+    每个线程一个连接；expires_at 在每次写入时顺延，淘汰时先删除过期会话，
+    超过条目上限时删除 expires_at 最早（即最久未写入）的会话，近似 LRU
+    """
+
+    def __init__(self, path, max_entries=10000, cleanup_interval=100):
+        self.path = path
+        self.max_entries = max_entries
+        self.cleanup_interval = cleanup_interval
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    sid TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)")
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, sid):
+        """
+        读取会话
+        :return: (数据字典, 过期时间戳)，不存在或已过期返回None
+        """
+        row = self._connection().execute(
+            "SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at > ?", (sid, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, sid, data, ttl):
+        """
+        写入会话
+        :return: 新的过期时间戳
+        """
+        expires_at = time.time() + ttl
+        self._connection().execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)",
+            (sid, json.dumps(data, ensure_ascii=False), expires_at)
+        )
+        with self._lock:
+            self._writes += 1
+            cleanup = self._writes % self.cleanup_interval == 0
+        if cleanup:
+            self.evict()
+        return expires_at
+
+    def delete(self, sid):
+        """删除会话"""
+        self._connection().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def evict(self):
+        """删除过期会话，并把会话数控制在条目上限以内"""
+        connection = self._connection()
+        connection.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+        count = connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        if count > self.max_entries:
+            connection.execute(
+                "DELETE FROM sessions WHERE sid IN (SELECT sid FROM sessions ORDER BY expires_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self):
+        """
+        获取会话存储指标
+        :return: 指标字典
+        """
+        count = self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {'backend': 'sqlite', 'entries': count, 'max_entries': self.max_entries}
+
+
+class RedisSessionStore:
+    """
+    Redis 会话存储（需要安装 redis 包）
+    每个会话一个带 TTL 的键；内存上限请在服务端配置 maxmemory 与 allkeys-lru/volatile-lru 策略
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='roommgmt:session:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("使用 Redis 会话存储需要先安装 redis 包：pip install redis")
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, sid):
+        pipeline = self._client.pipeline()
+        pipeline.get(self.prefix + sid)
+        pipeline.ttl(self.prefix + sid)
+        data, ttl = pipeline.execute()
+        if data is None:
+            return None
+        return json.loads(data), time.time() + max(ttl, 0)
+
+    def set(self, sid, data, ttl):
+        self._client.set(self.prefix + sid, json.dumps(data, ensure_ascii=False), ex=max(int(ttl), 1))
+        return time.time() + ttl
+
+    def delete(self, sid):
+        self._client.delete(self.prefix + sid)
+
+    def stats(self):
+        return {'backend': 'redis', 'prefix': self.prefix}
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Flask 会话接口：Cookie 中保存签名的会话ID，数据读写交给会话存储
+    会话未修改时不写存储，剩余有效期不足一半时才顺延，避免每个请求都写一次
+    """
+
+    session_class = ServerSideSession
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='roommgmt-session-id')
+
+    def _ttl(self, app):
+        return app.permanent_session_lifetime.total_seconds()
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode('utf-8')
+            except BadSignature:
+                sid = None
+            if sid:
+                try:
+                    stored = self.store.get(sid)
+                except Exception as e:
+                    print(f"会话读取失败: {e}")
+                    stored = None
+                if stored is not None:
+                    data, expires_at = stored
+                    return self.session_class(data, sid=sid, expires_at=expires_at)
+        return self.session_class(sid=_new_sid(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.previous_sid:
+            self._delete(session.previous_sid)
+
+        if not session:
+            # 会话被清空（如登出）：删除服务端数据和 Cookie
+            if session.modified and not session.new:
+                self._delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        ttl = self._ttl(app)
+        refresh = session.expires_at is not None and session.expires_at - time.time() < ttl / 2
+        if session.modified or session.new or refresh:
+            try:
+                session.expires_at = self.store.set(session.sid, dict(session), ttl)
+            except Exception as e:
+                print(f"会话保存失败: {e}")
+                return
+        elif not self.should_set_cookie(app, session):
+            return
+
+        response.vary.add('Cookie')
+        response.set_cookie(
+            name, self._signer(app).sign(session.sid).decode('utf-8'),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+    def _delete(self, sid):
+        try:
+            self.store.delete(sid)
+        except Exception as e:
+            print(f"会话删除失败: {e}")
+
+
+def load_secret_key(path):
+    """
+    读取持久化的 SECRET_KEY，不存在时生成并写入（文件权限 0600）
+    多个 worker 同时启动时只有一个进程能创建文件，其余进程读取同一个密钥
+    :param path: 密钥文件路径
+    :return: 密钥字符串
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # 其他进程可能刚创建文件还未写完，短暂重试
+        for _ in range(50):
+            with open(path, 'r', encoding='utf-8') as f:
+                key = f.read().strip()
+            if key:
+                return key
+            time.sleep(0.02)
+        raise RuntimeError(f"密钥文件为空: {path}")
+    key = secrets.token_hex(32)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(key)
+    return key
+
+
+def regenerate_session(session):
+    """
+    登录成功后更换会话ID（使用 Cookie 会话时无操作）
+    :param session: flask.session
+    """
+    regenerate = getattr(session, 'regenerate', None)
+    if regenerate is not None:
+        regenerate()
+
+
+_store = None
+
+
+def init_app(app):
+    """
+    根据应用配置初始化会话
+    - SECRET_KEY: 优先使用环境变量 SECRET_KEY，否则使用 SECRET_KEY_FILE 中持久化的密钥
+    - SESSION_BACKEND: 'sqlite'（默认，单机多 worker）、'redis'（多机）或 'cookie'（Flask 默认的签名 Cookie 会话）
+    - SESSION_SQLITE_PATH: SQLite 会话文件
+    - SESSION_REDIS_URL: Redis 连接地址
+    - SESSION_MAX_ENTRIES: SQLite 存储的最大会话数
+    """
+    global _store
+    instance_dir = os.path.join(os.path.dirname(app.root_path), 'instance')
+    app.config.setdefault('SECRET_KEY_FILE', os.path.join(instance_dir, 'secret_key'))
+    app.config.setdefault('SESSION_BACKEND', 'sqlite')
+    app.config.setdefault('SESSION_SQLITE_PATH', os.path.join(instance_dir, 'sessions.sqlite3'))
+    app.config.setdefault('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+    app.config.setdefault('SESSION_MAX_ENTRIES', 10000)
+
+    if not app.config.get('SECRET_KEY'):
+        app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or load_secret_key(app.config['SECRET_KEY_FILE'])
+
+    backend = app.config['SESSION_BACKEND']
+    if backend == 'redis':
+        _store = RedisSessionStore(app.config['SESSION_REDIS_URL'])
+    elif backend == 'sqlite':
+        _store = SQLiteSessionStore(app.config['SESSION_SQLITE_PATH'], app.config['SESSION_MAX_ENTRIES'])
+    else:
+        _store = None
+        return
+    app.session_interface = ServerSideSessionInterface(_store)
+
+
+def get_store():
+    """
+    获取会话存储
+    :return: 会话存储对象，使用 Cookie 会话时返回None
+    """
+    return _store
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分阶段耗时统计模块
+记录一个处理流程（如登录）各阶段的耗时，保留最近的样本用于计算分位数
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class StageTimings:
+    """流程各阶段的耗时与结果计数"""
+
+    def __init__(self, samples=1024):
+        self._samples = samples
+        self._stages = {}
+        self._outcomes = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, elapsed_ms):
+        """
+        记录一次阶段耗时
+        :param stage: 阶段名
+        :param elapsed_ms: 耗时（毫秒）
+        """
+        with self._lock:
+            item = self._stages.get(stage)
+            if item is None:
+                item = self._stages[stage] = {
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'recent': deque(maxlen=self._samples)
+                }
+            item['count'] += 1
+            item['total_ms'] += elapsed_ms
+            item['max_ms'] = max(item['max_ms'], elapsed_ms)
+            item['recent'].append(elapsed_ms)
+
+    @contextmanager
+    def stage(self, name):
+        """计时上下文：with timings.stage('lookup'): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def count(self, outcome):
+        """
+        结果计数
+        :param outcome: 结果名，如 'success'、'failed'、'throttled'
+        """
+        with self._lock:
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+
+    def stats(self):
+        """
+        获取统计
+        :return: {'stages': {阶段: {count, avg_ms, max_ms, p50_ms, p95_ms}}, 'outcomes': {结果: 次数}}
+        """
+        with self._lock:
+            stages = {name: (item['count'], item['total_ms'], item['max_ms'], sorted(item['recent']))
+                      for name, item in self._stages.items()}
+            outcomes = dict(self._outcomes)
+        data = {}
+        for name, (count, total_ms, max_ms, recent) in stages.items():
+            data[name] = {
+                'count': count,
+                'avg_ms': total_ms / count if count else 0.0,
+                'max_ms': max_ms,
+                'p50_ms': recent[len(recent) // 2] if recent else 0.0,
+                'p95_ms': recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+            }
+        return {'stages': data, 'outcomes': outcomes}
+
+
+# 登录流程的耗时统计
+login_timings = StageTimings()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+预约并发压力测试
+多个线程同时对同一设备的重叠时段创建并确认预约，
+结束后检查已确认的预约之间没有任何重叠，并输出吞吐量
+需要连接真实数据库（使用 app/utils/db_config.py 中的配置），测试数据在结束时删除
+
+用法：python benchmarks/booking_stress.py --did 1 --uid 1 --threads 16 --rounds 20
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.reservation import Reservation, BookingError
+from app.utils.db_config import execute_query, execute_update, get_pool_stats
+
+
+def worker(args, base_time, barrier, counters, lock, created):
+    # 第一阶段：并发创建重叠的待审核预约（设备确认后会变为使用中，因此先全部创建）
+    mine = []
+    for i in range(args.rounds):
+        # 时段相互错开半小时，保证大量重叠
+        start_time = base_time + timedelta(minutes=30 * (i % 4))
+        end_time = start_time + timedelta(hours=1)
+        reservation = Reservation(uid=args.uid, did=args.did, start_time=start_time, end_time=end_time)
+        try:
+            key = 'booked' if reservation.book() else 'errors'
+        except BookingError:
+            key = 'rejected'
+        if key == 'booked':
+            mine.append(reservation)
+        with lock:
+            counters[key] = counters.get(key, 0) + 1
+            if key == 'booked':
+                created.append(reservation.res_id)
+
+    # 第二阶段：所有线程同时确认，同一时段只能有一个确认成功
+    barrier.wait()
+    for reservation in mine:
+        try:
+            key = 'confirmed' if reservation.update_status('已确认') else 'errors'
+        except BookingError:
+            key = 'conflicts'
+        with lock:
+            counters[key] = counters.get(key, 0) + 1
+
+
+def find_overlaps(did, base_time):
+    query = """
+        SELECT a.res_id AS first_id, b.res_id AS second_id
+        FROM reservations a
+        JOIN reservations b ON a.did = b.did AND a.res_id < b.res_id
+        WHERE a.did = %s
+          AND a.status = '已确认' AND b.status = '已确认'
+          AND a.start_time < b.end_time AND b.start_time < a.end_time
+          AND a.start_time >= %s AND b.start_time >= %s
+    """
+    return execute_query(query, (did, base_time, base_time)) or []
+
+
+def main():
+    parser = argparse.ArgumentParser(description='预约并发压力测试')
+    parser.add_argument('--did', type=int, required=True, help='测试设备ID（需为空闲状态）')
+    parser.add_argument('--uid', type=int, required=True, help='预约用户ID')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--keep', action='store_true', help='保留测试数据')
+    args = parser.parse_args()
+
+    # 使用很远的未来时间，避免与真实预约相互影响
+    base_time = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=3650)
+    device = execute_query("SELECT status FROM devices WHERE did = %s", (args.did,), fetch_one=True)
+    if not device:
+        print("设备不存在")
+        return 1
+
+    counters, created, lock = {}, [], threading.Lock()
+    barrier = threading.Barrier(args.threads)
+    threads = [
+        threading.Thread(target=worker, args=(args, base_time, barrier, counters, lock, created))
+        for _ in range(args.threads)
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    overlaps = find_overlaps(args.did, base_time)
+    total = counters.get('booked', 0) + args.threads * args.rounds
+    print(f"操作数: {total}, 耗时: {elapsed:.2f}s, 吞吐量: {total / elapsed:.1f} 次/秒")
+    print(f"结果: {counters}")
+    print(f"连接池: {get_pool_stats()}")
+
+    if not args.keep and created:
+        placeholders = ', '.join(['%s'] * len(created))
+        execute_update(f"DELETE FROM reservations WHERE res_id IN ({placeholders})", tuple(created))
+        # 确认预约会触发设备状态变为使用中，恢复原状态
+        execute_update("UPDATE devices SET status = %s WHERE did = %s", (device['status'], args.did))
+
+    if overlaps:
+        print(f"失败: 发现 {len(overlaps)} 对重叠的已确认预约: {overlaps[:10]}")
+        return 1
+    print("通过: 已确认的预约之间没有重叠")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
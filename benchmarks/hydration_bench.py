@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+行到模型转换的微基准测试（不需要数据库）
+对比两种方式把 N 行预约数据转换为模型对象的耗时和内存：
+- dict：DictCursor 逐行构造字典，再按键取值构造普通 __dict__ 类（原实现）
+- mapper：元组游标的元组行，由 Mapper 生成的函数按位置解包到 __slots__ 类
+
+用法：python benchmarks/hydration_bench.py --rows 100000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.reservation import Reservation
+from app.utils.mapper import Mapper
+
+FIELDS = ('res_id', 'uid', 'did', 'start_time', 'end_time', 'status')
+
+
+class DictReservation:
+    """原实现的普通类"""
+
+    def __init__(self, res_id=None, uid=None, did=None, start_time=None, end_time=None, status=None):
+        self.res_id = res_id
+        self.uid = uid
+        self.did = did
+        self.start_time = start_time
+        self.end_time = end_time
+        self.status = status
+
+
+def make_rows(count):
+    base = datetime(2026, 1, 1, 8)
+    return [
+        (i, i % 500, i % 200, base + timedelta(hours=i), base + timedelta(hours=i + 2), '已确认')
+        for i in range(count)
+    ]
+
+
+def hydrate_dict(rows):
+    # DictCursor 对每行执行 dict(zip(fields, row))，之后按键逐个取值
+    dict_rows = [dict(zip(FIELDS, row)) for row in rows]
+    result = []
+    for res_data in dict_rows:
+        result.append(DictReservation(
+            res_id=res_data['res_id'],
+            uid=res_data['uid'],
+            did=res_data['did'],
+            start_time=res_data['start_time'],
+            end_time=res_data['end_time'],
+            status=res_data['status']
+        ))
+    return result
+
+
+def measure(name, func, rows, repeat):
+    best = min(timeit.repeat(lambda: func(rows), number=1, repeat=repeat))
+    tracemalloc.start()
+    objects = func(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<8} 最快 {best * 1000:8.1f} ms  {len(rows) / best:12,.0f} 行/秒  峰值内存 {peak / 1024 / 1024:7.1f} MB")
+    del objects
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='行到模型转换微基准测试')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    mapper = Mapper(Reservation)
+    print(f"行数: {args.rows}, 重复: {args.repeat}")
+    dict_time = measure('dict', hydrate_dict, rows, args.repeat)
+    mapper_time = measure('mapper', mapper.from_rows, rows, args.repeat)
+    print(f"加速比: {dict_time / mapper_time:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+密码哈希成本基准测试（不需要数据库）
+对每个目标耗时标定 KDF 参数，测量单次校验耗时，以及用密码哈希线程池并发校验时的
+每秒登录数和每核每秒登录数，作为选择 PASSWORD_HASH_TARGET_MS 的依据
+（旧的无盐 SHA-256 作为对照）
+
+用法：python benchmarks/password_hash_bench.py --targets 25,50,100,200 --scheme pbkdf2_sha256 --seconds 3
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.passwords import PasswordHasher, calibrate, _encode
+
+PASSWORD = 'correct horse battery staple'
+
+
+def run_throughput(hasher, stored, seconds, clients):
+    """多个客户端线程持续提交校验，返回每秒完成的校验数"""
+    done = [0] * clients
+    deadline = time.perf_counter() + seconds
+
+    def client(i):
+        while time.perf_counter() < deadline:
+            hasher.verify(PASSWORD, stored)
+            done[i] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(done) / (time.perf_counter() - start)
+
+
+def report(name, params, seconds, workers):
+    stored = _encode(params, PASSWORD) if params else hashlib.sha256(PASSWORD.encode()).hexdigest()
+    hasher = PasswordHasher(params or {'scheme': 'pbkdf2_sha256', 'iterations': 1},
+                            workers=workers, max_pending=workers * 4)
+    start = time.perf_counter()
+    hasher.verify(PASSWORD, stored)
+    single_ms = (time.perf_counter() - start) * 1000
+    rate = run_throughput(hasher, stored, seconds, workers * 2)
+    print(f"{name:<14} {str(params or 'sha256'):<52} 单次 {single_ms:8.1f} ms  "
+          f"{rate:10,.1f} 次/秒  每核 {rate / workers:9,.1f} 次/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='密码哈希成本基准测试')
+    parser.add_argument('--targets', default='25,50,100,200', help='目标耗时列表（毫秒）')
+    parser.add_argument('--scheme', default='pbkdf2_sha256', choices=['pbkdf2_sha256', 'scrypt'])
+    parser.add_argument('--seconds', type=float, default=3.0, help='每个配置的吞吐量测试时长')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='哈希线程数（默认CPU核数）')
+    args = parser.parse_args()
+
+    print(f"算法: {args.scheme}, 线程数/核数: {args.workers}, 每项测试 {args.seconds} 秒")
+    report('legacy', None, args.seconds, args.workers)
+    for target in (int(value) for value in args.targets.split(',')):
+        report(f'target {target}ms', calibrate(args.scheme, target), args.seconds, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+审计日志分区维护与归档脚本（可由 cron 每天或每月运行）
+1. 从 p_future 中拆分出未来几个月的按月分区
+2. 将超过保留期的分区导出为 archive/audit_log/audit_log_<分区名>.jsonl.gz 后删除
+
+用法：python database/archive_audit_log.py --keep-months 6 --months-ahead 3
+"""
+
+import argparse
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from app.models.audit_log import AuditLog
+
+
+def main():
+    parser = argparse.ArgumentParser(description='审计日志分区维护与归档')
+    parser.add_argument('--keep-months', type=int, default=6, help='保留在数据库中的月数')
+    parser.add_argument('--months-ahead', type=int, default=3, help='提前创建分区的月数')
+    parser.add_argument('--archive-dir', default=None, help='归档目录')
+    args = parser.parse_args()
+
+    created = AuditLog.ensure_partitions(args.months_ahead)
+    print(f"新建分区: {', '.join(created) if created else '无'}")
+
+    archived = AuditLog.archive_cold_partitions(args.keep_months, args.archive_dir)
+    for item in archived:
+        print(f"已归档分区 {item['partition']}: {item['rows']} 条 -> {item['path']}")
+    if not archived:
+        print("没有需要归档的分区")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 -- 机房管理系统数据库脚本
+-- 本脚本始终是最新的完整结构，供 database/migrate.py 创建新库；已有数据库的结构变更见 database/migrations
 -- 创建数据库
 DROP DATABASE IF EXISTS RoomManagement;
 CREATE DATABASE RoomManagement DEFAULT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
@@ -11,7 +12,7 @@ CREATE TABLE users (
                        uname VARCHAR(50) NOT NULL COMMENT '姓名',
                        role ENUM('学生', '教师', '管理员') NOT NULL COMMENT '角色',
                        code VARCHAR(20) NOT NULL UNIQUE COMMENT '学号/工号',
-                       password VARCHAR(64) NOT NULL COMMENT '密码',
+                       password VARCHAR(255) NOT NULL COMMENT '密码哈希',
                        phone VARCHAR(20) COMMENT '联系方式',
                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
                        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
@@ -55,7 +56,10 @@ CREATE TABLE reservations (
                               FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE ON UPDATE CASCADE,
                               FOREIGN KEY (did) REFERENCES devices(did) ON DELETE CASCADE ON UPDATE CASCADE,
                               INDEX idx_res_time (start_time, end_time) COMMENT '预约时间索引',
-                              INDEX idx_res_status (status) COMMENT '预约状态索引'
+                              INDEX idx_res_device_slot (did, status, start_time, end_time) COMMENT '预约冲突检测索引',
+                              INDEX idx_res_user_time (uid, start_time) COMMENT '用户预约列表索引',
+                              INDEX idx_res_device_time (did, start_time) COMMENT '设备预约列表索引',
+                              INDEX idx_res_status_time (status, start_time) COMMENT '预约状态与开始时间索引'
 ) COMMENT='预约记录表';
 
 -- 创建维护记录表
@@ -70,20 +74,89 @@ CREATE TABLE maintenances (
                               created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
                               updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
                               FOREIGN KEY (did) REFERENCES devices(did) ON DELETE CASCADE ON UPDATE CASCADE,
-                              INDEX idx_maintenance_status (status) COMMENT '维护状态索引'
+                              INDEX idx_maint_stats (status, complete_time, report_time, did) COMMENT '维护统计覆盖索引',
+                              INDEX idx_maint_device_time (did, report_time) COMMENT '设备维护记录索引',
+                              INDEX idx_maint_status_time (status, report_time) COMMENT '维护状态与报修时间索引'
 ) COMMENT='维护记录表';
 
 -- 创建操作日志表（选做）
+-- 按月分区（分区名 pYYYYMM），冷分区由 database/archive_audit_log.py 归档为 gzip JSONL 后删除；
+-- 分区表不支持外键，且主键必须包含分区列，因此主键为 (log_id, action_time)，删除用户时由应用删除其日志
 CREATE TABLE audit_log (
-                           log_id INT PRIMARY KEY AUTO_INCREMENT COMMENT '日志ID',
+                           log_id INT NOT NULL AUTO_INCREMENT COMMENT '日志ID',
                            user_id INT NOT NULL COMMENT '用户ID',
                            action VARCHAR(50) NOT NULL COMMENT '操作类型',
                            target_table VARCHAR(30) NOT NULL COMMENT '目标表',
                            sql_text TEXT NOT NULL COMMENT 'SQL文本',
                            ip_address VARCHAR(45) COMMENT 'IP地址',
-                           action_time DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '操作时间',
-                           FOREIGN KEY (user_id) REFERENCES users(uid) ON DELETE CASCADE ON UPDATE CASCADE
-) COMMENT='操作日志表';
+                           action_time DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '操作时间',
+                           PRIMARY KEY (log_id, action_time),
+                           INDEX idx_audit_time (action_time),
+                           INDEX idx_audit_user_time (user_id, action_time),
+                           INDEX idx_audit_action_time (action, action_time),
+                           INDEX idx_audit_table_time (target_table, action_time)
+) COMMENT='操作日志表'
+PARTITION BY RANGE (TO_DAYS(action_time)) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+-- 按安装时的当前日期拆分出初始分区（与迁移 0005 一致）：本月之前的日志放入 p_history，
+-- 本月及之后 3 个月按月分区，之后由 database/archive_audit_log.py 继续从 p_future 中拆分
+DELIMITER $$
+CREATE PROCEDURE InitAuditLogPartitions(IN months_ahead INT)
+BEGIN
+    DECLARE month_start DATE DEFAULT DATE_SUB(CURDATE(), INTERVAL DAYOFMONTH(CURDATE()) - 1 DAY);
+    DECLARE i INT DEFAULT 0;
+    SET @ddl = CONCAT('ALTER TABLE audit_log REORGANIZE PARTITION p_future INTO (',
+                      'PARTITION p_history VALUES LESS THAN (TO_DAYS(''', month_start, '''))');
+    WHILE i <= months_ahead DO
+        SET @ddl = CONCAT(@ddl, ', PARTITION p', DATE_FORMAT(DATE_ADD(month_start, INTERVAL i MONTH), '%Y%m'),
+                          ' VALUES LESS THAN (TO_DAYS(''', DATE_ADD(month_start, INTERVAL i + 1 MONTH), '''))');
+        SET i = i + 1;
+    END WHILE;
+    SET @ddl = CONCAT(@ddl, ', PARTITION p_future VALUES LESS THAN MAXVALUE)');
+    PREPARE stmt FROM @ddl;
+    EXECUTE stmt;
+    DEALLOCATE PREPARE stmt;
+END$$
+DELIMITER ;
+
+CALL InitAuditLogPartitions(3);
+DROP PROCEDURE InitAuditLogPartitions;
+
+-- 创建统计汇总表：只记录状态为'已完成'的预约，由触发器增量维护
+-- 设备使用汇总
+CREATE TABLE stats_device_usage (
+                                    did INT PRIMARY KEY COMMENT '设备ID',
+                                    total_reservations INT NOT NULL DEFAULT 0 COMMENT '已完成预约数',
+                                    total_hours_used INT NOT NULL DEFAULT 0 COMMENT '累计使用小时数',
+                                    FOREIGN KEY (did) REFERENCES devices(did) ON DELETE CASCADE ON UPDATE CASCADE
+) COMMENT='设备使用汇总表';
+
+-- 用户使用汇总（按角色统计时关联 users 表）
+CREATE TABLE stats_user_usage (
+                                  uid INT PRIMARY KEY COMMENT '用户ID',
+                                  total_reservations INT NOT NULL DEFAULT 0 COMMENT '已完成预约数',
+                                  total_hours INT NOT NULL DEFAULT 0 COMMENT '累计使用小时数',
+                                  FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE ON UPDATE CASCADE
+) COMMENT='用户使用汇总表';
+
+-- 设备-用户使用汇总（用于统计机房的独立用户数）
+CREATE TABLE stats_device_user (
+                                   did INT NOT NULL COMMENT '设备ID',
+                                   uid INT NOT NULL COMMENT '用户ID',
+                                   reservation_count INT NOT NULL DEFAULT 0 COMMENT '已完成预约数',
+                                   PRIMARY KEY (did, uid),
+                                   FOREIGN KEY (did) REFERENCES devices(did) ON DELETE CASCADE ON UPDATE CASCADE,
+                                   FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE ON UPDATE CASCADE
+) COMMENT='设备用户使用汇总表';
+
+-- 月度使用汇总
+CREATE TABLE stats_monthly_usage (
+                                     month CHAR(7) PRIMARY KEY COMMENT '月份(YYYY-MM)',
+                                     reservation_count INT NOT NULL DEFAULT 0 COMMENT '已完成预约数',
+                                     total_hours INT NOT NULL DEFAULT 0 COMMENT '累计使用小时数'
+) COMMENT='月度使用汇总表';
 
 -- 创建视图：设备详情视图（含机房位置）
 CREATE VIEW device_details AS
@@ -114,6 +187,10 @@ DELIMITER $$
 CREATE PROCEDURE CheckReservationConflict(IN new_uid INT, IN new_did INT, IN new_start DATETIME, IN new_end DATETIME)
 BEGIN
     DECLARE conflict_count INT;
+    DECLARE locked_did INT;
+-- 锁定设备行，与应用层预约路径串行化同一设备的并发预约
+SELECT did INTO locked_did FROM devices WHERE did = new_did FOR UPDATE;
+
 SELECT COUNT(*) INTO conflict_count
 FROM reservations
 WHERE did = new_did
@@ -131,12 +208,10 @@ END$$
 DELIMITER ;
 
 -- 创建存储过程：设备维护处理
+-- 过程内不控制事务，由调用方（call_procedure）的事务统一提交或回滚，HTTP 请求中即为请求级事务
 DELIMITER $$
 CREATE PROCEDURE ProcessMaintenance(IN device_id INT, IN issue_desc TEXT, IN reporter_id INT)
 BEGIN
-    -- 开始事务
-START TRANSACTION;
-
 -- 步骤1：标记设备为维护中
 UPDATE devices SET status = '维护中' WHERE did = device_id;
 
@@ -152,9 +227,66 @@ WHERE did = device_id AND status = '已确认' AND end_time > NOW();
 -- 步骤4：记录审计日志
 INSERT INTO audit_log (user_id, action, target_table, sql_text)
 VALUES (reporter_id, 'MAINTENANCE', 'devices', CONCAT('设备报修：', device_id));
+END$$
+DELIMITER ;
+
+-- 创建存储过程：累加/扣减一条已完成预约对统计汇总表的贡献（p_sign 为 1 或 -1）
+DELIMITER $$
+CREATE PROCEDURE ApplyReservationStats(IN p_did INT, IN p_uid INT, IN p_start DATETIME, IN p_end DATETIME, IN p_sign INT)
+BEGIN
+    DECLARE v_hours INT;
+    DECLARE v_month CHAR(7);
+    SET v_hours = TIMESTAMPDIFF(HOUR, p_start, p_end) * p_sign;
+    SET v_month = DATE_FORMAT(p_start, '%Y-%m');
+
+INSERT INTO stats_device_usage (did, total_reservations, total_hours_used)
+VALUES (p_did, p_sign, v_hours)
+    ON DUPLICATE KEY UPDATE total_reservations = total_reservations + p_sign,
+                            total_hours_used = total_hours_used + v_hours;
+
+INSERT INTO stats_user_usage (uid, total_reservations, total_hours)
+VALUES (p_uid, p_sign, v_hours)
+    ON DUPLICATE KEY UPDATE total_reservations = total_reservations + p_sign,
+                            total_hours = total_hours + v_hours;
+
+INSERT INTO stats_device_user (did, uid, reservation_count)
+VALUES (p_did, p_uid, p_sign)
+    ON DUPLICATE KEY UPDATE reservation_count = reservation_count + p_sign;
+DELETE FROM stats_device_user WHERE did = p_did AND uid = p_uid AND reservation_count <= 0;
+
+INSERT INTO stats_monthly_usage (month, reservation_count, total_hours)
+VALUES (v_month, p_sign, v_hours)
+    ON DUPLICATE KEY UPDATE reservation_count = reservation_count + p_sign,
+                            total_hours = total_hours + v_hours;
+DELETE FROM stats_monthly_usage WHERE month = v_month AND reservation_count <= 0;
+END$$
+DELIMITER ;
+
+-- 创建存储过程：根据预约表全量重建统计汇总表
+-- 级联删除（删除用户/设备/机房）不会触发 reservations 上的触发器，需在此类操作后调用
+DELIMITER $$
+CREATE PROCEDURE RebuildUsageStats()
+BEGIN
+DELETE FROM stats_device_usage;
+DELETE FROM stats_user_usage;
+DELETE FROM stats_device_user;
+DELETE FROM stats_monthly_usage;
+
+INSERT INTO stats_device_usage (did, total_reservations, total_hours_used)
+SELECT did, COUNT(*), COALESCE(SUM(TIMESTAMPDIFF(HOUR, start_time, end_time)), 0)
+FROM reservations WHERE status = '已完成' GROUP BY did;
 
--- 提交事务
-COMMIT;
+INSERT INTO stats_user_usage (uid, total_reservations, total_hours)
+SELECT uid, COUNT(*), COALESCE(SUM(TIMESTAMPDIFF(HOUR, start_time, end_time)), 0)
+FROM reservations WHERE status = '已完成' GROUP BY uid;
+
+INSERT INTO stats_device_user (did, uid, reservation_count)
+SELECT did, uid, COUNT(*)
+FROM reservations WHERE status = '已完成' GROUP BY did, uid;
+
+INSERT INTO stats_monthly_usage (month, reservation_count, total_hours)
+SELECT DATE_FORMAT(start_time, '%Y-%m'), COUNT(*), COALESCE(SUM(TIMESTAMPDIFF(HOUR, start_time, end_time)), 0)
+FROM reservations WHERE status = '已完成' GROUP BY DATE_FORMAT(start_time, '%Y-%m');
 END$$
 DELIMITER ;
 
@@ -197,6 +329,44 @@ BEGIN
     END$$
     DELIMITER ;
 
+-- 创建触发器：统计汇总表增量维护（预约进入/离开'已完成'状态时）
+DELIMITER $$
+CREATE TRIGGER trg_stats_reservations_insert
+    AFTER INSERT ON reservations
+    FOR EACH ROW
+BEGIN
+    IF NEW.status = '已完成' THEN
+        CALL ApplyReservationStats(NEW.did, NEW.uid, NEW.start_time, NEW.end_time, 1);
+END IF;
+END$$
+DELIMITER ;
+
+DELIMITER $$
+CREATE TRIGGER trg_stats_reservations_update
+    AFTER UPDATE ON reservations
+    FOR EACH ROW
+BEGIN
+    IF OLD.status = '已完成' THEN
+        CALL ApplyReservationStats(OLD.did, OLD.uid, OLD.start_time, OLD.end_time, -1);
+END IF;
+
+IF NEW.status = '已完成' THEN
+        CALL ApplyReservationStats(NEW.did, NEW.uid, NEW.start_time, NEW.end_time, 1);
+END IF;
+END$$
+DELIMITER ;
+
+DELIMITER $$
+CREATE TRIGGER trg_stats_reservations_delete
+    AFTER DELETE ON reservations
+    FOR EACH ROW
+BEGIN
+    IF OLD.status = '已完成' THEN
+        CALL ApplyReservationStats(OLD.did, OLD.uid, OLD.start_time, OLD.end_time, -1);
+END IF;
+END$$
+DELIMITER ;
+
 -- 创建用户和权限
 -- 创建学生用户
 CREATE USER IF NOT EXISTS 'student_user'@'%' IDENTIFIED BY 'Std@123';
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SQL 执行计划检查工具
+1. 从 app/models/*.py 中提取所有 SQL 字符串（包括 f-string），占位符按列名代入示例值
+2. 对模型通过 QueryFilter / paginate_query 拼接出的高频查询形态，用模型自己的构造函数生成 SQL
+逐条执行 EXPLAIN（不会真正执行语句），标记全表扫描（type=ALL）、全索引扫描（type=index）、
+文件排序和临时表。没有 WHERE 条件的语句（列出全部数据）的全表扫描只作提示。
+执行计划与数据量有关，请在接近生产数据量的库上运行。
+
+用法：python database/explain_queries.py --verbose --strict
+"""
+
+import argparse
+import ast
+import os
+import re
+import sys
+from datetime import datetime
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from app.utils.db_config import get_db_connection
+
+MODELS_DIR = os.path.join(project_root, 'app', 'models')
+
+SQL_PATTERN = re.compile(r'^\s*(SELECT|UPDATE|DELETE)\b', re.IGNORECASE)
+WRITE_PATTERN = re.compile(r'^\s*(UPDATE|DELETE)\b', re.IGNORECASE)
+LOCKING_CLAUSE = re.compile(r'\s+(FOR UPDATE|LOCK IN SHARE MODE)\s*$', re.IGNORECASE)
+
+SAMPLE_TIME = datetime(2026, 1, 1, 8, 0, 0)
+SAMPLE_LIMIT = 50
+
+
+def _render_expression(expression):
+    """
+    f-string 中插值表达式的替换文本
+    :return: 替换文本，无法静态确定时返回None
+    """
+    source = ast.unparse(expression)
+    if source.startswith('_mapper.'):
+        return '*'
+    if source == 'placeholders':
+        return '%s'
+    if source in ('where', 'alias'):
+        return ''
+    return None
+
+
+class _SqlCollector(ast.NodeVisitor):
+    """收集模块中的 SQL 字符串，记录所在的类和方法"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.scope = []
+        self.statements = []
+        self.skipped = []
+
+    def _visit_scope(self, node):
+        self.scope.append(node.name)
+        self.generic_visit(node)
+        self.scope.pop()
+
+    visit_ClassDef = _visit_scope
+    visit_FunctionDef = _visit_scope
+
+    def _source(self, node):
+        return f"{self.filename}:{node.lineno} {'.'.join(self.scope)}"
+
+    def _add(self, node, sql):
+        if not SQL_PATTERN.match(sql):
+            return
+        if WRITE_PATTERN.match(sql) and not re.search(r'\bWHERE\b', sql, re.IGNORECASE):
+            self.skipped.append((self._source(node), "WHERE 条件在运行时拼接"))
+            return
+        self.statements.append({'source': self._source(node), 'sql': sql, 'params': None})
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, str):
+            self._add(node, node.value)
+
+    def visit_JoinedStr(self, node):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(value.value)
+                continue
+            text = _render_expression(value.value)
+            if text is None:
+                if SQL_PATTERN.match(''.join(parts)):
+                    self.skipped.append((self._source(node), f"无法确定插值 {{{ast.unparse(value.value)}}}"))
+                return
+            parts.append(text)
+        self._add(node, ''.join(parts))
+
+
+def extract_statements(models_dir=MODELS_DIR):
+    """
+    提取模型文件中的 SQL 字符串
+    :return: (语句列表, 跳过的语句列表 [(来源, 原因)])
+    """
+    statements, skipped = [], []
+    for filename in sorted(os.listdir(models_dir)):
+        if not filename.endswith('.py'):
+            continue
+        with open(os.path.join(models_dir, filename), 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename)
+        collector = _SqlCollector(filename)
+        collector.visit(tree)
+        statements.extend(collector.statements)
+        skipped.extend(collector.skipped)
+    return statements, skipped
+
+
+def composed_statements():
+    """
+    用模型的过滤条件和分页函数生成高频查询形态（带游标的第二页，与接口实际发出的语句一致）
+    :return: 语句列表
+    """
+    from app.models.maintenance import Maintenance
+    from app.models.reservation import Reservation
+    from app.utils.pagination import encode_cursor, paginate_query
+    from app.utils.query_filter import QueryFilter
+
+    cursor = encode_cursor(SAMPLE_TIME, 1)
+    detailed_reservations = """
+        SELECT r.res_id, r.uid, r.did, r.start_time, r.end_time, r.status, u.uname, d.dname, d.type
+        FROM reservations r JOIN users u ON r.uid = u.uid JOIN devices d ON r.did = d.did
+    """
+    shapes = [
+        ('Reservation.get_by_user', "SELECT * FROM reservations", Reservation._build_filter(uid=1),
+         'res_id', 'start_time'),
+        ('Reservation.get_by_device', "SELECT * FROM reservations", Reservation._build_filter(did=1),
+         'res_id', 'start_time'),
+        ('Reservation.find_reservations(status)', "SELECT * FROM reservations",
+         Reservation._build_filter(status='待审核'), 'res_id', 'start_time'),
+        ('Reservation.find_reservations(time)', "SELECT * FROM reservations",
+         Reservation._build_filter(time_from=SAMPLE_TIME, time_to=SAMPLE_TIME), 'res_id', 'start_time'),
+        ('Reservation.get_detailed_reservations(uid)', detailed_reservations,
+         Reservation._build_filter('r.', uid=1), 'r.res_id', 'r.start_time'),
+        ('Maintenance.get_by_device', "SELECT * FROM maintenances", Maintenance._build_filter(did=1),
+         'mid', 'report_time'),
+        ('Maintenance.find_maintenances(status)', "SELECT * FROM maintenances",
+         Maintenance._build_filter(status='待处理'), 'mid', 'report_time'),
+        ('AuditLog.get_logs_by_user', "SELECT * FROM audit_log", QueryFilter().eq('user_id', 1),
+         'log_id', 'action_time'),
+        ('AuditLog.get_logs_by_action', "SELECT * FROM audit_log", QueryFilter().eq('action', 'LOGIN'),
+         'log_id', 'action_time'),
+        ('AuditLog.get_logs_by_table', "SELECT * FROM audit_log", QueryFilter().eq('target_table', 'devices'),
+         'log_id', 'action_time'),
+    ]
+    statements = []
+    for source, base_query, query_filter, pk_column, sort_column in shapes:
+        query, params = paginate_query(base_query, query_filter.conditions, query_filter.params,
+                                       SAMPLE_LIMIT, cursor, pk_column, sort_column=sort_column)
+        statements.append({'source': f"[分页] {source}", 'sql': query, 'params': params})
+    return statements
+
+
+def _sample_value(column):
+    column = column.split('.')[-1].lower()
+    if column == 'open_time':
+        return 'sample'
+    if column.endswith('time') or column.endswith('_at'):
+        return SAMPLE_TIME
+    if column == 'month':
+        return SAMPLE_TIME.strftime('%Y-%m')
+    if column.endswith('id') or column in ('uid', 'did', 'rid', 'mid', 'handler'):
+        return 1
+    return 'sample'
+
+
+def sample_params(sql):
+    """
+    按占位符前后的列名生成示例参数（LIMIT 用整数，时间列用 datetime，ID 列用整数，其余用字符串）
+    :return: 参数元组
+    """
+    params = []
+    for match in re.finditer(r'%s', sql):
+        before, after = sql[:match.start()], sql[match.end():]
+        if re.search(r'\b(LIMIT|OFFSET)\s*$', before, re.IGNORECASE):
+            params.append(SAMPLE_LIMIT)
+            continue
+        column = (re.search(r'([\w.]+)\s*(=|!=|<>|<=|>=|<|>)\s*$', before)
+                  or re.search(r'([\w.]+)\s+IN\s*\(\s*(%s\s*,\s*)*$', before, re.IGNORECASE))
+        if column is None:
+            column = re.match(r'\s*(?:=|!=|<>|<=|>=|<|>)\s*([\w.]+)', after)
+        params.append(_sample_value(column.group(1)) if column else 'sample')
+    return tuple(params)
+
+
+def explain(cursor, statement):
+    """
+    执行 EXPLAIN
+    :return: 执行计划行列表
+    """
+    sql = LOCKING_CLAUSE.sub('', statement['sql'].strip())
+    params = statement['params'] if statement['params'] is not None else sample_params(sql)
+    cursor.execute("EXPLAIN " + sql, params)
+    return cursor.fetchall()
+
+
+def findings(plan):
+    """
+    从执行计划中找出问题
+    :return: [(问题, 执行计划行)]
+    """
+    problems = []
+    for row in plan:
+        table = row.get('table') or ''
+        if table.startswith('<'):
+            # 派生表/物化子查询的扫描由其内部查询决定
+            continue
+        extra = row.get('Extra') or ''
+        if row.get('type') == 'ALL':
+            problems.append(('全表扫描', row))
+        elif row.get('type') == 'index':
+            problems.append(('全索引扫描', row))
+        if 'Using filesort' in extra:
+            problems.append(('文件排序', row))
+        if 'Using temporary' in extra:
+            problems.append(('临时表', row))
+    return problems
+
+
+def _one_line(sql, width=150):
+    text = ' '.join(sql.split())
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+
+def _describe(row):
+    return (f"{row.get('table')}: type={row.get('type')} key={row.get('key')} "
+            f"rows={row.get('rows')} Extra={row.get('Extra') or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对 app/models 中的 SQL 执行 EXPLAIN 并标记全表扫描')
+    parser.add_argument('--verbose', action='store_true', help='打印所有语句的执行计划')
+    parser.add_argument('--strict', action='store_true', help='带过滤条件的语句出现全表扫描时以退出码 1 结束')
+    args = parser.parse_args()
+
+    statements, skipped = extract_statements()
+    statements.extend(composed_statements())
+
+    connection = get_db_connection()
+    if connection is None:
+        sys.exit(1)
+
+    scans, errors = 0, 0
+    try:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                try:
+                    plan = explain(cursor, statement)
+                except Exception as e:
+                    errors += 1
+                    print(f"[EXPLAIN失败] {statement['source']}\n    {_one_line(statement['sql'])}\n    {e}")
+                    continue
+
+                problems = findings(plan)
+                filtered = re.search(r'\bWHERE\b', statement['sql'], re.IGNORECASE) is not None
+                if any(problem == '全表扫描' for problem, _ in problems) and filtered:
+                    scans += 1
+                if not problems and not args.verbose:
+                    continue
+
+                labels = sorted({problem for problem, _ in problems}) or ['OK']
+                note = '' if filtered or not problems else '（无过滤条件）'
+                print(f"[{'/'.join(labels)}]{note} {statement['source']}")
+                print(f"    {_one_line(statement['sql'])}")
+                rows = plan if args.verbose else list({id(row): row for _, row in problems}.values())
+                for row in rows:
+                    print(f"    {_describe(row)}")
+    finally:
+        connection.rollback()
+        connection.close()
+
+    for source, reason in skipped:
+        print(f"[跳过] {source}: {reason}")
+    print(f"\n共检查 {len(statements)} 条语句，带过滤条件的全表扫描 {scans} 条，"
+          f"EXPLAIN 失败 {errors} 条，跳过 {len(skipped)} 条")
+    if args.strict and scans:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
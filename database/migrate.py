@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据库版本化迁移
+- 数据库不存在时按 create_database.sql 创建（该脚本始终是最新的完整结构），并把现有迁移全部记为已执行
+- 数据库已存在时按版本号顺序执行 database/migrations 中未执行的迁移，
+  每个迁移执行成功后写入 schema_migrations；没有 schema_migrations 表的旧库会执行全部迁移（迁移均可重复执行）
+- 修改表结构时：在 migrations 中新增迁移文件，并同步修改 create_database.sql
+
+用法：
+    python database/migrate.py             # 创建数据库或执行未执行的迁移
+    python database/migrate.py --status    # 查看迁移状态
+    python database/migrate.py --dry-run   # 只列出将要执行的迁移
+"""
+
+import argparse
+import importlib
+import os
+import re
+import sys
+
+import pymysql
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from app.utils.db_config import DB_CONFIG
+from database.migrations import split_sql_script, table_exists
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'create_database.sql')
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d{4})_(\w+)\.(sql|py)$')
+
+
+def load_migrations():
+    """
+    列出迁移文件
+    :return: [{'version', 'name', 'path', 'kind'}]，按版本号排序
+    :raises ValueError: 版本号重复
+    """
+    migrations = {}
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        version, name, kind = match.groups()
+        if version in migrations:
+            raise ValueError(f"迁移版本号重复: {version}")
+        migrations[version] = {
+            'version': version, 'name': name, 'kind': kind,
+            'path': os.path.join(MIGRATIONS_DIR, filename)
+        }
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def execute_script(connection, cursor, script):
+    """
+    执行 SQL 脚本（USE 语句切换到配置中的数据库）
+    """
+    statements = split_sql_script(script)
+    total_statements = len(statements)
+    for i, statement in enumerate(statements):
+        if statement.upper().startswith('USE'):
+            connection.select_db(DB_CONFIG['db'])
+            continue
+        try:
+            cursor.execute(statement)
+            # 消费 CALL 等语句返回的结果集
+            cursor.fetchall()
+            print(f"  正在执行... ({i + 1}/{total_statements})", end='\r')
+        except pymysql.Error as e:
+            # 某些用户创建语句如果用户已存在会报错，可以忽略
+            if "Cannot create a user that already exists" in str(e):
+                print(f"\n警告: {e}")
+            else:
+                print(f"\n执行SQL语句时出错: {statement}\n错误: {e}")
+                raise
+    if total_statements:
+        print()
+
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version CHAR(4) PRIMARY KEY COMMENT '迁移版本号',
+            name VARCHAR(100) NOT NULL COMMENT '迁移名称',
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '执行时间'
+        ) COMMENT='数据库迁移记录表'
+    """)
+
+
+def applied_migrations(cursor):
+    """
+    获取已执行的迁移
+    :return: {版本号: 执行时间}
+    """
+    if not table_exists(cursor, 'schema_migrations'):
+        return {}
+    cursor.execute("SELECT version, applied_at FROM schema_migrations")
+    return {row['version']: row['applied_at'] for row in cursor.fetchall()}
+
+
+def record_migration(cursor, migration):
+    cursor.execute(
+        "INSERT IGNORE INTO schema_migrations (version, name) VALUES (%s, %s)",
+        (migration['version'], migration['name'])
+    )
+
+
+def apply_migration(connection, migration):
+    """
+    执行一个迁移并记录
+    """
+    with connection.cursor() as cursor:
+        if migration['kind'] == 'sql':
+            with open(migration['path'], 'r', encoding='utf-8') as f:
+                execute_script(connection, cursor, f.read())
+        else:
+            module = importlib.import_module(f"database.migrations.{migration['version']}_{migration['name']}")
+            module.upgrade(cursor)
+        record_migration(cursor, migration)
+    connection.commit()
+
+
+def connect_server():
+    """
+    连接 MySQL 服务器（不指定数据库）
+    :return: 连接对象，失败返回None
+    """
+    server_config = DB_CONFIG.copy()
+    del server_config['db']
+    try:
+        return pymysql.connect(**server_config)
+    except pymysql.Error as e:
+        print(f"无法连接到MySQL服务器: {e}")
+        print("请确保MySQL服务器正在运行，并且 'app/utils/db_config.py' 中的连接信息正确。")
+        return None
+
+
+def database_exists(cursor):
+    cursor.execute("SHOW DATABASES LIKE %s", (DB_CONFIG['db'],))
+    return cursor.fetchone() is not None
+
+
+def create_database(connection, migrations):
+    """
+    按 create_database.sql 创建数据库，并把现有迁移记为已执行
+    """
+    with open(SCHEMA_FILE, 'r', encoding='utf-8') as f:
+        script = f.read()
+    with connection.cursor() as cursor:
+        execute_script(connection, cursor, script)
+        connection.select_db(DB_CONFIG['db'])
+        ensure_migrations_table(cursor)
+        for migration in migrations:
+            record_migration(cursor, migration)
+    connection.commit()
+
+
+def migrate(dry_run=False):
+    """
+    创建数据库或执行未执行的迁移
+    :param dry_run: 只列出将要执行的迁移
+    :return: 成功返回True，失败返回False
+    """
+    db_name = DB_CONFIG['db']
+    migrations = load_migrations()
+    connection = connect_server()
+    if connection is None:
+        return False
+
+    try:
+        with connection.cursor() as cursor:
+            if not database_exists(cursor):
+                if dry_run:
+                    print(f"数据库 '{db_name}' 不存在，将按 create_database.sql 创建")
+                    return True
+                print(f"数据库 '{db_name}' 不存在，正在创建...")
+                create_database(connection, migrations)
+                print(f"数据库初始化成功，当前版本 {migrations[-1]['version'] if migrations else '-'}")
+                return True
+
+            connection.select_db(db_name)
+            applied = applied_migrations(cursor)
+
+        pending = [m for m in migrations if m['version'] not in applied]
+        if not pending:
+            print(f"数据库 '{db_name}' 已是最新版本。")
+            return True
+        for migration in pending:
+            print(f"{'待执行' if dry_run else '执行迁移'} {migration['version']}_{migration['name']}")
+            if dry_run:
+                continue
+            with connection.cursor() as cursor:
+                ensure_migrations_table(cursor)
+            apply_migration(connection, migration)
+        return True
+    except Exception as e:
+        connection.rollback()
+        print(f"数据库迁移失败: {e}")
+        return False
+    finally:
+        connection.close()
+
+
+def show_status():
+    """
+    打印每个迁移的执行状态
+    """
+    connection = connect_server()
+    if connection is None:
+        return
+    try:
+        with connection.cursor() as cursor:
+            if not database_exists(cursor):
+                print(f"数据库 '{DB_CONFIG['db']}' 不存在")
+                return
+            connection.select_db(DB_CONFIG['db'])
+            applied = applied_migrations(cursor)
+        for migration in load_migrations():
+            applied_at = applied.get(migration['version'])
+            status = f"已执行 {applied_at}" if applied_at else '未执行'
+            print(f"{migration['version']}_{migration['name']:<32} {status}")
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据库版本化迁移')
+    parser.add_argument('--status', action='store_true', help='查看迁移状态')
+    parser.add_argument('--dry-run', action='store_true', help='只列出将要执行的迁移')
+    args = parser.parse_args()
+
+    if args.status:
+        show_status()
+    elif not migrate(args.dry_run):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+-- 统计汇总表及维护它们的存储过程、触发器（表已存在时保留，存储过程和触发器重建）
+
+-- 创建统计汇总表：只记录状态为'已完成'的预约，由触发器增量维护
+-- 设备使用汇总
+CREATE TABLE IF NOT EXISTS stats_device_usage (
+                                    did INT PRIMARY KEY COMMENT '设备ID',
+                                    total_reservations INT NOT NULL DEFAULT 0 COMMENT '已完成预约数',
+                                    total_hours_used INT NOT NULL DEFAULT 0 COMMENT '累计使用小时数',
+                                    FOREIGN KEY (did) REFERENCES devices(did) ON DELETE CASCADE ON UPDATE CASCADE
+) COMMENT='设备使用汇总表';
+
+-- 用户使用汇总（按角色统计时关联 users 表）
+CREATE TABLE IF NOT EXISTS stats_user_usage (
+                                  uid INT PRIMARY KEY COMMENT '用户ID',
+                                  total_reservations INT NOT NULL DEFAULT 0 COMMENT '已完成预约数',
+                                  total_hours INT NOT NULL DEFAULT 0 COMMENT '累计使用小时数',
+                                  FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE ON UPDATE CASCADE
+) COMMENT='用户使用汇总表';
+
+-- 设备-用户使用汇总（用于统计机房的独立用户数）
+CREATE TABLE IF NOT EXISTS stats_device_user (
+                                   did INT NOT NULL COMMENT '设备ID',
+                                   uid INT NOT NULL COMMENT '用户ID',
+                                   reservation_count INT NOT NULL DEFAULT 0 COMMENT '已完成预约数',
+                                   PRIMARY KEY (did, uid),
+                                   FOREIGN KEY (did) REFERENCES devices(did) ON DELETE CASCADE ON UPDATE CASCADE,
+                                   FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE ON UPDATE CASCADE
+) COMMENT='设备用户使用汇总表';
+
+-- 月度使用汇总
+CREATE TABLE IF NOT EXISTS stats_monthly_usage (
+                                     month CHAR(7) PRIMARY KEY COMMENT '月份(YYYY-MM)',
+                                     reservation_count INT NOT NULL DEFAULT 0 COMMENT '已完成预约数',
+                                     total_hours INT NOT NULL DEFAULT 0 COMMENT '累计使用小时数'
+) COMMENT='月度使用汇总表';
+
+-- 创建存储过程：累加/扣减一条已完成预约对统计汇总表的贡献（p_sign 为 1 或 -1）
+DELIMITER $$
+DROP PROCEDURE IF EXISTS ApplyReservationStats$$
+CREATE PROCEDURE ApplyReservationStats(IN p_did INT, IN p_uid INT, IN p_start DATETIME, IN p_end DATETIME, IN p_sign INT)
+BEGIN
+    DECLARE v_hours INT;
+    DECLARE v_month CHAR(7);
+    SET v_hours = TIMESTAMPDIFF(HOUR, p_start, p_end) * p_sign;
+    SET v_month = DATE_FORMAT(p_start, '%Y-%m');
+
+INSERT INTO stats_device_usage (did, total_reservations, total_hours_used)
+VALUES (p_did, p_sign, v_hours)
+    ON DUPLICATE KEY UPDATE total_reservations = total_reservations + p_sign,
+                            total_hours_used = total_hours_used + v_hours;
+
+INSERT INTO stats_user_usage (uid, total_reservations, total_hours)
+VALUES (p_uid, p_sign, v_hours)
+    ON DUPLICATE KEY UPDATE total_reservations = total_reservations + p_sign,
+                            total_hours = total_hours + v_hours;
+
+INSERT INTO stats_device_user (did, uid, reservation_count)
+VALUES (p_did, p_uid, p_sign)
+    ON DUPLICATE KEY UPDATE reservation_count = reservation_count + p_sign;
+DELETE FROM stats_device_user WHERE did = p_did AND uid = p_uid AND reservation_count <= 0;
+
+INSERT INTO stats_monthly_usage (month, reservation_count, total_hours)
+VALUES (v_month, p_sign, v_hours)
+    ON DUPLICATE KEY UPDATE reservation_count = reservation_count + p_sign,
+                            total_hours = total_hours + v_hours;
+DELETE FROM stats_monthly_usage WHERE month = v_month AND reservation_count <= 0;
+END$$
+DELIMITER ;
+
+-- 创建存储过程：根据预约表全量重建统计汇总表
+-- 级联删除（删除用户/设备/机房）不会触发 reservations 上的触发器，需在此类操作后调用
+DELIMITER $$
+DROP PROCEDURE IF EXISTS RebuildUsageStats$$
+CREATE PROCEDURE RebuildUsageStats()
+BEGIN
+DELETE FROM stats_device_usage;
+DELETE FROM stats_user_usage;
+DELETE FROM stats_device_user;
+DELETE FROM stats_monthly_usage;
+
+INSERT INTO stats_device_usage (did, total_reservations, total_hours_used)
+SELECT did, COUNT(*), COALESCE(SUM(TIMESTAMPDIFF(HOUR, start_time, end_time)), 0)
+FROM reservations WHERE status = '已完成' GROUP BY did;
+
+INSERT INTO stats_user_usage (uid, total_reservations, total_hours)
+SELECT uid, COUNT(*), COALESCE(SUM(TIMESTAMPDIFF(HOUR, start_time, end_time)), 0)
+FROM reservations WHERE status = '已完成' GROUP BY uid;
+
+INSERT INTO stats_device_user (did, uid, reservation_count)
+SELECT did, uid, COUNT(*)
+FROM reservations WHERE status = '已完成' GROUP BY did, uid;
+
+INSERT INTO stats_monthly_usage (month, reservation_count, total_hours)
+SELECT DATE_FORMAT(start_time, '%Y-%m'), COUNT(*), COALESCE(SUM(TIMESTAMPDIFF(HOUR, start_time, end_time)), 0)
+FROM reservations WHERE status = '已完成' GROUP BY DATE_FORMAT(start_time, '%Y-%m');
+END$$
+DELIMITER ;
+
+-- 创建触发器：统计汇总表增量维护（预约进入/离开'已完成'状态时）
+DELIMITER $$
+DROP TRIGGER IF EXISTS trg_stats_reservations_insert$$
+CREATE TRIGGER trg_stats_reservations_insert
+    AFTER INSERT ON reservations
+    FOR EACH ROW
+BEGIN
+    IF NEW.status = '已完成' THEN
+        CALL ApplyReservationStats(NEW.did, NEW.uid, NEW.start_time, NEW.end_time, 1);
+END IF;
+END$$
+DELIMITER ;
+
+DELIMITER $$
+DROP TRIGGER IF EXISTS trg_stats_reservations_update$$
+CREATE TRIGGER trg_stats_reservations_update
+    AFTER UPDATE ON reservations
+    FOR EACH ROW
+BEGIN
+    IF OLD.status = '已完成' THEN
+        CALL ApplyReservationStats(OLD.did, OLD.uid, OLD.start_time, OLD.end_time, -1);
+END IF;
+
+IF NEW.status = '已完成' THEN
+        CALL ApplyReservationStats(NEW.did, NEW.uid, NEW.start_time, NEW.end_time, 1);
+END IF;
+END$$
+DELIMITER ;
+
+DELIMITER $$
+DROP TRIGGER IF EXISTS trg_stats_reservations_delete$$
+CREATE TRIGGER trg_stats_reservations_delete
+    AFTER DELETE ON reservations
+    FOR EACH ROW
+BEGIN
+    IF OLD.status = '已完成' THEN
+        CALL ApplyReservationStats(OLD.did, OLD.uid, OLD.start_time, OLD.end_time, -1);
+END IF;
+END$$
+DELIMITER ;
+
+-- 按现有预约数据初始化汇总表
+CALL RebuildUsageStats();
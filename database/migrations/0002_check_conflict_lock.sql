@@ -0,0 +1,26 @@
+-- 预约冲突检查存储过程先锁定设备行，与应用层预约路径串行化同一设备的并发预约
+
+DELIMITER $$
+DROP PROCEDURE IF EXISTS CheckReservationConflict$$
+CREATE PROCEDURE CheckReservationConflict(IN new_uid INT, IN new_did INT, IN new_start DATETIME, IN new_end DATETIME)
+BEGIN
+    DECLARE conflict_count INT;
+    DECLARE locked_did INT;
+-- 锁定设备行，与应用层预约路径串行化同一设备的并发预约
+SELECT did INTO locked_did FROM devices WHERE did = new_did FOR UPDATE;
+
+SELECT COUNT(*) INTO conflict_count
+FROM reservations
+WHERE did = new_did
+  AND status = '已确认'
+  AND new_start < end_time
+  AND new_end > start_time;
+
+IF conflict_count > 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = '时间冲突，预约失败';
+ELSE
+        INSERT INTO reservations (uid, did, start_time, end_time, status)
+        VALUES (new_uid, new_did, new_start, new_end, '待审核');
+END IF;
+END$$
+DELIMITER ;
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+为模型中的高频查询补齐索引
+- reservations(uid, start_time)：get_by_user（按 start_time, res_id 分页，二级索引隐含主键，无需额外排序）
+- reservations(did, start_time)：get_by_device、设备时间线加载
+- reservations(status, start_time)：按状态筛选的预约列表（按 start_time 分页）
+- reservations(did, status, start_time, end_time)：冲突检查与 CheckReservationConflict
+- maintenances(did, report_time)：get_by_device
+- maintenances(status, report_time)：待处理/超时维护查询（按 report_time 排序）
+- maintenances(status, complete_time, report_time, did)：维护统计
+- audit_log：按时间、用户、操作类型、目标表过滤的日志查询
+被复合索引最左前缀覆盖的单列索引（含外键自动创建的索引）随后删除，减少写入开销
+"""
+
+from database.migrations import add_index, drop_index
+
+INDEXES = [
+    ('reservations', 'idx_res_device_slot', ['did', 'status', 'start_time', 'end_time'], '预约冲突检测索引'),
+    ('reservations', 'idx_res_user_time', ['uid', 'start_time'], '用户预约列表索引'),
+    ('reservations', 'idx_res_device_time', ['did', 'start_time'], '设备预约列表索引'),
+    ('reservations', 'idx_res_status_time', ['status', 'start_time'], '预约状态与开始时间索引'),
+    ('maintenances', 'idx_maint_stats', ['status', 'complete_time', 'report_time', 'did'], '维护统计覆盖索引'),
+    ('maintenances', 'idx_maint_device_time', ['did', 'report_time'], '设备维护记录索引'),
+    ('maintenances', 'idx_maint_status_time', ['status', 'report_time'], '维护状态与报修时间索引'),
+    ('audit_log', 'idx_audit_time', ['action_time'], None),
+    ('audit_log', 'idx_audit_user_time', ['user_id', 'action_time'], None),
+    ('audit_log', 'idx_audit_action_time', ['action', 'action_time'], None),
+    ('audit_log', 'idx_audit_table_time', ['target_table', 'action_time'], None),
+]
+
+# 被上面的复合索引最左前缀覆盖的单列索引 (表, 索引名, 列)；外键自动创建的索引以列名命名
+REDUNDANT_INDEXES = [
+    ('reservations', 'uid', ['uid']),
+    ('reservations', 'did', ['did']),
+    ('reservations', 'idx_res_status', ['status']),
+    ('maintenances', 'did', ['did']),
+    ('maintenances', 'idx_maintenance_status', ['status']),
+    ('audit_log', 'user_id', ['user_id']),
+]
+
+
+def upgrade(cursor):
+    for table, name, columns, comment in INDEXES:
+        if add_index(cursor, table, name, columns, comment):
+            print(f"  新建索引 {table}.{name} ({', '.join(columns)})")
+    for table, name, columns in REDUNDANT_INDEXES:
+        if drop_index(cursor, table, name, columns):
+            print(f"  删除冗余索引 {table}.{name}")
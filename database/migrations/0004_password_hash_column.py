@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+users.password 扩展为 VARCHAR(255)，容纳加盐 KDF 哈希（pbkdf2_sha256$... / scrypt$...）
+旧的 SHA-256 十六进制哈希保留不变，用户下次登录成功时升级
+"""
+
+from database.migrations import column_info
+
+
+def upgrade(cursor):
+    info = column_info(cursor, 'users', 'password')
+    if info is None or (info['max_length'] or 0) >= 255:
+        return
+    cursor.execute("ALTER TABLE users MODIFY password VARCHAR(255) NOT NULL COMMENT '密码哈希'")
+    print("  users.password 已扩展为 VARCHAR(255)")
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+将未分区的 audit_log 转换为按月 RANGE 分区（分区名 pYYYYMM，与 create_database.sql 一致）
+- 分区表不支持外键：删除 audit_log 上的外键（删除用户时由应用删除其日志）
+- 主键必须包含分区列：action_time 改为 NOT NULL，主键改为 (log_id, action_time)
+- 本月之前的日志全部放入 p_history，之后由 database/archive_audit_log.py 维护按月分区
+"""
+
+from datetime import date
+
+from database.migrations import foreign_keys, is_partitioned
+
+MONTHS_AHEAD = 3
+
+
+def _month_start(offset):
+    today = date.today()
+    month_index = today.year * 12 + today.month - 1 + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def upgrade(cursor):
+    if is_partitioned(cursor, 'audit_log'):
+        return
+
+    for name in foreign_keys(cursor, 'audit_log'):
+        cursor.execute(f"ALTER TABLE audit_log DROP FOREIGN KEY {name}")
+        print(f"  删除外键 audit_log.{name}")
+
+    # 历史上显式写入 NULL 的记录没有时间信息，归入 p_history
+    cursor.execute("UPDATE audit_log SET action_time = '1970-01-01 00:00:00' WHERE action_time IS NULL")
+    cursor.execute("""
+        ALTER TABLE audit_log
+            MODIFY action_time DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '操作时间',
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (log_id, action_time)
+    """)
+
+    definitions = [f"PARTITION p_history VALUES LESS THAN (TO_DAYS('{_month_start(0).isoformat()}'))"]
+    for offset in range(MONTHS_AHEAD + 1):
+        start, upper = _month_start(offset), _month_start(offset + 1)
+        definitions.append(
+            f"PARTITION p{start.year:04d}{start.month:02d} VALUES LESS THAN (TO_DAYS('{upper.isoformat()}'))"
+        )
+    definitions.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+    cursor.execute(f"ALTER TABLE audit_log PARTITION BY RANGE (TO_DAYS(action_time)) ({', '.join(definitions)})")
+    print(f"  audit_log 已按月分区（{len(definitions)} 个分区）")
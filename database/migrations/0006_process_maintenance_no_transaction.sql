@@ -0,0 +1,23 @@
+-- 设备维护存储过程去掉 START TRANSACTION/COMMIT，加入调用方的事务（请求级事务不再被提前提交）
+
+DELIMITER $$
+DROP PROCEDURE IF EXISTS ProcessMaintenance$$
+CREATE PROCEDURE ProcessMaintenance(IN device_id INT, IN issue_desc TEXT, IN reporter_id INT)
+BEGIN
+-- 步骤1：标记设备为维护中
+UPDATE devices SET status = '维护中' WHERE did = device_id;
+
+-- 步骤2：创建维护记录
+INSERT INTO maintenances (did, issue, report_time)
+VALUES (device_id, issue_desc, NOW());
+
+-- 步骤3：取消关联预约
+UPDATE reservations
+SET status = '已取消'
+WHERE did = device_id AND status = '已确认' AND end_time > NOW();
+
+-- 步骤4：记录审计日志
+INSERT INTO audit_log (user_id, action, target_table, sql_text)
+VALUES (reporter_id, 'MAINTENANCE', 'devices', CONCAT('设备报修：', device_id));
+END$$
+DELIMITER ;
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据库迁移
+迁移文件命名为 <4位版本号>_<名称>.sql 或 .py，由 database/migrate.py 按版本号顺序执行：
+- .sql：按 DELIMITER 拆分后逐条执行
+- .py：定义 upgrade(cursor) 函数
+
+MySQL 的 DDL 会隐式提交，迁移无法整体回滚，因此每个迁移都必须可以重复执行
+（先检查 information_schema，或使用 IF NOT EXISTS / DROP ... IF EXISTS），
+中途失败时修复问题后重新运行即可。本模块提供迁移中常用的检查函数。
+"""
+
+
+def split_sql_script(script):
+    """
+    将 SQL 脚本拆分为语句列表（支持 DELIMITER，忽略空行和 -- 注释行）
+    :param script: 脚本内容
+    :return: 语句列表（不含分隔符）
+    """
+    delimiter = ';'
+    statements = []
+    current_statement = []
+
+    for line in script.splitlines():
+        line = line.strip()
+        if not line or line.startswith('--'):
+            continue
+
+        if line.upper().startswith('DELIMITER'):
+            delimiter = line.split()[1]
+            continue
+
+        current_statement.append(line)
+        if line.endswith(delimiter):
+            statement = " ".join(current_statement)
+            # 去掉末尾的分隔符
+            statements.append(statement[:-len(delimiter)].strip())
+            current_statement = []
+    return [statement for statement in statements if statement]
+
+
+def table_exists(cursor, table):
+    """
+    检查当前数据库中是否存在表
+    """
+    cursor.execute("""
+        SELECT 1 FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return cursor.fetchone() is not None
+
+
+def index_columns(cursor, table, name):
+    """
+    获取索引的列
+    :return: 列名列表（按索引中的顺序），索引不存在返回空列表
+    """
+    cursor.execute("""
+        SELECT COLUMN_NAME AS column_name FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        ORDER BY SEQ_IN_INDEX
+    """, (table, name))
+    return [row['column_name'] for row in cursor.fetchall()]
+
+
+def add_index(cursor, table, name, columns, comment=None):
+    """
+    添加索引（同名索引已存在时跳过）
+    :param columns: 列名列表
+    :return: 新建返回True，已存在返回False
+    """
+    existing = index_columns(cursor, table, name)
+    if existing:
+        if existing != list(columns):
+            print(f"警告: {table}.{name} 已存在但列为 ({', '.join(existing)})，未修改")
+        return False
+    query = f"ALTER TABLE {table} ADD INDEX {name} ({', '.join(columns)})"
+    if comment:
+        query += f" COMMENT '{comment}'"
+    cursor.execute(query)
+    return True
+
+
+def drop_index(cursor, table, name, columns):
+    """
+    删除索引（仅当索引存在且列与预期一致时，避免误删同名的其他索引）
+    :param columns: 预期的列名列表
+    :return: 删除返回True
+    """
+    if index_columns(cursor, table, name) != list(columns):
+        return False
+    cursor.execute(f"ALTER TABLE {table} DROP INDEX {name}")
+    return True
+
+
+def column_info(cursor, table, column):
+    """
+    获取列定义
+    :return: {'data_type', 'max_length', 'nullable'}，列不存在返回None
+    """
+    cursor.execute("""
+        SELECT DATA_TYPE AS data_type, CHARACTER_MAXIMUM_LENGTH AS max_length, IS_NULLABLE AS nullable
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return cursor.fetchone()
+
+
+def foreign_keys(cursor, table):
+    """
+    获取表上的外键约束名
+    :return: 约束名列表
+    """
+    cursor.execute("""
+        SELECT CONSTRAINT_NAME AS name FROM information_schema.REFERENTIAL_CONSTRAINTS
+        WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return [row['name'] for row in cursor.fetchall()]
+
+
+def is_partitioned(cursor, table):
+    """
+    检查表是否已分区
+    """
+    cursor.execute("""
+        SELECT 1 FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        LIMIT 1
+    """, (table,))
+    return cursor.fetchone() is not None
@@ -13,12 +13,15 @@ project_root = os.path.abspath(os.path.dirname(__file__))
 sys.path.insert(0, project_root)
 
 from app.app import create_app
-from database.init_db import initialize_database
+from database.migrate import migrate
 
 if __name__ == '__main__':
-    # 运行数据库初始化脚本
+    # 创建数据库或执行未执行的迁移
     print("--- 正在检查数据库状态 ---")
-    initialize_database()
+    if not migrate():
+        # 表结构未升级时不启动应用（如新的密码哈希写不进旧的 VARCHAR(64) 列）
+        print("数据库迁移失败，应用未启动。修复问题后重新运行，或执行 python database/migrate.py --status 查看迁移状态")
+        sys.exit(1)
     print("--- 数据库检查完成 ---\n")
     
     # 启动Flask应用
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+审计日志分区测试：拆分 p_future 的 DDL 在单独的连接上执行，不加入请求级事务
+"""
+
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+from app.models import audit_log as audit_log_module
+from app.models.audit_log import AuditLog
+
+
+class FakeCursor:
+    def __init__(self, statements):
+        self.statements = statements
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+
+
+class FakePool:
+    def __init__(self):
+        self.statements = []
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+    def cursor(self):
+        return FakeCursor(self.statements)
+
+
+def test_ensure_partitions_runs_ddl_on_own_connection(monkeypatch):
+    pool = FakePool()
+    this_month = date.today().replace(day=1)
+    monkeypatch.setattr(AuditLog, 'list_partitions', staticmethod(lambda: [
+        {'name': 'p_history', 'upper_bound': this_month, 'rows': 0},
+        {'name': 'p_future', 'upper_bound': None, 'rows': 0},
+    ]))
+    monkeypatch.setattr(audit_log_module, 'get_connection_pool', lambda: pool)
+    monkeypatch.setattr(audit_log_module, 'execute_update', lambda *args: pytest.fail('DDL 不能通过请求级会话执行'))
+
+    created = AuditLog.ensure_partitions(months_ahead=1)
+    assert created[0] == f"p{this_month.year:04d}{this_month.month:02d}"
+    assert len(created) == 2
+    assert len(pool.statements) == 1
+    assert pool.statements[0].startswith('ALTER TABLE audit_log REORGANIZE PARTITION p_future')
+
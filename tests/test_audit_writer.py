@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+审计日志写入测试
+- 请求级事务回滚时不写入审计日志
+- 转存文件中无法解析或被数据库拒绝的日志移到隔离文件，其余日志继续补写
+"""
+
+from datetime import datetime
+
+from flask import Flask, jsonify
+
+from app.models import audit_log as audit_log_module
+from app.models.audit_log import AuditLog
+from app.utils import db_session
+from app.utils.audit_writer import AuditWriter
+
+
+class FakePool:
+    def acquire(self):
+        return None
+
+    def release(self, connection, discard=False):
+        pass
+
+
+def _writer(tmp_path, sink):
+    return AuditWriter(sink, batch_size=2, spill_path=str(tmp_path / 'audit_spill.jsonl'))
+
+
+def test_add_log_is_enqueued_only_after_commit(tmp_path, monkeypatch):
+    written = []
+    writer = _writer(tmp_path, lambda entries: written.extend(entries) or True)
+    monkeypatch.setattr(audit_log_module, 'get_writer', lambda: writer)
+
+    app = Flask(__name__)
+    db_session.init_app(app, FakePool)
+
+    @app.route('/log/<int:status>', methods=['POST'])
+    def log(status):
+        AuditLog.add_log(1, 'UPDATE', 'devices', f'status {status}')
+        return jsonify({'status': 'success' if status < 400 else 'error'}), status
+
+    client = app.test_client()
+    assert client.post('/log/200').status_code == 200
+    assert client.post('/log/400').status_code == 400
+    writer.close()
+    assert [entry[3] for entry in written] == ['status 200']
+
+
+def test_replay_quarantines_bad_entries_and_continues(tmp_path):
+    rows = []
+
+    def sink(entries):
+        if any(entry[3] == 'rejected' for entry in entries):
+            return False
+        rows.extend(entry[3] for entry in entries)
+        return True
+
+    writer = _writer(tmp_path, sink)
+    entries = [(1, 'UPDATE', 'devices', text, None, None) for text in ('a', 'rejected', 'b', 'c')]
+    with open(writer.spill_path, 'w', encoding='utf-8') as f:
+        f.write('not json\n')
+        for entry in entries:
+            f.write(AuditWriter._encode(entry[:5] + (datetime(2026, 1, 1),)) + '\n')
+
+    writer.enqueue(1, 'LOGIN', 'users', 'live')
+    writer.close()
+
+    assert rows == ['live', 'a', 'b', 'c']
+    with open(writer.spill_path + '.quarantine', encoding='utf-8') as f:
+        quarantined = f.read().splitlines()
+    assert quarantined[0] == 'not json'
+    assert '"rejected"' in quarantined[1]
+    assert writer.stats()['quarantined'] == 2
+
+
+def test_replay_keeps_entries_while_database_is_down(tmp_path):
+    writer = _writer(tmp_path, lambda entries: False)
+    writer.enqueue(1, 'LOGIN', 'users', 'a')
+    writer.close()
+    writer._replay()
+    with open(writer.spill_path + '.replay', encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 1
+    assert writer.stats()['quarantined'] == 0
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+预约冲突语义测试：用内存中的假连接模拟设备表和预约表
+- 区间按 [start, end) 比较，首尾相接不算冲突
+- 只有已确认的预约参与冲突检查，确认时排除自身
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import reservation as reservation_module
+from app.models.reservation import BookingError, Reservation
+from app.utils.interval_index import TimelineIndex
+
+BASE = datetime(2026, 1, 1, 8, 0, 0)
+HOUR = timedelta(hours=1)
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.result = None
+        self.lastrowid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=()):
+        self.database.statements.append(' '.join(query.split()))
+        if query.startswith('SELECT did, status FROM devices'):
+            status = self.database.devices.get(params[0])
+            self.result = None if status is None else {'did': params[0], 'status': status}
+        elif 'FROM reservations' in query:
+            did, start_time, end_time = params[:3]
+            exclude = params[3] if len(params) > 3 else None
+            self.result = next((
+                {'res_id': res_id} for res_id, row in self.database.reservations.items()
+                if row['did'] == did and row['status'] == '已确认' and res_id != exclude
+                and start_time < row['end_time'] and end_time > row['start_time']
+            ), None)
+        elif 'INSERT INTO reservations' in query:
+            uid, did, start_time, end_time = params
+            self.lastrowid = max(self.database.reservations, default=0) + 1
+            self.database.reservations[self.lastrowid] = {
+                'uid': uid, 'did': did, 'start_time': start_time, 'end_time': end_time, 'status': '待审核'
+            }
+        elif query.startswith('UPDATE reservations'):
+            row = self.database.reservations.get(params[0])
+            if row is None:
+                return 0
+            row['status'] = '已确认'
+        else:
+            raise AssertionError(f'未预期的语句: {query}')
+        return 1
+
+    def fetchone(self):
+        return self.result
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.devices = {1: '空闲', 2: '维修中'}
+        self.reservations = {}
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def add(self, did, start_time, end_time, status):
+        res_id = max(self.reservations, default=0) + 1
+        self.reservations[res_id] = {'uid': 9, 'did': did, 'start_time': start_time,
+                                     'end_time': end_time, 'status': status}
+        return res_id
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+
+    @contextmanager
+    def transaction():
+        yield database
+
+    monkeypatch.setattr(reservation_module, 'transaction', transaction)
+    monkeypatch.setattr(reservation_module, 'emit', lambda *args, **kwargs: None)
+    return database
+
+
+def _book(did, start_time, end_time):
+    reservation = Reservation(uid=1, did=did, start_time=start_time, end_time=end_time)
+    return reservation, reservation.book()
+
+
+def test_book_inserts_pending_reservation_after_locking(database):
+    reservation, result = _book(1, BASE, BASE + HOUR)
+    assert result is True
+    assert reservation.res_id == 1
+    assert reservation.status == '待审核'
+    assert database.statements[0].endswith('FOR UPDATE')
+    assert database.statements[1].endswith('LIMIT 1 LOCK IN SHARE MODE')
+
+
+def test_book_rejects_overlap_with_confirmed_reservation(database):
+    database.add(1, BASE, BASE + 2 * HOUR, '已确认')
+    with pytest.raises(BookingError, match='冲突'):
+        _book(1, BASE + HOUR, BASE + 3 * HOUR)
+    assert len(database.reservations) == 1
+
+
+def test_book_allows_touching_and_unconfirmed_reservations(database):
+    database.add(1, BASE, BASE + HOUR, '已确认')
+    database.add(1, BASE + HOUR, BASE + 2 * HOUR, '待审核')
+    database.add(1, BASE + HOUR, BASE + 2 * HOUR, '已取消')
+    _, result = _book(1, BASE + HOUR, BASE + 2 * HOUR)
+    assert result is True
+
+
+def test_book_checks_device(database):
+    with pytest.raises(BookingError, match='设备不存在'):
+        _book(3, BASE, BASE + HOUR)
+    with pytest.raises(BookingError, match='设备当前不可用'):
+        _book(2, BASE, BASE + HOUR)
+    assert database.reservations == {}
+
+
+def test_confirm_excludes_itself_and_rejects_overlap(database):
+    pending = database.add(1, BASE, BASE + 2 * HOUR, '待审核')
+    reservation = Reservation(res_id=pending, uid=9, did=1, start_time=BASE, end_time=BASE + 2 * HOUR,
+                              status='待审核')
+    assert reservation._confirm() is True
+    assert database.reservations[pending]['status'] == '已确认'
+    # 再次确认时自身不算冲突
+    assert reservation._confirm() is True
+
+    other = database.add(1, BASE + HOUR, BASE + 3 * HOUR, '待审核')
+    reservation = Reservation(res_id=other, uid=9, did=1, start_time=BASE + HOUR, end_time=BASE + 3 * HOUR,
+                              status='待审核')
+    with pytest.raises(BookingError, match='冲突'):
+        reservation._confirm()
+    assert database.reservations[other]['status'] == '待审核'
+
+
+def test_book_rejects_from_timeline_index_before_locking(database, monkeypatch):
+    database.add(1, BASE, BASE + 2 * HOUR, '已确认')
+    index = TimelineIndex(lambda dids: {1: [(BASE, BASE + 2 * HOUR, 1)]})
+    monkeypatch.setattr(reservation_module, 'get_timeline_index', lambda: index)
+    with pytest.raises(BookingError, match='冲突'):
+        _book(1, BASE + HOUR, BASE + 3 * HOUR)
+    assert database.statements == []
+    # 索引中没有冲突时仍由加锁的 SQL 检查
+    _, result = _book(1, BASE + 2 * HOUR, BASE + 3 * HOUR)
+    assert result is True
+    assert database.statements[1].endswith('LOCK IN SHARE MODE')
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量创建设备测试：自增ID不保证连续时逐行插入，返回每行真实的ID
+"""
+
+from contextlib import contextmanager
+
+import pytest
+
+from app.models import device as device_module
+from app.models.device import Device
+from app.models.room import Room
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.lastrowid = None
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=()):
+        if query.startswith('SELECT @@auto_increment_increment'):
+            self.result = {'increment': self.database.increment, 'lock_mode': self.database.lock_mode}
+            return 1
+        rows = len(params) // 5
+        self.database.statements.append(rows)
+        ids = []
+        for _ in range(rows):
+            self.database.next_id += self.database.increment
+            ids.append(self.database.next_id)
+        self.lastrowid = ids[0]
+        self.database.ids.extend(ids)
+        return rows
+
+    def fetchone(self):
+        return self.result
+
+
+class FakeDatabase:
+    def __init__(self, increment, lock_mode):
+        self.increment = increment
+        self.lock_mode = lock_mode
+        self.next_id = 0
+        self.statements = []
+        self.ids = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+def _bulk_create(monkeypatch, database, count):
+    @contextmanager
+    def transaction():
+        yield database
+
+    monkeypatch.setattr(device_module, 'transaction', transaction)
+    monkeypatch.setattr(device_module, 'emit', lambda *args, **kwargs: None)
+    monkeypatch.setattr(Room, 'get_existing_ids', staticmethod(lambda ids: {1}))
+    items = [{'dname': f'设备{i}', 'type': '电脑', 'room_id': 1} for i in range(count)]
+    return [item['did'] for item in Device.bulk_create(items)]
+
+
+@pytest.mark.parametrize('increment, lock_mode', [(2, 1), (1, 2)])
+def test_inserts_row_by_row_when_ids_may_not_be_consecutive(monkeypatch, increment, lock_mode):
+    database = FakeDatabase(increment, lock_mode)
+    assert _bulk_create(monkeypatch, database, 3) == database.ids
+    assert database.statements == [1, 1, 1]
+
+
+def test_multi_row_insert_when_ids_are_consecutive(monkeypatch):
+    database = FakeDatabase(1, 1)
+    assert _bulk_create(monkeypatch, database, 3) == [1, 2, 3]
+    assert database.statements == [3]
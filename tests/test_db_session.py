@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+请求级数据库会话测试：语句失败时整个请求的写入回滚并返回500
+"""
+
+from flask import Flask, jsonify
+
+from app.utils import db_session
+from app.utils.db_config import execute_update
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if 'fail' in query:
+            raise RuntimeError('模拟语句失败')
+        self.connection.pending.append(query)
+        return 1
+
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+        self.pending = []
+
+    def begin(self):
+        self.pending = []
+
+    def cursor(self, cursor_class=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.database.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+
+class FakePool:
+    def __init__(self):
+        self.database = []
+        self.released = []
+
+    def acquire(self):
+        return FakeConnection(self.database)
+
+    def release(self, connection, discard=False):
+        self.released.append(discard)
+
+
+def create_test_app(pool):
+    app = Flask(__name__)
+    db_session.init_app(app, lambda: pool)
+
+    @app.route('/write/<int:fail>', methods=['POST'])
+    def write(fail):
+        execute_update("INSERT INTO devices (dname) VALUES ('a')")
+        execute_update("UPDATE fail" if fail else "UPDATE devices SET dname = 'b'")
+        return jsonify({'status': 'success'})
+
+    return app
+
+
+def test_request_commits_all_statements():
+    pool = FakePool()
+    response = create_test_app(pool).test_client().post('/write/0')
+    assert response.status_code == 200
+    assert len(pool.database) == 2
+    assert pool.released == [False]
+
+
+def test_failed_statement_rolls_back_request_and_returns_500():
+    pool = FakePool()
+    response = create_test_app(pool).test_client().post('/write/1')
+    assert response.status_code == 500
+    assert response.get_json()['status'] == 'error'
+    assert pool.database == []
+    assert pool.released == [False]
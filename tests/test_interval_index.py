@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+区间树测试：与逐个比较的朴素实现对照
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from app.utils.cache import touch_tables
+from app.utils.interval_index import IntervalTimeline, TimelineIndex
+
+BASE = datetime(2026, 1, 1, 8, 0, 0)
+
+
+def _interval(rng):
+    start = BASE + timedelta(minutes=rng.randrange(0, 2000))
+    return start, start + timedelta(minutes=rng.randrange(1, 240))
+
+
+def test_overlapping_matches_brute_force():
+    rng = random.Random(7)
+    items = [(*_interval(rng), key) for key in range(300)]
+    timeline = IntervalTimeline(items[:100])
+    for item in items[100:]:
+        timeline.add(*item)
+    assert len(timeline) == len(items)
+
+    for _ in range(200):
+        start, end = _interval(rng)
+        expected = sorted(item for item in items if item[0] < end and item[1] > start)
+        assert timeline.overlapping(start, end) == expected
+        assert timeline.has_conflict(start, end) == bool(expected)
+
+
+def test_has_conflict_excludes_own_key_and_allows_touching():
+    timeline = IntervalTimeline([(BASE, BASE + timedelta(hours=1), 1)])
+    assert not timeline.has_conflict(BASE, BASE + timedelta(hours=1), exclude_key=1)
+    assert not timeline.has_conflict(BASE + timedelta(hours=1), BASE + timedelta(hours=2))
+    assert timeline.has_conflict(BASE + timedelta(minutes=59), BASE + timedelta(hours=2))
+
+
+def test_free_slots():
+    hour = timedelta(hours=1)
+    timeline = IntervalTimeline([
+        (BASE + hour, BASE + 3 * hour, 1),
+        (BASE + 2 * hour, BASE + 4 * hour, 2),
+        (BASE + 5 * hour, BASE + 6 * hour, 3),
+    ])
+    assert timeline.free_slots(BASE, BASE + 8 * hour, hour) == [
+        (BASE, BASE + hour), (BASE + 4 * hour, BASE + 5 * hour), (BASE + 6 * hour, BASE + 8 * hour)
+    ]
+    assert timeline.free_slots(BASE, BASE + 8 * hour, 2 * hour) == [(BASE + 6 * hour, BASE + 8 * hour)]
+    assert timeline.free_slots(BASE, BASE + 8 * hour, hour, limit=1) == [(BASE, BASE + hour)]
+
+
+def test_timeline_index_reloads_after_reservations_are_written():
+    loads = []
+    intervals = {1: [(BASE, BASE + timedelta(hours=1), 1)]}
+
+    def loader(dids):
+        loads.append(list(dids))
+        return {did: intervals[did] for did in dids if did in intervals}
+
+    index = TimelineIndex(loader)
+    timelines = index.get_many([1, 2])
+    assert timelines[1].has_conflict(BASE, BASE + timedelta(minutes=30))
+    assert len(timelines[2]) == 0
+    index.get_many([1, 2])
+    assert loads == [[1, 2]]
+
+    intervals[1] = []
+    touch_tables('reservations')
+    assert not index.get_many([1])[1].has_conflict(BASE, BASE + timedelta(minutes=30))
+    assert loads == [[1, 2], [1]]
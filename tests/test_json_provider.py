@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+JSON provider 测试：查询结果的输出与 Flask 默认 provider 一致，模型对象的时间格式与原控制器一致
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.models.reservation import Reservation
+from app.utils import json_provider
+from app.utils.json_provider import FastJSONProvider, RowSet
+
+ROW = {'did': 1, 'dname': '示波器', 'total_hours': Decimal('12.50'),
+       'log_time': datetime(2026, 1, 1, 8, 30, 0), 'day': date(2026, 1, 2), 'spec': None}
+
+# provider 只持有应用的弱引用
+app = Flask(__name__)
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def provider(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    elif json_provider.orjson is None:
+        pytest.skip('未安装 orjson')
+    return FastJSONProvider(app)
+
+
+def test_rows_match_default_provider(provider):
+    expected = json.loads(DefaultJSONProvider(app).dumps({'row': ROW, 'rows': [ROW]}))
+    rows = RowSet(list(ROW), [tuple(ROW.values())])
+    assert json.loads(provider.dumps({'row': ROW, 'rows': rows})) == expected
+    assert json.loads(provider.dumps({'nested': {'rows': rows}})) == {'nested': {'rows': expected['rows']}}
+
+
+def test_model_datetime_format(provider):
+    reservation = Reservation(res_id=1, uid=2, did=3, start_time=datetime(2026, 1, 1, 8, 0, 0),
+                              end_time=datetime(2026, 1, 1, 10, 0, 0), status='已确认')
+    data = json.loads(provider.dumps({'reservations': [reservation], 'reservation': reservation}))
+    assert data['reservations'] == [data['reservation']]
+    assert data['reservation']['start_time'] == '2026-01-01 08:00:00'
+    assert data['reservation']['end_time'] == '2026-01-01 10:00:00'
+
+
+def test_strings_that_look_like_placeholders_are_not_rewritten(provider):
+    rows = RowSet(['did', 'dname'], [(1, '示波器')])
+    for text in ['@@rowset:1:0@@', f'@@rowset:{id(rows)}:0@@', '"@@rowset:%d:1@@"' % id(rows)]:
+        data = {'message': text, 'devices': rows, 'sql_text': text}
+        assert json.loads(provider.dumps(data)) == {
+            'message': text, 'devices': [{'did': 1, 'dname': '示波器'}], 'sql_text': text
+        }
+
+
+def test_formatting_arguments_are_honoured(provider):
+    rows = RowSet(['did'], [(1,)])
+    text = provider.dumps({'devices': rows}, indent=2)
+    assert json.loads(text) == {'devices': [{'did': 1}]}
+    assert '\n' in text
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+登录测试：查询用户失败时返回503，不当作密码错误，也不消耗限流令牌
+"""
+
+from flask import Flask
+
+from app.controllers.auth_controller import auth_bp
+from app.models import user as user_module
+from app.utils import rate_limit
+
+
+def _client(monkeypatch, rows):
+    monkeypatch.setattr(user_module, 'execute_query_tuples', lambda *args, **kwargs: rows)
+    monkeypatch.setattr(rate_limit, '_limiters', {})
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    return app.test_client()
+
+
+def _login(client):
+    return client.post('/api/auth/login', json={'code': '2026001', 'password': 'secret'})
+
+
+def test_lookup_failure_returns_503_without_consuming_tokens(monkeypatch):
+    client = _client(monkeypatch, None)
+    for _ in range(20):
+        response = _login(client)
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    assert rate_limit.get_limiter('login_ip').peek('127.0.0.1') == 0
+    assert rate_limit.get_limiter('login_code').peek('2026001') == 0
+
+
+def test_unknown_user_is_rejected_and_throttled(monkeypatch):
+    client = _client(monkeypatch, [])
+    statuses = [_login(client).status_code for _ in range(20)]
+    assert statuses[0] == 401
+    assert statuses[-1] == 429
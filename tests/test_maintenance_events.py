@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+报修事件测试：存储过程取消的已确认预约逐个发布 reservation.status 事件
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+
+from app.models import maintenance as maintenance_module
+from app.models import reservation as reservation_module
+from app.models.maintenance import Maintenance
+
+START = datetime(2026, 1, 1, 8, 0, 0)
+END = datetime(2026, 1, 1, 10, 0, 0)
+
+
+class FakeCursor:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.calls.append(('execute', ' '.join(query.split())))
+
+    def fetchall(self):
+        return [{'res_id': 7, 'uid': 3, 'did': 1, 'start_time': START, 'end_time': END}]
+
+    def callproc(self, name, params):
+        self.calls.append(('callproc', name))
+
+    def nextset(self):
+        return None
+
+
+def test_cancelled_reservations_emit_status_events(monkeypatch):
+    calls, events = [], []
+
+    class FakeConnection:
+        def cursor(self):
+            return FakeCursor(calls)
+
+    @contextmanager
+    def transaction():
+        yield FakeConnection()
+
+    def emit(event_type, owner=None, **data):
+        events.append((event_type, owner, data))
+
+    monkeypatch.setattr(maintenance_module, 'transaction', transaction)
+    monkeypatch.setattr(maintenance_module, 'emit', emit)
+    monkeypatch.setattr(reservation_module, 'emit', emit)
+
+    assert Maintenance(did=1, issue='无法开机').create_with_device_update(reporter_id=2) is True
+    assert calls[0][1].endswith('FOR UPDATE')
+    assert calls[1] == ('callproc', 'ProcessMaintenance')
+    assert [event[0] for event in events] == ['maintenance.created', 'device.status', 'reservation.status']
+    assert events[2][1] == 3
+    assert events[2][2] == {'res_id': 7, 'uid': 3, 'did': 1, 'start_time': START, 'end_time': END,
+                            'status': '已取消', 'old_status': '已确认'}
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+登录用户缓存测试：查询失败与用户不存在区分处理，失败不缓存
+"""
+
+import pytest
+
+from app.utils.principal_cache import MISSING, PrincipalCache, PrincipalUnavailable
+
+
+def test_query_failure_raises_and_is_not_cached():
+    cache = PrincipalCache()
+    with pytest.raises(PrincipalUnavailable):
+        cache.get(1, lambda uid: None)
+    assert cache.get(1, lambda uid: (uid, '张三')) == (1, '张三')
+
+
+def test_missing_user_is_cached():
+    cache = PrincipalCache()
+    calls = []
+
+    def loader(uid):
+        calls.append(uid)
+        return MISSING
+
+    assert cache.get(1, loader) is None
+    assert cache.get(1, loader) is None
+    assert calls == [1]